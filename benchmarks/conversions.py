@@ -0,0 +1,369 @@
+"""
+Conversion benchmarks on generated fixture documents.
+
+Runs each conversion through the entry point the bot uses – no Telegram,
+no database, no conversion engine queue:
+
+    pdf_to_word    PdfWordService.convert (page ranges on its worker pool),
+                   the concurrent jobs sharing one pool as in the bot
+    word/ppt_to_pdf  the warm LibreOffice pool (unoserver), or one-off
+                   soffice runs when it cannot start – the bot's fallback
+    the rest       services/converters.py, each job in a forked process
+
+and reports per conversion type, fixture and concurrency level:
+
+    wall     seconds until all concurrent jobs finished
+    cpu      user + system seconds per job (including soffice children)
+    rss      peak resident memory per process, MB
+    output   output size, KB
+
+The warm LibreOffice instances are long-lived processes outside the jobs,
+so for them only wall time and output size are reported.
+
+Usage (from the repository root):
+
+    python benchmarks/conversions.py
+    python benchmarks/conversions.py --types pdf_to_txt,pdf_to_word --concurrency 1,4
+    python benchmarks/conversions.py --fixtures long,scanned --json before.json
+
+Fixtures are generated once into --fixtures-dir and reused. Conversions
+whose tools are missing (pdf2docx, LibreOffice) are reported as skipped.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# the services import the bot's loader, which only checks that these look valid;
+# nothing here talks to Telegram or OpenAI
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from services import converters  # noqa: E402
+from services.office import office_pool  # noqa: E402
+from services.pdf_word import PdfWordService  # noqa: E402
+
+CONVERSION_TYPES = ["pdf_to_word", "pdf_to_txt", "word_to_pdf", "ppt_to_pdf", "images_to_pdf"]
+OFFICE_TYPES = ("word_to_pdf", "ppt_to_pdf")
+
+LOREM = (
+    "The lecture covers the derivation of the main result, its assumptions and the cases "
+    "in which it fails. Worked examples follow each section, and the exercises at the end "
+    "of the chapter repeat the key steps with different numbers. "
+)
+
+
+# ─── Fixtures ────────────────────────────────────────────────────────
+def _photo(path: str, size: tuple[int, int], fmt: str):
+    """A noisy, photo-like image: compresses about as badly as a phone picture."""
+    from PIL import Image, ImageFilter
+    channels = [Image.effect_noise(size, sigma).filter(ImageFilter.GaussianBlur(1))
+                for sigma in (40, 55, 70)]
+    gradient = Image.linear_gradient("L").resize(size)
+    channels = [Image.blend(c, gradient, 0.5) for c in channels]
+    Image.merge("RGB", channels).save(path, fmt, quality=90)
+
+
+def _text_pdf(path: str, pages: int):
+    import fitz
+    with fitz.open() as doc:
+        for n in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Chapter {n + 1}", fontsize=20, fontname="hebo")
+            page.insert_textbox(fitz.Rect(72, 100, 523, 500), LOREM * 8, fontsize=10)
+            # a small table, the layout pdf2docx works hardest on
+            for row in range(6):
+                for col in range(4):
+                    cell = fitz.Rect(72 + col * 110, 520 + row * 20, 182 + col * 110, 540 + row * 20)
+                    page.draw_rect(cell, width=0.5)
+                    page.insert_text((cell.x0 + 4, cell.y1 - 6), f"r{row} c{col}", fontsize=9)
+        doc.save(path, garbage=3, deflate=True)
+
+
+def _image_pdf(path: str, pages: int, workdir: str):
+    import fitz
+    photo = os.path.join(workdir, "photo.jpg")
+    _photo(photo, (2400, 1800), "JPEG")
+    with fitz.open() as doc:
+        for n in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 60), f"Figure {n + 1}", fontsize=14)
+            page.insert_image(fitz.Rect(72, 80, 523, 420), filename=photo)
+            page.insert_textbox(fitz.Rect(72, 440, 523, 770), LOREM * 4, fontsize=10)
+        doc.save(path, garbage=3, deflate=True)
+
+
+def _scanned_pdf(path: str, pages: int, source: str):
+    """Each page of `source` rendered to a 200 dpi grayscale image – no text layer."""
+    import fitz
+    with fitz.open(source) as src, fitz.open() as doc:
+        for n in range(pages):
+            pix = src[n % src.page_count].get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+            page = doc.new_page(width=src[0].rect.width, height=src[0].rect.height)
+            page.insert_image(page.rect, stream=pix.tobytes("png"))
+        doc.save(path, garbage=3, deflate=True)
+
+
+def _docx(path: str, pages: int, workdir: str):
+    from docx import Document
+    from docx.shared import Inches
+    photo = os.path.join(workdir, "photo-small.jpg")
+    if not os.path.exists(photo):
+        _photo(photo, (1200, 900), "JPEG")
+    doc = Document()
+    for n in range(pages):
+        doc.add_heading(f"Chapter {n + 1}", level=1)
+        doc.add_paragraph(LOREM * 6)
+        if n % 3 == 0:
+            doc.add_picture(photo, width=Inches(4))
+        table = doc.add_table(rows=5, cols=4)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = "value"
+        doc.add_page_break()
+    doc.save(path)
+
+
+def _pptx(path: str, slides: int, workdir: str):
+    from pptx import Presentation
+    from pptx.util import Inches
+    photo = os.path.join(workdir, "photo-small.jpg")
+    if not os.path.exists(photo):
+        _photo(photo, (1200, 900), "JPEG")
+    prs = Presentation()
+    for n in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {n + 1}"
+        slide.placeholders[1].text = LOREM
+        if n % 2 == 0:
+            slide.shapes.add_picture(photo, Inches(5), Inches(4), width=Inches(4))
+    prs.save(path)
+
+
+def build_fixtures(root: str) -> dict[str, dict[str, str | list[str]]]:
+    """Generate the fixtures that are not in `root` yet; return {input kind: {name: path}}."""
+    os.makedirs(root, exist_ok=True)
+
+    def fixture(name: str, build):
+        path = os.path.join(root, name)
+        if not os.path.exists(path):
+            print(f"generating {name}…", file=sys.stderr)
+            tmp = path + ".tmp"
+            build(tmp)
+            os.replace(tmp, path)
+        return path
+
+    pdf = {
+        "small": fixture("small.pdf", lambda p: _text_pdf(p, 3)),
+        "medium": fixture("medium.pdf", lambda p: _text_pdf(p, 30)),
+        "long": fixture("long.pdf", lambda p: _text_pdf(p, 300)),
+        "images": fixture("images.pdf", lambda p: _image_pdf(p, 20, root)),
+    }
+    pdf["scanned"] = fixture("scanned.pdf", lambda p: _scanned_pdf(p, 10, pdf["medium"]))
+
+    photos = [fixture(f"photo-{n}.jpg", lambda p: _photo(p, (4000, 3000), "JPEG")) for n in range(10)]
+    pngs = [fixture(f"screenshot-{n}.png", lambda p: _photo(p, (1920, 1080), "PNG")) for n in range(10)]
+
+    return {
+        "pdf": pdf,
+        "docx": {
+            "small": fixture("small.docx", lambda p: _docx(p, 3, root)),
+            "medium": fixture("medium.docx", lambda p: _docx(p, 30, root)),
+        },
+        "pptx": {
+            "small": fixture("small.pptx", lambda p: _pptx(p, 5, root)),
+            "medium": fixture("medium.pptx", lambda p: _pptx(p, 40, root)),
+        },
+        "images": {"photos": photos, "screenshots": pngs},
+    }
+
+
+# ─── Jobs ────────────────────────────────────────────────────────────
+def _missing_tool(conversion_type: str) -> str | None:
+    if conversion_type == "pdf_to_word" and importlib.util.find_spec("pdf2docx") is None:
+        return "pdf2docx is not installed"
+    if conversion_type in ("word_to_pdf", "ppt_to_pdf") and shutil.which("libreoffice") is None:
+        return "libreoffice is not on PATH"
+    return None
+
+
+def _job(conversion_type: str, source, outdir: str):
+    """(function, args, output path) for one forked run, writing into `outdir`."""
+    if conversion_type == "pdf_to_txt":
+        out = os.path.join(outdir, "out.txt")
+        return converters.pdf_to_txt, (source, out), out
+    if conversion_type == "images_to_pdf":
+        out = os.path.join(outdir, "out.pdf")
+        return converters.images_to_pdf, (source, out), out
+    # office_to_pdf names the output after the input
+    out = os.path.join(outdir, os.path.splitext(os.path.basename(source))[0] + ".pdf")
+    return converters.office_to_pdf, (source, outdir, 600), out
+
+
+def _fork(func, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            func(*args)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        os._exit(code)
+    return pid
+
+
+def _pdf_to_word(source: str, outs: list[str]):
+    """All of a measurement's jobs at once on one PdfWordService, as in the bot."""
+    async def run():
+        service = PdfWordService()
+        service.pool.start()
+        try:
+            pages = converters.pdf_page_count(source)
+            await asyncio.gather(*(service.convert(source, out, 0, pages) for out in outs),
+                                 return_exceptions=True)
+        finally:
+            # joined rather than killed, so wait4 counts the range workers too
+            service.pool.stop(wait=True)
+
+    asyncio.run(run())
+
+
+def _office_pool(loop: asyncio.AbstractEventLoop, source: str, outs: list[str]) -> float:
+    started = time.perf_counter()
+    loop.run_until_complete(asyncio.gather(
+        *(office_pool.convert(source, out, 600) for out in outs), return_exceptions=True
+    ))
+    return time.perf_counter() - started
+
+
+def measure(conversion_type: str, source, concurrency: int, workdir: str,
+            loop: asyncio.AbstractEventLoop) -> dict:
+    """Run `concurrency` copies of one conversion at once."""
+    outdirs = [tempfile.mkdtemp(dir=workdir) for _ in range(concurrency)]
+    cpu, rss = [], []
+
+    if conversion_type in OFFICE_TYPES and office_pool.available:
+        outs = [os.path.join(outdir, "out.pdf") for outdir in outdirs]
+        wall = _office_pool(loop, source, outs)
+    elif conversion_type == "pdf_to_word":
+        outs = [os.path.join(outdir, "out.docx") for outdir in outdirs]
+        started = time.perf_counter()
+        _, _, usage = os.wait4(_fork(_pdf_to_word, (source, outs)), 0)
+        wall = time.perf_counter() - started
+        # one process ran every job; its workers were waited for, so they are included
+        cpu = [(usage.ru_utime + usage.ru_stime) / concurrency]
+        rss = [usage.ru_maxrss / 1024]               # KB on Linux
+    else:
+        jobs = [_job(conversion_type, source, outdir) for outdir in outdirs]
+        started = time.perf_counter()
+        pids = [_fork(func, args) for func, args, _ in jobs]
+        for pid in pids:
+            # by pid: the LibreOffice listeners are children of this process too
+            _, _, usage = os.wait4(pid, 0)
+            # wait4 counts the job process and everything it waited for (soffice, Tesseract)
+            cpu.append(usage.ru_utime + usage.ru_stime)
+            rss.append(usage.ru_maxrss / 1024)
+        wall = time.perf_counter() - started
+        outs = [out for _, _, out in jobs]
+
+    sizes = [os.path.getsize(out) / 1024 for out in outs if os.path.exists(out)]
+    for outdir in outdirs:
+        shutil.rmtree(outdir, ignore_errors=True)
+    return {
+        "wall_s": round(wall, 3),
+        "cpu_s": round(sum(cpu) / len(cpu), 3) if cpu else None,
+        "peak_rss_mb": round(max(rss), 1) if rss else None,
+        "output_kb": round(sum(sizes) / len(sizes), 1) if sizes else None,
+        "failed": concurrency - len(sizes),
+    }
+
+
+def _baseline_rss() -> float:
+    """Peak RSS of a forked child that does nothing – subtract it when comparing."""
+    pid = _fork(lambda: None, ())
+    return os.wait4(pid, 0)[2].ru_maxrss / 1024
+
+
+def _column(value, width: int, spec: str) -> str:
+    return f"{value:>{width}{spec}}" if value is not None else f"{'-':>{width}}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--types", default=",".join(CONVERSION_TYPES),
+                        help="comma-separated conversion types")
+    parser.add_argument("--fixtures", default=None,
+                        help="comma-separated fixture names (default: all that fit the type)")
+    parser.add_argument("--concurrency", default="1,2,4", help="comma-separated job counts")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per measurement; the fastest is kept")
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "studybot-bench"))
+    parser.add_argument("--json", help="also write the results to this file")
+    options = parser.parse_args()
+    # pdf2docx logs every page at INFO
+    logging.disable(logging.INFO)
+
+    fixtures = build_fixtures(options.fixtures_dir)
+    inputs = {
+        "pdf_to_word": fixtures["pdf"],
+        "pdf_to_txt": fixtures["pdf"],
+        "word_to_pdf": fixtures["docx"],
+        "ppt_to_pdf": fixtures["pptx"],
+        "images_to_pdf": fixtures["images"],
+    }
+    wanted = set(options.fixtures.split(",")) if options.fixtures else None
+    levels = [int(c) for c in options.concurrency.split(",")]
+
+    types = options.types.split(",")
+    workdir = tempfile.mkdtemp(prefix="studybot-bench-run-")
+    loop = asyncio.new_event_loop()
+    if any(t in OFFICE_TYPES and not _missing_tool(t) for t in types):
+        # started once, like the bot does; stays unavailable when unoserver is missing
+        loop.run_until_complete(office_pool.start())
+        print("LibreOffice: " + (f"warm pool of {office_pool.size}" if office_pool.available
+                                 else "one-off soffice runs (unoserver unavailable)"))
+    results = []
+    print(f"baseline child RSS: {_baseline_rss():.1f} MB, CPUs: {os.cpu_count()}")
+    print(f"{'type':<15}{'fixture':<13}{'jobs':>5}{'wall s':>9}{'cpu s/job':>11}"
+          f"{'peak MB':>9}{'out KB':>10}")
+    try:
+        for conversion_type in types:
+            missing = _missing_tool(conversion_type)
+            if missing:
+                print(f"{conversion_type:<15}skipped: {missing}")
+                continue
+            for name, source in inputs[conversion_type].items():
+                if wanted and name not in wanted:
+                    continue
+                for concurrency in levels:
+                    runs = [measure(conversion_type, source, concurrency, workdir, loop)
+                            for _ in range(max(1, options.repeat))]
+                    result = min(runs, key=lambda r: r["wall_s"])
+                    result.update(type=conversion_type, fixture=name, concurrency=concurrency)
+                    results.append(result)
+                    print(f"{conversion_type:<15}{name:<13}{concurrency:>5}{result['wall_s']:>9.2f}"
+                          f"{_column(result['cpu_s'], 11, '.2f')}{_column(result['peak_rss_mb'], 9, '.1f')}"
+                          f"{_column(result['output_kb'], 10, '')}"
+                          + (f"  ({result['failed']} failed)" if result["failed"] else ""),
+                          flush=True)
+    finally:
+        if office_pool.available:
+            loop.run_until_complete(office_pool.stop())
+        loop.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,14 @@ from apscheduler.triggers.interval import IntervalTrigger
 from config import WEBHOOK_PATH
 from database.db import db
 from services.scheduler import schedule_reminders, send_due_reminders
+from services.ingestion import ingestion
+from services.conversion_cache import conversion_cache
+from services.conversion import conversion_engine
+from services.ocr import ocr
+from services.office import office_pool
+from services.pdf_word import pdf_word
+from services.ticket_ai import ai_jobs
+from services.workspace import run_reaper
 from loader import bot, dp, logger, scheduler
 
 # ─── Import all handlers to register them ─────────────────────────────────────
@@ -20,7 +28,9 @@ from handlers import (
     tickets,
     materials,
     file_converter,
-    subjects_teachers
+    batch_converter,
+    subjects_teachers,
+    inline
 )
 
 # ─── Startup routine ──────────────────────────────────────────────────────────
@@ -28,12 +38,30 @@ async def on_startup(dp):
     logger.info("Initializing database...")
     await db.init_db()
     await db._ensure_trgm()
+    await db._ensure_fts()
+    await db._ensure_file_metadata()
+    await db._ensure_conversion_cache()
+    await db._ensure_ocr_cache()
+
+    logger.info("Starting material ingestion pipeline...")
+    await ingestion.start()
+    await conversion_engine.start()
+    await office_pool.start()
+    await ocr.start()
+    await pdf_word.start()
 
     logger.info("Pre-scheduling reminders for future tasks/events...")
     await schedule_reminders()
 
     logger.info("Scheduling periodic reminders...")
     scheduler.add_job(send_due_reminders, IntervalTrigger(minutes=1))
+    scheduler.add_job(ingestion.enqueue_pending, IntervalTrigger(minutes=5))
+    scheduler.add_job(db.search_cache.log_stats, IntervalTrigger(minutes=15))
+    scheduler.add_job(conversion_cache.prune, IntervalTrigger(hours=1))
+    scheduler.add_job(ocr.prune_cache, IntervalTrigger(hours=1))
+    scheduler.add_job(conversion_cache.log_stats, IntervalTrigger(minutes=15))
+    scheduler.add_job(run_reaper, IntervalTrigger(minutes=10))
+    scheduler.add_job(office_pool.health_check, IntervalTrigger(minutes=1))
     scheduler.start()
 
     webhook_host = os.getenv('WEBHOOK_HOST')
@@ -53,6 +81,12 @@ async def on_shutdown(dp):
         logger.info("Storage closed")
         scheduler.shutdown()
         logger.info("Scheduler stopped")
+        await ingestion.stop()
+        await conversion_engine.stop()
+        await office_pool.stop()
+        await ocr.stop()
+        await pdf_word.stop()
+        await ai_jobs.stop()
         await db.close_pool()
         logger.info("Database pool closed")
         await bot.session.close()
@@ -6,6 +6,17 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 WEBHOOK_PATH = '/webhook'
 BOT_TIMEZONE = pytz.timezone(os.getenv('BOT_TIMEZONE', 'Asia/Tashkent'))
 
+# Self-hosted telegram-bot-api server. With TELEGRAM_API_LOCAL (its --local mode)
+# files are read from and uploaded by path inside TELEGRAM_API_DIR, which must be
+# mounted at the same path in the bot container.
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")  # e.g. http://telegram-bot-api:8081
+TELEGRAM_API_LOCAL = os.getenv("TELEGRAM_API_LOCAL", "false").lower() == "true"
+TELEGRAM_API_DIR = os.getenv("TELEGRAM_API_DIR", "/var/lib/telegram-bot-api")
+# Bot API download limit; a local server has none worth mentioning
+BOT_API_MAX_FILE_SIZE = (2000 if TELEGRAM_API_LOCAL else 20) * 1024 * 1024
+# ...and upload limit, for documents the bot sends
+BOT_API_MAX_UPLOAD_SIZE = (2000 if TELEGRAM_API_LOCAL else 50) * 1024 * 1024
+
 
 SMTP_CFG = {
     "hostname": os.getenv("SMTP_HOST"),
@@ -13,4 +24,75 @@ SMTP_CFG = {
     "username": os.getenv("SMTP_USER"),
     "password": os.getenv("SMTP_PASS"),
     "tls": os.getenv("SMTP_TLS", "true").lower() == "true",
-}
\ No newline at end of file
+}
+
+# Background text extraction for uploaded materials
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", min(2, os.cpu_count() or 1)))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 100))
+INGEST_MAX_FILE_SIZE = min(BOT_API_MAX_FILE_SIZE, 200 * 1024 * 1024)
+
+# AI ticket generation runs in the background, bounded overall and per user
+AI_MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", 4))
+AI_MAX_JOBS_PER_USER = int(os.getenv("AI_MAX_JOBS_PER_USER", 1))
+AI_TIMEOUT = int(os.getenv("AI_TIMEOUT", 120))  # seconds per request
+
+# Inline mode (@bot query) – seconds Telegram may reuse an answer for the same user
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", 30))
+
+# Converted outputs are re-sent by Telegram file_id; least recently used beyond this are evicted
+CONVERSION_CACHE_SIZE = int(os.getenv("CONVERSION_CACHE_SIZE", 5000))
+
+# Cores shared by the conversion engine and the OCR and PDF → Word page pools; a page-parallel
+# job holds an engine slot while its pages run in the other pools, so the three split one budget
+CPU_BUDGET = int(os.getenv("CPU_BUDGET", os.cpu_count() or 1))
+
+# File converter worker processes
+CONVERT_WORKERS = int(os.getenv("CONVERT_WORKERS", max(1, CPU_BUDGET // 2)))
+CONVERT_QUEUE_SIZE = int(os.getenv("CONVERT_QUEUE_SIZE", 50))
+CONVERT_MAX_JOBS_PER_USER = int(os.getenv("CONVERT_MAX_JOBS_PER_USER", 2))
+CONVERT_TIMEOUT = int(os.getenv("CONVERT_TIMEOUT", 300))  # seconds per job
+
+# Per-job scratch directories: tmpfs when it has room, the system temp dir otherwise
+WORKSPACE_TMPFS = os.getenv("WORKSPACE_TMPFS", "/dev/shm")
+WORKSPACE_TMPFS_MIN_FREE = int(os.getenv("WORKSPACE_TMPFS_MIN_FREE", 256 * 1024 * 1024))
+WORKSPACE_MAX_AGE = int(os.getenv("WORKSPACE_MAX_AGE", 3600))  # older, unused ones are reaped
+
+# Warm LibreOffice listeners (unoserver) for Word/PowerPoint → PDF
+OFFICE_SERVER_CMD = os.getenv("OFFICE_SERVER_CMD", "/usr/bin/python3 -m unoserver.server")
+OFFICE_WORKERS = int(os.getenv("OFFICE_WORKERS", 2))
+OFFICE_BASE_PORT = int(os.getenv("OFFICE_BASE_PORT", 2003))  # two ports per worker
+OFFICE_MAX_JOBS = int(os.getenv("OFFICE_MAX_JOBS", 200))       # recycle an instance after this many
+OFFICE_START_TIMEOUT = int(os.getenv("OFFICE_START_TIMEOUT", 60))
+
+# Conversion inputs are streamed to disk; these are checked before downloading
+CONVERT_MAX_FILE_SIZE = min(
+    int(os.getenv("CONVERT_MAX_FILE_SIZE", 200 * 1024 * 1024)), BOT_API_MAX_FILE_SIZE
+)
+CONVERT_MAX_PAGES = int(os.getenv("CONVERT_MAX_PAGES", 300))
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# PDF → TXT output beyond this is sent in several files (bots may upload up to 50 MB)
+TXT_PART_SIZE = int(os.getenv("TXT_PART_SIZE", 45 * 1024 * 1024))
+
+# Images → PDF
+IMAGES_MAX_COUNT = int(os.getenv("IMAGES_MAX_COUNT", 50))
+IMAGES_MAX_SIDE = int(os.getenv("IMAGES_MAX_SIDE", 2480))  # px; ≈ A4 at 300 dpi
+IMAGES_DOWNLOAD_CONCURRENCY = 4
+
+# PDF tools
+PDF_MERGE_MAX_FILES = int(os.getenv("PDF_MERGE_MAX_FILES", 20))
+PDF_SPLIT_MAX_PARTS = int(os.getenv("PDF_SPLIT_MAX_PARTS", 10))
+
+# Batch conversion: many files in, one ZIP out
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 30))
+
+# OCR of scanned PDFs (Tesseract)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", max(1, CPU_BUDGET // 4)))
+OCR_DPI = int(os.getenv("OCR_DPI", 300))
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", 100))
+OCR_LANG = os.getenv("OCR_LANG", "eng+rus")
+OCR_STREAM_PAGES = int(os.getenv("OCR_STREAM_PAGES", 10))  # partial results every N pages
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 50000))   # pages
+
+# PDF → Word, split into page ranges converted in parallel
+PDF2DOCX_WORKERS = int(os.getenv("PDF2DOCX_WORKERS", max(1, CPU_BUDGET - CONVERT_WORKERS - OCR_WORKERS)))
+PDF2DOCX_MIN_CHUNK = int(os.getenv("PDF2DOCX_MIN_CHUNK", 10))   # pages per range, at least
@@ -0,0 +1,94 @@
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SearchCache:
+    """
+    Bounded LRU of search results keyed by (user_id, normalized keyword, …).
+
+    Entries are grouped per user so that any write touching a user's files,
+    subjects, teachers or tickets can drop just that user's results (write-through
+    invalidation from the Database methods that perform the write).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._by_user: dict[int, set] = {}
+        # bumped on every invalidation, so a search that raced a write
+        # doesn't store its (already stale) result afterwards
+        self._generation: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize(keyword: str) -> str:
+        # every search pass is case-insensitive, so case and spacing don't matter
+        return " ".join(keyword.lower().split())
+
+    def get(self, key):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self, user_id: int) -> int:
+        return self._generation.get(user_id, 0)
+
+    def put(self, key, value, generation: int | None = None):
+        if self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation(key[0]):
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.maxsize:
+            old_key, _ = self._entries.popitem(last=False)
+            self._discard_key(old_key)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: int | None):
+        if user_id is None:
+            return
+        self._generation[user_id] = self.generation(user_id) + 1
+        keys = self._by_user.pop(user_id, ())
+        for key in keys:
+            self._entries.pop(key, None)
+        if keys:
+            self.invalidations += 1
+
+    def _discard_key(self, key):
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            "Search cache: %s entries, %s hits / %s misses (%.0f%% hit rate), "
+            "%s evictions, %s invalidations",
+            s["size"], s["hits"], s["misses"], s["hit_rate"] * 100,
+            s["evictions"], s["invalidations"],
+        )
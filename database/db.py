@@ -4,6 +4,7 @@ from datetime import datetime, date, timedelta, time
 import os
 import pytz
 import asyncio
+from database.cache import SearchCache
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -16,13 +17,24 @@ class Database:
             'postgresql://dbusername:dbpassword@db:5432/studybot?sslmode=disable'
         )
         self.pool = None
+        self.similarity_threshold = float(os.getenv('SEARCH_SIMILARITY_THRESHOLD', '0.3'))
+        # repeated searches are served from memory until one of the user's
+        # files, subjects, teachers or tickets changes
+        self.search_cache = SearchCache(int(os.getenv('SEARCH_CACHE_SIZE', '1024')))
         # Get default timezone from environment variable or fallback to UTC
         self.default_timezone = pytz.timezone('Asia/Tashkent')  # GMT+5 default
         logger.info(f"Using timezone: {self.default_timezone}")
 
     async def init_db(self):
             try:
-                self.pool = await asyncpg.create_pool(self.dsn)
+                self.pool = await asyncpg.create_pool(
+                    self.dsn,
+                    server_settings={
+                        # cut-off for the `%` / `<%` operators used by fuzzy search
+                        'pg_trgm.similarity_threshold': str(self.similarity_threshold),
+                        'pg_trgm.word_similarity_threshold': str(self.similarity_threshold),
+                    },
+                )
                 async with self.pool.acquire() as conn:
                     # Create tables in order of dependency
                     # 1. users (referenced by many tables)
@@ -55,6 +67,15 @@ class Database:
                             FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
                         )
                     ''')
+                    # keyset pages in the Subjects & Teachers manager
+                    await conn.execute('''
+                        CREATE INDEX IF NOT EXISTS idx_subjects_user_id
+                            ON subjects (user_id, id)
+                    ''')
+                    await conn.execute('''
+                        CREATE INDEX IF NOT EXISTS idx_teachers_user_id
+                            ON teachers (user_id, id)
+                    ''')
 
                     # 4. schedules (references users)
                     await conn.execute('''
@@ -104,6 +125,11 @@ class Database:
                             FOREIGN KEY (subject_id) REFERENCES subjects(id)    ON DELETE SET NULL
                         )
                     ''')
+                    # keyset pagination of the Materials list (newest first)
+                    await conn.execute('''
+                        CREATE INDEX IF NOT EXISTS idx_files_user_uploaded
+                            ON files (user_id, upload_date DESC, id DESC)
+                    ''')
 
                     # 7. subject_teachers (references subjects and teachers)
                     await conn.execute('''
@@ -115,6 +141,15 @@ class Database:
                             FOREIGN KEY (teacher_id) REFERENCES teachers (id) ON DELETE CASCADE
                         )
                     ''')
+                    # the PK covers subject → teachers; this one covers teacher → subjects
+                    await conn.execute('''
+                        CREATE INDEX IF NOT EXISTS idx_subject_teachers_teacher
+                            ON subject_teachers (teacher_id, subject_id)
+                    ''')
+                    await conn.execute('''
+                        CREATE INDEX IF NOT EXISTS idx_files_subject
+                            ON files (subject_id)
+                    ''')
 
                     # 8. tickets (references users)
                     await conn.execute('''
@@ -164,6 +199,136 @@ class Database:
             await conn.execute(
                 """CREATE INDEX IF NOT EXISTS idx_teachers_name_trgm
                 ON teachers USING GIN (name gin_trgm_ops)""")
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_tickets_ticket_trgm
+                ON tickets USING GIN (ticket gin_trgm_ops)""")
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_tickets_subject_trgm
+                ON tickets USING GIN (subject gin_trgm_ops)""")
+
+    async def _ensure_fts(self):
+        """
+        Make sure the full-text search column over file name, description and
+        extracted document text exists, together with its GIN index.
+        Call this from on_startup(), after _ensure_trgm().
+        """
+        async with self.pool.acquire() as conn:
+            # plain text pulled out of the uploaded document (filled in later)
+            await conn.execute(
+                "ALTER TABLE files ADD COLUMN IF NOT EXISTS content_text TEXT")
+            # 'simple' config: materials are a mix of Uzbek, Russian and English
+            await conn.execute(
+                """ALTER TABLE files ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', coalesce(file_name, '')),   'A') ||
+                    setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+                    setweight(to_tsvector('simple',
+                              left(coalesce(content_text, ''), 500000)),        'C')
+                ) STORED""")
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_files_search_vector
+                ON files USING GIN (search_vector)""")
+
+    async def _ensure_file_metadata(self):
+        """
+        Make sure the columns filled from the Telegram document and by the
+        background extraction pipeline exist. Call this from on_startup().
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                ALTER TABLE files
+                    ADD COLUMN IF NOT EXISTS file_unique_id TEXT,
+                    ADD COLUMN IF NOT EXISTS mime_type      TEXT,
+                    ADD COLUMN IF NOT EXISTS file_size      BIGINT,
+                    ADD COLUMN IF NOT EXISTS page_count     INTEGER,
+                    ADD COLUMN IF NOT EXISTS extracted_at   TIMESTAMP WITH TIME ZONE,
+                    ADD COLUMN IF NOT EXISTS extract_error  TEXT,
+                    ADD COLUMN IF NOT EXISTS content_hash   TEXT,     -- sha256 of the document
+                    ADD COLUMN IF NOT EXISTS content_source_id INTEGER,  -- row the text was copied from
+                    ADD COLUMN IF NOT EXISTS dedup_hits     INTEGER NOT NULL DEFAULT 0,
+                    -- how the file_id has to be sent back: 'document' or 'photo'
+                    ADD COLUMN IF NOT EXISTS media_type     TEXT NOT NULL DEFAULT 'document'
+            """)
+            # one row per document per user; other users' copies share extracted text
+            async with conn.transaction():
+                if await conn.fetchval("SELECT to_regclass('idx_files_user_unique_id')") is None:
+                    # rows recorded before the index existed may repeat a document:
+                    # keep each user's oldest copy and count the rest as duplicate uploads
+                    merged = await conn.fetchval("""
+                        WITH dups AS (
+                            SELECT f.id, k.keep_id, f.dedup_hits
+                            FROM files f
+                            JOIN (SELECT user_id, file_unique_id, MIN(id) AS keep_id
+                                  FROM files
+                                  WHERE file_unique_id IS NOT NULL
+                                  GROUP BY user_id, file_unique_id
+                                  HAVING COUNT(*) > 1) k
+                              ON f.user_id = k.user_id AND f.file_unique_id = k.file_unique_id
+                            WHERE f.id <> k.keep_id
+                        ),
+                        counted AS (
+                            UPDATE files f
+                            SET dedup_hits = f.dedup_hits + s.extra
+                            FROM (SELECT keep_id, COUNT(*) + SUM(dedup_hits) AS extra
+                                  FROM dups GROUP BY keep_id) s
+                            WHERE f.id = s.keep_id
+                        ),
+                        deleted AS (
+                            DELETE FROM files WHERE id IN (SELECT id FROM dups)
+                            RETURNING id
+                        )
+                        SELECT COUNT(*) FROM deleted
+                    """)
+                    if merged:
+                        logger.info(f"Merged {merged} duplicate file rows before indexing")
+                await conn.execute(
+                    """CREATE UNIQUE INDEX IF NOT EXISTS idx_files_user_unique_id
+                    ON files (user_id, file_unique_id) WHERE file_unique_id IS NOT NULL""")
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_files_unique_id
+                ON files (file_unique_id) WHERE file_unique_id IS NOT NULL""")
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_files_content_hash
+                ON files (content_hash) WHERE content_hash IS NOT NULL""")
+            # the extraction backlog is a small, shrinking slice of the table
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_files_pending_extraction
+                ON files (id) WHERE extracted_at IS NULL""")
+
+    async def _ensure_conversion_cache(self):
+        """
+        Table mapping a converted input to the Telegram file_id of its output,
+        so the same document is never converted twice. Call this from on_startup().
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS conversion_cache (
+                    input_key       TEXT NOT NULL,   -- 'u:<file_unique_id>' or 'h:<sha256>'
+                    conversion_type TEXT NOT NULL,
+                    output_file_id  TEXT NOT NULL,
+                    hits            INTEGER NOT NULL DEFAULT 0,
+                    created_at      TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                    last_used_at    TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (input_key, conversion_type)
+                )
+            """)
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_conversion_cache_last_used
+                ON conversion_cache (last_used_at DESC)""")
+
+    async def _ensure_ocr_cache(self):
+        """Recognized text per page fingerprint (see converters.pdf_page_hashes)."""
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_page_cache (
+                    page_hash    TEXT PRIMARY KEY,
+                    text         TEXT NOT NULL,
+                    last_used_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+                )
+            """)
+            await conn.execute(
+                """CREATE INDEX IF NOT EXISTS idx_ocr_page_cache_last_used
+                ON ocr_page_cache (last_used_at DESC)""")
 
     async def _day_bounds_utc(self, user_id: int, day: date):
         tz = await self.get_user_timezone(user_id)
@@ -465,51 +630,139 @@ class Database:
         file_name: str,
         subject_id: int | None,
         description: str,
+        file_unique_id: str | None = None,
+        mime_type: str | None = None,
+        file_size: int | None = None,
+        media_type: str = "document",
     ):
-        await self.add_user(user_id)
-        async with self.pool.acquire() as conn:
-               row = await conn.fetchrow('''
-        INSERT INTO files (user_id, telegram_file_id, subject_id,
-                           description, file_name, upload_date)
-        VALUES ($1, $2, $3, $4, $5, $6)
-        RETURNING id
-    ''',
-        user_id, telegram_file_id, subject_id, description,
-        file_name, datetime.now())
-        logger.info("Added file %s for user %s", row["id"], user_id)
-        return row["id"]
-
-    async def get_files_with_teachers(self, user_id: int):
         """
-        Return tuples:
-            (telegram_file_id, subject, teacher_names, description, file_id)
+        Insert a file and return (file_id, duplicate, extracted).
 
-        – Includes files that have *no subject* or whose subject has *no teachers*.
-        – Teacher names are comma‑separated and alphabetically ordered.
+        A document the user already has (same Telegram file_unique_id) is not
+        inserted again: its row id comes back with `duplicate` set. A document
+        some other row already has text for is inserted with that text copied
+        over, so `extracted` is True and it needs no background processing.
         """
+        await self.add_user(user_id)
+        for attempt in range(2):
+            try:
+                async with self.pool.acquire() as conn:
+                    row = await conn.fetchrow('''
+                        WITH existing AS (
+                            UPDATE files
+                            SET dedup_hits = dedup_hits + 1
+                            WHERE user_id = $1 AND file_unique_id = $7
+                            RETURNING id
+                        ),
+                        donor AS (
+                            SELECT id, content_text, page_count, content_hash
+                            FROM files
+                            WHERE file_unique_id = $7
+                            AND extracted_at IS NOT NULL AND extract_error IS NULL
+                            LIMIT 1
+                        ),
+                        inserted AS (
+                            INSERT INTO files (user_id, telegram_file_id, subject_id,
+                                               description, file_name, upload_date,
+                                               file_unique_id, mime_type, file_size,
+                                               content_text, page_count, content_hash,
+                                               content_source_id, extracted_at, media_type)
+                            SELECT $1, $2, $3, $4, $5, $6, $7, $8, $9,
+                                   d.content_text, d.page_count, d.content_hash,
+                                   d.id, CASE WHEN d.id IS NOT NULL THEN NOW() END, $10
+                            FROM (SELECT 1) AS one
+                            LEFT JOIN donor d ON TRUE
+                            WHERE NOT EXISTS (SELECT 1 FROM existing)
+                            RETURNING id, extracted_at IS NOT NULL AS extracted
+                        )
+                        SELECT id, FALSE AS duplicate, extracted FROM inserted
+                        UNION ALL
+                        SELECT id, TRUE, TRUE FROM existing
+                    ''',
+                        user_id, telegram_file_id, subject_id, description,
+                        file_name, datetime.now(), file_unique_id, mime_type, file_size,
+                        media_type)
+                break
+            except asyncpg.UniqueViolationError:
+                # the same document raced in from a parallel upload – it exists now
+                if attempt:
+                    raise
+        if row["duplicate"]:
+            logger.info("Duplicate upload of file %s by user %s", row["id"], user_id)
+        else:
+            self.search_cache.invalidate_user(user_id)
+            logger.info("Added file %s for user %s", row["id"], user_id)
+        return row["id"], row["duplicate"], row["extracted"]
+
+    async def get_files_page(
+        self,
+        user_id: int,
+        limit: int = 5,
+        cursor: tuple[datetime, int] | None = None,
+        backward: bool = False,
+    ):
+        """
+        Keyset‑paginated list of the user's files, newest first, with their
+        subject and teacher names.  Files with no subject, or whose subject has
+        no teachers, are included; teacher names are comma‑separated and
+        alphabetically ordered.
+
+        `cursor` is the (upload_date, id) of the row the page starts after
+        (or before, when `backward` is True).  Only the page rows are joined
+        with subjects/teachers, so the cost does not grow with the library.
+
+        Return (rows, has_more) where rows are tuples:
+            (telegram_file_id, subject, teacher_names, description, file_id, upload_date, file_name,
+             media_type)
+        and `has_more` tells whether more rows exist in the walked direction.
+        """
+        order = "ASC" if backward else "DESC"
+        args = [user_id, limit + 1]
+        keyset = ""
+        if cursor is not None:
+            keyset = f"AND (f.upload_date, f.id) {'>' if backward else '<'} ($3, $4)"
+            args += list(cursor)
+
         async with self.pool.acquire() as conn:
             rows = await conn.fetch(
-                """
+                f"""
+                WITH page AS (
+                    SELECT f.id, f.telegram_file_id, f.file_name, f.subject_id,
+                           f.description, f.upload_date, f.media_type
+                    FROM files AS f
+                    WHERE f.user_id = $1 {keyset}
+                    ORDER BY f.upload_date {order}, f.id {order}
+                    LIMIT $2
+                )
                 SELECT
-                    f.id,
-                    f.telegram_file_id,
-                    s.name AS subject,                                         -- may be NULL
+                    p.id,
+                    p.telegram_file_id,
+                    s.name AS subject,
                     COALESCE(
                         NULLIF( string_agg(DISTINCT t.name, ', ' ORDER BY t.name), '' ),
                         'No teacher'
                     ) AS teacher_names,
-                    f.description
-                FROM files AS f
-                LEFT JOIN subjects          AS s  ON f.subject_id = s.id
+                    p.description,
+                    p.upload_date,
+                    p.file_name,
+                    p.media_type
+                FROM page AS p
+                LEFT JOIN subjects          AS s  ON p.subject_id = s.id
                 LEFT JOIN subject_teachers  AS st ON s.id        = st.subject_id
                 LEFT JOIN teachers          AS t  ON st.teacher_id = t.id
-                WHERE f.user_id = $1
-                GROUP BY f.id, s.name, f.description
-                ORDER BY f.upload_date DESC
+                GROUP BY p.id, p.telegram_file_id, s.name, p.description, p.upload_date, p.file_name,
+                         p.media_type
+                ORDER BY p.upload_date DESC, p.id DESC
                 """,
-                user_id,
+                *args,
             )
 
+        rows = list(rows)
+        has_more = len(rows) > limit
+        if has_more:
+            # the probe row is the oldest one when walking forward, the newest one backward
+            rows = rows[1:] if backward else rows[:limit]
+
         return [
             (
                 row["telegram_file_id"],
@@ -517,11 +770,50 @@ class Database:
                 row["teacher_names"],
                 row["description"],
                 row["id"],
+                row["upload_date"],
+                row["file_name"],
+                row["media_type"],
             )
             for row in rows
-        ]
+        ], has_more
 
-    async def update_file(self, user_id: int, file_id: int, subject_id: int = None, description: str = None, telegram_file_id: str = None):
+    async def get_file(self, user_id: int, file_id: int):
+        """
+        Single file of `user_id` with its subject and teacher names, or None.
+        Used to send a document on demand from the compact Materials list.
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                return await conn.fetchrow('''
+                    SELECT
+                        f.id,
+                        f.telegram_file_id,
+                        f.file_name,
+                        f.description,
+                        f.media_type,
+                        s.name AS subject,
+                        COALESCE(
+                            (SELECT string_agg(t.name, ', ' ORDER BY t.name)
+                             FROM subject_teachers st
+                             JOIN teachers t ON t.id = st.teacher_id
+                             WHERE st.subject_id = f.subject_id),
+                            'No teacher'
+                        ) AS teacher_names
+                    FROM files f
+                    LEFT JOIN subjects s ON s.id = f.subject_id
+                    WHERE f.user_id = $1 AND f.id = $2
+                ''', user_id, file_id)
+        except Exception as e:
+            logger.error(f"Error getting file {file_id} for user {user_id}: {str(e)}")
+            raise
+
+    async def update_file(self, user_id: int, file_id: int, subject_id: int = None, description: str = None, telegram_file_id: str = None,
+                          file_unique_id: str = None, mime_type: str = None, file_size: int = None,
+                          media_type: str = "document") -> bool:
+        """
+        Update the given fields. Returns False when the replacement document is
+        one the user already has in another row (nothing is changed then).
+        """
         try:
             async with self.pool.acquire() as conn:
                 if subject_id is not None:
@@ -537,20 +829,159 @@ class Database:
                         WHERE id = $2 AND user_id = $3
                     ''', description, file_id, user_id)
                 if telegram_file_id:
-                    await conn.execute('''
-                        UPDATE files
-                        SET telegram_file_id = $1
-                        WHERE id = $2 AND user_id = $3
-                    ''', telegram_file_id, file_id, user_id)
+                    # new document – its extracted text has to be rebuilt
+                    try:
+                        await conn.execute('''
+                            UPDATE files
+                            SET telegram_file_id = $1, file_unique_id = $4,
+                                mime_type = $5, file_size = $6, media_type = $7,
+                                content_text = NULL, page_count = NULL,
+                                content_hash = NULL, content_source_id = NULL,
+                                extracted_at = NULL, extract_error = NULL
+                            WHERE id = $2 AND user_id = $3
+                        ''', telegram_file_id, file_id, user_id,
+                            file_unique_id, mime_type, file_size, media_type)
+                    except asyncpg.UniqueViolationError:
+                        logger.info(f"User {user_id} replaced file {file_id} with a document they already have")
+                        return False
+                self.search_cache.invalidate_user(user_id)
                 logger.info(f"Updated file {file_id} for user {user_id}")
+                return True
         except Exception as e:
             logger.error(f"Error updating file {file_id} for user {user_id}: {str(e)}")
             raise
 
+    async def set_media_type(self, user_id: int, file_id: int, media_type: str):
+        """Correct how a file is sent back ('document' or 'photo')."""
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute(
+                    "UPDATE files SET media_type = $1 WHERE id = $2 AND user_id = $3",
+                    media_type, file_id, user_id
+                )
+            self.search_cache.invalidate_user(user_id)
+        except Exception as e:
+            logger.error(f"Error setting media type of file {file_id}: {str(e)}")
+            raise
+
+    async def get_files_pending_extraction(self, limit: int, exclude: list[int] = ()):
+        """
+        Return up to `limit` records (id, telegram_file_id, file_name,
+        mime_type, file_size) whose text has not been extracted yet,
+        oldest first, skipping ids already queued.
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                """
+                SELECT id, telegram_file_id, file_name, mime_type, file_size
+                FROM files
+                WHERE extracted_at IS NULL
+                AND id <> ALL($2::int[])
+                ORDER BY id
+                LIMIT $1
+                """,
+                limit, list(exclude)
+            )
+
+    async def link_file_content(self, file_id: int, telegram_file_id: str,
+                                content_hash: str | None = None) -> bool:
+        """
+        Copy extracted text from another row holding the same document – same
+        file_unique_id, or same `content_hash` once the bytes are known.
+        Return True when a donor was found and nothing needs extracting.
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                WITH target AS (
+                    SELECT id, file_unique_id
+                    FROM files
+                    WHERE id = $1 AND telegram_file_id = $2
+                ),
+                donor AS (
+                    SELECT d.id, d.content_text, d.page_count, d.content_hash
+                    FROM files d, target t
+                    WHERE d.id <> t.id
+                    AND d.extracted_at IS NOT NULL AND d.extract_error IS NULL
+                    AND (d.file_unique_id = t.file_unique_id OR d.content_hash = $3::text)
+                    LIMIT 1
+                )
+                UPDATE files AS f
+                SET content_text      = donor.content_text,
+                    page_count        = donor.page_count,
+                    content_hash      = COALESCE($3::text, donor.content_hash),
+                    content_source_id = donor.id,
+                    extract_error     = NULL,
+                    extracted_at      = NOW()
+                FROM donor
+                WHERE f.id = $1
+                RETURNING donor.id, f.user_id
+                """,
+                file_id, telegram_file_id, content_hash
+            )
+        if row:
+            self.search_cache.invalidate_user(row["user_id"])
+            logger.info("Reused extracted text of file %s for file %s", row["id"], file_id)
+        return row is not None
+
+    async def get_dedup_report(self, user_id: int | None = None):
+        """
+        Return asyncpg.Record summarising what deduplication saved, for one
+        user or (user_id None) the whole bot:
+            duplicate_uploads / duplicate_bytes – re-uploads that created no row
+            linked_files / linked_bytes         – documents whose text was copied
+                                                  instead of downloaded and parsed
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(
+                """
+                SELECT
+                    COALESCE(SUM(dedup_hits), 0)                              AS duplicate_uploads,
+                    COALESCE(SUM(dedup_hits * COALESCE(file_size, 0)), 0)     AS duplicate_bytes,
+                    COUNT(*) FILTER (WHERE content_source_id IS NOT NULL)     AS linked_files,
+                    COALESCE(SUM(file_size)
+                             FILTER (WHERE content_source_id IS NOT NULL), 0) AS linked_bytes
+                FROM files
+                WHERE $1::bigint IS NULL OR user_id = $1
+                """,
+                user_id
+            )
+
+    async def save_file_content(self, file_id: int, telegram_file_id: str,
+                                content_text: str | None, page_count: int | None,
+                                file_size: int | None, error: str | None = None,
+                                content_hash: str | None = None):
+        """
+        Store the extraction result; `error` marks files that could not be read.
+        Ignored when the document was replaced while it was being processed.
+        """
+        try:
+            async with self.pool.acquire() as conn:
+                owner = await conn.fetchval(
+                    """
+                    UPDATE files
+                    SET content_text  = $2,
+                        page_count    = $3,
+                        file_size     = COALESCE($4, file_size),
+                        extract_error = $5,
+                        content_hash  = COALESCE($7, content_hash),
+                        extracted_at  = NOW()
+                    WHERE id = $1 AND telegram_file_id = $6
+                    RETURNING user_id
+                    """,
+                    file_id, content_text, page_count, file_size, error,
+                    telegram_file_id, content_hash
+                )
+            self.search_cache.invalidate_user(owner)
+        except Exception as e:
+            logger.error(f"Error saving extracted content for file {file_id}: {str(e)}")
+            raise
+
     async def delete_file(self, user_id: int, file_id: int):
         try:
             async with self.pool.acquire() as conn:
                 await conn.execute('DELETE FROM files WHERE id = $1 AND user_id = $2', file_id, user_id)
+                self.search_cache.invalidate_user(user_id)
                 logger.info(f"Deleted file {file_id} for user {user_id}")
         except Exception as e:
             logger.error(f"Error deleting file {file_id} for user {user_id}: {str(e)}")
@@ -558,26 +989,6 @@ class Database:
 
     # Subject functions
 
-    # Count how many files are uploaded by a user and linked to this teacher (via subject)
-    async def count_files_by_teacher(self, user_id: int, teacher_id: int):
-        async with self.pool.acquire() as conn:
-            return await conn.fetchval("""
-                SELECT COUNT(DISTINCT f.id)
-                FROM files f
-                JOIN subjects s ON f.subject_id = s.id
-                JOIN subject_teachers st ON s.id = st.subject_id
-                WHERE f.user_id = $1 AND st.teacher_id = $2
-            """, user_id, teacher_id)
-
-    # Count files linked directly to a subject
-    async def count_files_by_subject(self, user_id: int, subject_id: int):
-        async with self.pool.acquire() as conn:
-            return await conn.fetchval("""
-                SELECT COUNT(*)
-                FROM files
-                WHERE user_id = $1 AND subject_id = $2
-            """, user_id, subject_id)
-
     async def add_subject(self, user_id: int, name: str):
         try:
             async with self.pool.acquire() as conn:
@@ -609,6 +1020,7 @@ class Database:
                     SET name = $1
                     WHERE id = $2 AND user_id = $3
                 ''', new_name, subject_id, user_id)
+                self.search_cache.invalidate_user(user_id)
                 logger.info("Renamed subject %s → %s for user %s",
                             subject_id, new_name, user_id)
         except Exception as e:
@@ -622,6 +1034,7 @@ class Database:
                     DELETE FROM subjects
                     WHERE id = $1 AND user_id = $2
                 ''', subject_id, user_id)
+                self.search_cache.invalidate_user(user_id)
                 logger.info("Deleted subject %s for user %s", subject_id, user_id)
         except Exception as e:
             logger.error("Error deleting subject %s: %s", subject_id, e)
@@ -659,6 +1072,7 @@ class Database:
                     SET name = $1
                     WHERE id = $2 AND user_id = $3
                 ''', new_name, teacher_id, user_id)
+                self.search_cache.invalidate_user(user_id)
                 logger.info("Renamed teacher %s → %s for user %s",
                             teacher_id, new_name, user_id)
         except Exception as e:
@@ -672,6 +1086,7 @@ class Database:
                     DELETE FROM teachers
                     WHERE id = $1 AND user_id = $2
                 ''', teacher_id, user_id)
+                self.search_cache.invalidate_user(user_id)
                 logger.info("Deleted teacher %s for user %s", teacher_id, user_id)
         except Exception as e:
             logger.error("Error deleting teacher %s: %s", teacher_id, e)
@@ -681,73 +1096,66 @@ class Database:
     async def assign_teacher_to_subject(self, subject_id: int, teacher_id: int):
         try:
             async with self.pool.acquire() as conn:
-                await conn.execute('''
+                # teacher names show up in search results of the subject's owner
+                owner = await conn.fetchval('''
                     INSERT INTO subject_teachers (subject_id, teacher_id) VALUES ($1, $2)
                     ON CONFLICT DO NOTHING
+                    RETURNING (SELECT user_id FROM subjects WHERE id = subject_id)
                 ''', subject_id, teacher_id)
+                self.search_cache.invalidate_user(owner)
                 logger.info(f"Assigned teacher {teacher_id} to subject {subject_id}")
         except Exception as e:
             logger.error(f"Error assigning teacher to subject: {str(e)}")
             raise
 
-    async def get_teachers_for_subject(self, subject_id: int):
-        try:
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch('''
-                    SELECT t.id, t.name FROM teachers t
-                    JOIN subject_teachers st ON t.id = st.teacher_id
-                    WHERE st.subject_id = $1
-                ''', subject_id)
-                return [(row['id'], row['name']) for row in rows]
-        except Exception as e:
-            logger.error(f"Error getting teachers for subject {subject_id}: {str(e)}")
-            raise
-
-    async def get_teachers_page(self, user_id: int, page: int):
+    async def _get_named_page(self, table: str, user_id: int, limit: int,
+                              after_id: int | None, before_id: int | None):
         """
-        Return (rows, total_count) where `rows` is a list of (id, name)
-        for the requested page (1‑based). Uses PAGE_SIZE = 5.
+        Keyset page over `teachers` / `subjects` ordered by id.
+
+        Rows and the user's total come back in one statement: the window count
+        is taken over all of the user's rows before the keyset filter applies.
+        Return (rows, total, has_more) where `rows` is a list of (id, name).
         """
-        offset = (page - 1) * 5
+        if before_id is not None:
+            keyset, order, cursor = "id < $2", "DESC", before_id
+        else:
+            keyset, order, cursor = "id > $2", "ASC", after_id or 0
         async with self.pool.acquire() as conn:
             rows = await conn.fetch(
-                """
-                SELECT id, name
-                FROM teachers
-                WHERE user_id = $1
-                ORDER BY id
-                LIMIT $2 OFFSET $3
+                f"""
+                SELECT id, name, total
+                FROM (
+                    SELECT id, name, COUNT(*) OVER () AS total
+                    FROM {table}
+                    WHERE user_id = $1
+                ) AS owned
+                WHERE {keyset}
+                ORDER BY id {order}
+                LIMIT $3
                 """,
-                user_id, 5, offset
-            )
-            total = await conn.fetchval(
-                "SELECT COUNT(*) FROM teachers WHERE user_id = $1",
-                user_id,
+                user_id, cursor, limit + 1
             )
-        return [(r["id"], r["name"]) for r in rows], total
+        has_more = len(rows) > limit
+        rows = sorted(rows[:limit], key=lambda r: r["id"])
+        total = rows[0]["total"] if rows else 0
+        return [(r["id"], r["name"]) for r in rows], total, has_more
 
+    async def get_teachers_page(self, user_id: int, after_id: int | None = None,
+                                before_id: int | None = None, limit: int = 5):
+        """
+        Return (rows, total_count, has_more) where `rows` is a list of (id, name)
+        with ids greater than `after_id` (or, walking back, less than `before_id`).
+        """
+        return await self._get_named_page("teachers", user_id, limit, after_id, before_id)
 
-    async def get_subjects_page(self, user_id: int, page: int):
+
+    async def get_subjects_page(self, user_id: int, after_id: int | None = None,
+                                before_id: int | None = None, limit: int = 5):
         """
         Same as get_teachers_page, but for subjects.
         """
-        offset = (page - 1) * 5
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT id, name
-                FROM subjects
-                WHERE user_id = $1
-                ORDER BY id
-                LIMIT $2 OFFSET $3
-                """,
-                user_id, 5, offset
-            )
-            total = await conn.fetchval(
-                "SELECT COUNT(*) FROM subjects WHERE user_id = $1",
-                user_id,
-            )
-        return [(r["id"], r["name"]) for r in rows], total
+        return await self._get_named_page("subjects", user_id, limit, after_id, before_id)
 
     async def get_teacher(self, user_id: int, teacher_id: int):
         """
@@ -770,66 +1178,244 @@ class Database:
                 subject_id, user_id
             )
 
+    async def get_teacher_card(self, user_id: int, teacher_id: int):
+        """
+        Return asyncpg.Record with (id, name, subjects, file_count) for one
+        teacher, where `subjects` is an alphabetical list of subject names.
+        None when the teacher does not exist.
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(
+                """
+                SELECT
+                    t.id,
+                    t.name,
+                    COALESCE(
+                        (SELECT array_agg(s.name ORDER BY s.name)
+                         FROM subject_teachers st
+                         JOIN subjects s ON s.id = st.subject_id
+                         WHERE st.teacher_id = t.id),
+                        '{}'
+                    ) AS subjects,
+                    (SELECT COUNT(DISTINCT f.id)
+                     FROM subject_teachers st
+                     JOIN files f ON f.subject_id = st.subject_id
+                     WHERE st.teacher_id = t.id AND f.user_id = $2) AS file_count
+                FROM teachers t
+                WHERE t.id = $1 AND t.user_id = $2
+                """,
+                teacher_id, user_id
+            )
+
+    async def get_subject_card(self, user_id: int, subject_id: int):
+        """
+        Return asyncpg.Record with (id, name, teachers, file_count) for one
+        subject, where `teachers` is an alphabetical list of teacher names.
+        None when the subject does not exist.
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(
+                """
+                SELECT
+                    s.id,
+                    s.name,
+                    COALESCE(
+                        (SELECT array_agg(t.name ORDER BY t.name)
+                         FROM subject_teachers st
+                         JOIN teachers t ON t.id = st.teacher_id
+                         WHERE st.subject_id = s.id),
+                        '{}'
+                    ) AS teachers,
+                    (SELECT COUNT(*)
+                     FROM files f
+                     WHERE f.subject_id = s.id AND f.user_id = $2) AS file_count
+                FROM subjects s
+                WHERE s.id = $1 AND s.user_id = $2
+                """,
+                subject_id, user_id
+            )
+
     # Search files
-    async def search_files(self, user_id: int, keyword: str):
+    async def _fetch_file_rows(self, conn, matched_sql: str, *args):
+        """
+        Enrich the file ids selected by `matched_sql` (which must yield an `id`
+        and a sortable `ord`; any further columns are passed through) with
+        subject and teacher names. Records come back in `ord` order.
+        """
+        return await conn.fetch(f"""
+            WITH matched AS ({matched_sql})
+            SELECT
+                m.*,
+                f.telegram_file_id,
+                f.file_name,
+                f.media_type,
+                f.subject_id,
+                s.name AS subject,                                         -- may be NULL
+                COALESCE(
+                    (SELECT string_agg(DISTINCT t.name, ', ' ORDER BY t.name)
+                     FROM subject_teachers st
+                     JOIN teachers t ON st.teacher_id = t.id
+                     WHERE st.subject_id = f.subject_id),
+                    'No teacher'
+                ) AS teacher_names,
+                f.description
+            FROM matched AS m
+            JOIN files          AS f ON f.id         = m.id
+            LEFT JOIN subjects  AS s ON f.subject_id = s.id
+            ORDER BY m.ord
+        """, *args)
+
+    @staticmethod
+    def _file_row(r):
+        """
+        (telegram_file_id, subject, teacher_names, description, file_id, subject_id, snippet,
+         file_name, media_type)
+        """
+        return (r["telegram_file_id"], r["subject"], r["teacher_names"],
+                r["description"], r["id"], r["subject_id"], r.get("snippet"),
+                r["file_name"], r["media_type"])
+
+    async def search_files(self, user_id: int, keyword: str,
+                           limit: int = 5, offset: int = 0):
         """
-        Returns two lists:
-            hits         – exact/ILIKE matches first
-            suggestions  – closest fuzzy‑matches when there were no hits
-        Each list contains tuples:
-            (telegram_file_id, subject, description, file_id)
+        Returns (hits, suggestions, has_more):
+            hits         – one page of full-text / ILIKE matches, best ts_rank
+                           first, then newest first
+            suggestions  – up to five trigram matches when there were no hits at all
+            has_more     – whether another page of hits follows
+        Each list contains the enriched Materials tuples plus a snippet:
+            (telegram_file_id, subject, teacher_names, description, file_id,
+             subject_id, snippet, file_name, media_type)
+        `snippet` is a ts_headline excerpt with matches wrapped in <b>…</b>
+        (None when only the subject or teacher name matched).
+
+        Full-text matches over name, description and extracted text come from
+        the search_vector GIN index. Both passes run in one statement. The
+        fuzzy pass only runs when the exact one is empty and probes file,
+        subject and teacher names each through its own GIN trigram index with
+        the `%` / `<%` operators, so only rows above pg_trgm's similarity
+        thresholds are ever ranked.
+
+        Results are cached per (user, normalized keyword, page) and dropped
+        whenever that user's files, subjects, teachers or tickets are written.
         """
+        cache_key = (user_id, self.search_cache.normalize(keyword), limit, offset)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            hits, suggestions, has_more = cached
+            return list(hits), list(suggestions), has_more
+        generation = self.search_cache.generation(user_id)
+
         try:
             kw = f"%{keyword}%"
             async with self.pool.acquire() as conn:
-                # 1️⃣ exact / ILIKE search across all three dimensions
-                rows = await conn.fetch("""
-                    SELECT
-                        f.id,
-                        f.telegram_file_id,
-                        COALESCE(s.name, '—') AS subject,
-                        f.description
-                    FROM files               f
-                    LEFT JOIN subjects          s  ON f.subject_id = s.id
-                    LEFT JOIN subject_teachers  st ON s.id         = st.subject_id
-                    LEFT JOIN teachers          t  ON st.teacher_id = t.id
-                    WHERE f.user_id = $1
-                    AND (
-                        f.file_name ILIKE $2
-                        OR s.name      ILIKE $2
-                        OR t.name      ILIKE $2
-                    )
-                    GROUP BY f.id, f.telegram_file_id, subject, f.description
-                    ORDER BY MAX(f.upload_date) DESC        -- newest first
-                """, user_id, kw)
-
-                hits = [(r['telegram_file_id'], r['subject'], r['description'], r['id'])
-                        for r in rows]
-
-                # 2️⃣ if nothing found, offer the five closest by trigram similarity
-                suggestions: list[tuple] = []
-                if not hits:
-                    rows = await conn.fetch("""
-                        SELECT DISTINCT f.id, f.telegram_file_id,
-                            COALESCE(s.name, '—') AS subject,
-                            f.description,
-                            GREATEST(
-                                similarity(f.file_name, $2),
-                                similarity(s.name,       $2),
-                                similarity(t.name,       $2)
-                            ) AS sim
+                rows = await self._fetch_file_rows(conn, """
+                    WITH q AS (
+                        SELECT websearch_to_tsquery('simple', $5) AS tsq
+                    ),
+                    exact AS (
+                        -- 1️⃣ full-text + ILIKE search, one index probe per field
+                        SELECT id, MAX(rank) AS rank, MAX(upload_date) AS upload_date
+                        FROM (
+                            SELECT f.id, ts_rank(f.search_vector, q.tsq) AS rank, f.upload_date
+                            FROM files f, q
+                            WHERE f.user_id = $1
+                            AND f.search_vector @@ q.tsq
+                            UNION ALL
+                            SELECT f.id, 0::real, f.upload_date
+                            FROM files f
+                            WHERE f.user_id = $1
+                            AND f.file_name ILIKE $2
+                            UNION ALL
+                            SELECT f.id, 0, f.upload_date
+                            FROM subjects s
+                            JOIN files f ON f.subject_id = s.id
+                            WHERE s.user_id = $1 AND f.user_id = $1
+                            AND s.name ILIKE $2
+                            UNION ALL
+                            SELECT f.id, 0, f.upload_date
+                            FROM teachers t
+                            JOIN subject_teachers st ON st.teacher_id = t.id
+                            JOIN files f ON f.subject_id = st.subject_id
+                            WHERE t.user_id = $1 AND f.user_id = $1
+                            AND t.name ILIKE $2
+                        ) AS matches
+                        GROUP BY id
+                    ),
+                    -- 2️⃣ otherwise trigram candidates, one index probe per field
+                    name_hits AS (
+                        SELECT f.id,
+                               GREATEST(similarity(f.file_name, $5),
+                                        word_similarity($5, f.file_name)) AS sim
                         FROM files f
-                        LEFT JOIN subjects          s  ON f.subject_id = s.id
-                        LEFT JOIN subject_teachers  st ON s.id       = st.subject_id
-                        LEFT JOIN teachers          t  ON st.teacher_id = t.id
-                        WHERE f.user_id = $1
-                        ORDER BY sim DESC
+                        WHERE NOT EXISTS (SELECT 1 FROM exact)
+                        AND f.user_id = $1
+                        AND (f.file_name % $5 OR $5 <% f.file_name)
+                    ),
+                    label_hits AS (
+                        SELECT s.id AS subject_id,
+                               GREATEST(similarity(s.name, $5),
+                                        word_similarity($5, s.name)) AS sim
+                        FROM subjects s
+                        WHERE NOT EXISTS (SELECT 1 FROM exact)
+                        AND s.user_id = $1
+                        AND (s.name % $5 OR $5 <% s.name)
+                        UNION ALL
+                        SELECT st.subject_id,
+                               GREATEST(similarity(t.name, $5),
+                                        word_similarity($5, t.name)) AS sim
+                        FROM teachers t
+                        JOIN subject_teachers st ON st.teacher_id = t.id
+                        WHERE NOT EXISTS (SELECT 1 FROM exact)
+                        AND t.user_id = $1
+                        AND (t.name % $5 OR $5 <% t.name)
+                    ),
+                    fuzzy AS (
+                        SELECT id, MAX(sim) AS sim
+                        FROM (
+                            SELECT id, sim FROM name_hits
+                            UNION ALL
+                            SELECT f.id, l.sim
+                            FROM label_hits l
+                            JOIN files f ON f.subject_id = l.subject_id
+                            WHERE f.user_id = $1
+                        ) AS candidates
+                        GROUP BY id
+                        ORDER BY sim DESC, id DESC
                         LIMIT 5
-                    """, user_id, keyword)
-                    suggestions = [(r['telegram_file_id'], r['subject'],
-                                    r['description'], r['id']) for r in rows]
-
-            return hits, suggestions
+                    ),
+                    page AS (
+                        SELECT id, rank,
+                               ROW_NUMBER() OVER (ORDER BY rank DESC, upload_date DESC, id DESC) AS ord
+                        FROM exact
+                        ORDER BY ord
+                        LIMIT $3 OFFSET $4
+                    )
+                    -- snippets are only built for the rows on this page
+                    SELECT p.id, p.ord, FALSE AS fuzzy,
+                           CASE WHEN p.rank > 0 THEN ts_headline(
+                               'simple',
+                               concat_ws(' … ', f.description, left(f.content_text, 500000)),
+                               q.tsq,
+                               'MaxFragments=2, MaxWords=14, MinWords=5, StartSel=<b>, StopSel=</b>'
+                           ) END AS snippet
+                    FROM page p
+                    JOIN files f ON f.id = p.id
+                    CROSS JOIN q
+                    UNION ALL
+                    SELECT id,
+                           ROW_NUMBER() OVER (ORDER BY sim DESC, id DESC) AS ord,
+                           TRUE AS fuzzy,
+                           NULL AS snippet
+                    FROM fuzzy
+                """, user_id, kw, limit + 1, offset, keyword)
+
+            hits = [self._file_row(r) for r in rows if not r["fuzzy"]]
+            suggestions = [self._file_row(r) for r in rows if r["fuzzy"]] if offset == 0 else []
+            has_more = len(hits) > limit
+            hits = hits[:limit]
+            self.search_cache.put(cache_key, (tuple(hits), tuple(suggestions), has_more), generation)
+            return hits, suggestions, has_more
         except Exception as e:
             logger.error(f"Error searching files for user {user_id}: {str(e)}")
             raise
@@ -844,6 +1430,7 @@ class Database:
                     VALUES ($1, $2, $3)
                     RETURNING id
                 ''', user_id, subject, ticket)
+                self.search_cache.invalidate_user(user_id)
                 logger.info(f"Added ticket {row['id']} for user {user_id}")
                 return row['id']
         except Exception as e:
@@ -876,6 +1463,46 @@ class Database:
             logger.error(f"Error getting all tickets for user {user_id}: {str(e)}")
             raise
 
+    async def search_tickets(self, user_id: int, keyword: str,
+                             limit: int = 20, offset: int = 0):
+        """
+        Return (rows, has_more) where rows are (id, subject, ticket) whose text
+        or subject contains `keyword` or is trigram-similar to it, best first.
+        Cached like search_files.
+        """
+        cache_key = (user_id, "ticket:" + self.search_cache.normalize(keyword), limit, offset)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            rows, has_more = cached
+            return list(rows), has_more
+        generation = self.search_cache.generation(user_id)
+
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch('''
+                    SELECT id, subject, ticket
+                    FROM tickets
+                    WHERE user_id = $1
+                    AND (
+                        ticket  ILIKE $2 OR subject ILIKE $2
+                        OR $3 <% ticket OR $3 <% subject
+                    )
+                    ORDER BY (ticket ILIKE $2 OR subject ILIKE $2) DESC,
+                             GREATEST(word_similarity($3, ticket),
+                                      word_similarity($3, subject)) DESC,
+                             id
+                    LIMIT $4 OFFSET $5
+                ''', user_id, f"%{keyword}%", keyword, limit + 1, offset)
+        except Exception as e:
+            logger.error(f"Error searching tickets for user {user_id}: {str(e)}")
+            raise
+
+        rows = [(r["id"], r["subject"], r["ticket"]) for r in rows]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        self.search_cache.put(cache_key, (tuple(rows), has_more), generation)
+        return rows, has_more
+
     async def get_ticket_subjects(self, user_id: int):
         try:
             async with self.pool.acquire() as conn:
@@ -892,11 +1519,13 @@ class Database:
     async def update_ticket(self, ticket_id: int, ticket: str):
         try:
             async with self.pool.acquire() as conn:
-                await conn.execute('''
+                owner = await conn.fetchval('''
                     UPDATE tickets
                     SET ticket = $1
                     WHERE id = $2
+                    RETURNING user_id
                 ''', ticket, ticket_id)
+                self.search_cache.invalidate_user(owner)
                 logger.info(f"Updated ticket {ticket_id}")
         except Exception as e:
             logger.error(f"Error updating ticket {ticket_id}: {str(e)}")
@@ -905,7 +1534,9 @@ class Database:
     async def delete_ticket(self, ticket_id: int):
         try:
             async with self.pool.acquire() as conn:
-                await conn.execute('DELETE FROM tickets WHERE id = $1', ticket_id)
+                owner = await conn.fetchval(
+                    'DELETE FROM tickets WHERE id = $1 RETURNING user_id', ticket_id)
+                self.search_cache.invalidate_user(owner)
                 logger.info(f"Deleted ticket {ticket_id}")
         except Exception as e:
             logger.error(f"Error deleting ticket {ticket_id}: {str(e)}")
@@ -915,6 +1546,7 @@ class Database:
         try:
             async with self.pool.acquire() as conn:
                 await conn.execute('DELETE FROM tickets WHERE user_id = $1', user_id)
+                self.search_cache.invalidate_user(user_id)
                 logger.info(f"Deleted all tickets for user {user_id}")
         except Exception as e:
             logger.error(f"Error deleting all tickets for user {user_id}: {str(e)}")
@@ -958,6 +1590,123 @@ class Database:
             logger.error(f"Error logging conversion for user {user_id}: {str(e)}")
             raise
 
+    async def log_conversions(self, user_id: int, conversion_types: list[str]):
+        """Log a batch of conversions in one INSERT."""
+        await self.add_user(user_id)
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute('''
+                    INSERT INTO conversions (user_id, conversion_type, timestamp)
+                    SELECT $1, t, $3 FROM unnest($2::text[]) AS t
+                ''', user_id, conversion_types, datetime.now())
+                logger.info(f"Logged {len(conversion_types)} conversions for user {user_id}")
+        except Exception as e:
+            logger.error(f"Error logging conversions for user {user_id}: {str(e)}")
+            raise
+
+    async def get_cached_conversion(self, input_key: str, conversion_type: str):
+        """Output file_id stored for (input_key, conversion_type), or None. Counts the hit."""
+        try:
+            async with self.pool.acquire() as conn:
+                return await conn.fetchval('''
+                    UPDATE conversion_cache
+                    SET hits = hits + 1, last_used_at = NOW()
+                    WHERE input_key = $1 AND conversion_type = $2
+                    RETURNING output_file_id
+                ''', input_key, conversion_type)
+        except Exception as e:
+            logger.error(f"Error reading conversion cache for {input_key}: {str(e)}")
+            raise
+
+    async def cache_conversion(self, input_keys: list[str], conversion_type: str,
+                               output_file_id: str):
+        """Remember `output_file_id` under every key the input is known by."""
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute('''
+                    INSERT INTO conversion_cache (input_key, conversion_type, output_file_id)
+                    SELECT k, $2, $3 FROM unnest($1::text[]) AS k
+                    ON CONFLICT (input_key, conversion_type) DO UPDATE
+                    SET output_file_id = EXCLUDED.output_file_id,
+                        last_used_at   = NOW()
+                ''', input_keys, conversion_type, output_file_id)
+        except Exception as e:
+            logger.error(f"Error writing conversion cache for {input_keys}: {str(e)}")
+            raise
+
+    async def drop_cached_conversion(self, output_file_id: str):
+        """Forget an output Telegram no longer accepts."""
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute(
+                    'DELETE FROM conversion_cache WHERE output_file_id = $1', output_file_id)
+        except Exception as e:
+            logger.error(f"Error dropping cached conversion {output_file_id}: {str(e)}")
+            raise
+
+    async def prune_conversion_cache(self, max_entries: int) -> int:
+        """Evict least recently used entries beyond `max_entries`. Returns how many went."""
+        try:
+            async with self.pool.acquire() as conn:
+                deleted = await conn.fetch('''
+                    DELETE FROM conversion_cache
+                    WHERE (input_key, conversion_type) IN (
+                        SELECT input_key, conversion_type
+                        FROM conversion_cache
+                        ORDER BY last_used_at DESC
+                        OFFSET $1
+                    )
+                    RETURNING 1
+                ''', max_entries)
+                return len(deleted)
+        except Exception as e:
+            logger.error(f"Error pruning conversion cache: {str(e)}")
+            raise
+
+    async def get_ocr_pages(self, page_hashes: list[str]) -> dict[str, str]:
+        """Cached OCR text for the given page fingerprints, as {hash: text}."""
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch('''
+                    UPDATE ocr_page_cache
+                    SET last_used_at = NOW()
+                    WHERE page_hash = ANY($1::text[])
+                    RETURNING page_hash, text
+                ''', page_hashes)
+                return {r["page_hash"]: r["text"] for r in rows}
+        except Exception as e:
+            logger.error(f"Error reading OCR cache: {str(e)}")
+            raise
+
+    async def save_ocr_pages(self, pages: dict[str, str]):
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute('''
+                    INSERT INTO ocr_page_cache (page_hash, text)
+                    SELECT * FROM unnest($1::text[], $2::text[])
+                    ON CONFLICT (page_hash) DO UPDATE SET last_used_at = NOW()
+                ''', list(pages.keys()), list(pages.values()))
+        except Exception as e:
+            logger.error(f"Error writing OCR cache: {str(e)}")
+            raise
+
+    async def prune_ocr_cache(self, max_entries: int) -> int:
+        try:
+            async with self.pool.acquire() as conn:
+                deleted = await conn.fetch('''
+                    DELETE FROM ocr_page_cache
+                    WHERE page_hash IN (
+                        SELECT page_hash FROM ocr_page_cache
+                        ORDER BY last_used_at DESC
+                        OFFSET $1
+                    )
+                    RETURNING 1
+                ''', max_entries)
+                return len(deleted)
+        except Exception as e:
+            logger.error(f"Error pruning OCR cache: {str(e)}")
+            raise
+
     async def close_pool(self):
             if self.pool:
                 await self.pool.close()
@@ -0,0 +1,344 @@
+import os
+import asyncio
+import shutil
+import zipfile
+from collections import defaultdict
+from contextlib import suppress
+
+from aiogram import types
+from aiogram.dispatcher import FSMContext
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.exceptions import MessageNotModified, TelegramAPIError
+
+from config import (
+    BATCH_MAX_FILES,
+    BOT_API_MAX_UPLOAD_SIZE,
+    CONVERT_MAX_FILE_SIZE,
+    CONVERT_MAX_PAGES,
+    CONVERT_TIMEOUT,
+)
+from loader import bot, dp, logger
+from states.forms import ConvertForm
+from database.db import db
+from services import converters
+from services.conversion import (
+    conversion_engine,
+    ConversionRejected,
+    ConversionCancelled,
+    ConversionTimeout,
+)
+from services.downloads import download_to, upload_file, FileTooLarge
+from services.office import office_pool
+from services.pdf_word import pdf_word
+from services.workspace import job_workspace
+from services.extractors import PDF_MIME
+from handlers.file_converter import CONVERSIONS, INPUT_EXTENSIONS
+
+
+# conversion types offered in batch mode – the ones that take no per-file options
+BATCH_TYPES = {
+    "pdf_to_word": "PDF to Word",
+    "pdf_to_txt": "PDF to TXT",
+    "word_to_pdf": "Word to PDF",
+    "ppt_to_pdf": "PowerPoint to PDF",
+    "pdf_compress": "Compress PDFs",
+}
+
+# files of a media group arrive as separate updates, handled concurrently
+_collect_locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+# the batch each user is converting, for /cancel
+_batches: dict[int, asyncio.Task] = {}
+
+
+def cancel_batch(user_id: int) -> bool:
+    """
+    /cancel: stop the user's batch, whether its files are still waiting for a
+    slot, downloading or converting, and drop the lock of a batch still being
+    collected. Returns whether a running batch was cancelled.
+    """
+    _collect_locks.pop(user_id, None)
+    batch = _batches.pop(user_id, None)
+    if batch is None or batch.done():
+        return False
+    batch.cancel()
+    logger.info(f"Cancelled the batch conversion of user {user_id}")
+    return True
+
+
+class _Skipped(Exception):
+    """A batch file that could not be converted; the message goes into the report."""
+
+
+class _ZipParts:
+    """
+    The batch ZIP, cut into as many archives as it takes to keep each one
+    under the Bot API upload limit. Entries are never split: a part is
+    closed when the next output might not fit into it.
+    """
+
+    # room left in every part for the central directory and errors.txt
+    RESERVE = 1024 * 1024
+
+    def __init__(self, workdir: str, limit: int = BOT_API_MAX_UPLOAD_SIZE):
+        self.workdir = workdir
+        self.limit = limit - self.RESERVE
+        self.paths: list[str] = []
+        self.archive: zipfile.ZipFile | None = None
+
+    def write(self, path: str, name: str, compress_type: int):
+        # the uncompressed size bounds what the entry can take up
+        size = os.path.getsize(path) + 1024
+        if size > self.limit:
+            raise _Skipped(f"The result is too large to send "
+                           f"(max {BOT_API_MAX_UPLOAD_SIZE // (1024 * 1024)} MB).")
+        if self.archive is None or self.archive.fp.tell() + size > self.limit:
+            self._next()
+        self.archive.write(path, name, compress_type)
+
+    def writestr(self, name: str, data: str):
+        if self.archive is None:
+            self._next()
+        self.archive.writestr(name, data)
+
+    def _next(self):
+        self.close()
+        self.paths.append(os.path.join(self.workdir, f"converted-{len(self.paths) + 1}.zip"))
+        self.archive = zipfile.ZipFile(self.paths[-1], "w")
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+
+@dp.callback_query_handler(lambda c: c.data == "batch", state=ConvertForm.select_type)
+async def show_batch_types(callback_query: types.CallbackQuery):
+    kb = InlineKeyboardMarkup(row_width=2)
+    kb.add(*(InlineKeyboardButton(label, callback_data=f"batch:{conversion_type}")
+             for conversion_type, label in BATCH_TYPES.items()))
+    await bot.answer_callback_query(callback_query.id)
+    with suppress(MessageNotModified):
+        await callback_query.message.edit_text("Batch mode – choose what to do with every file:",
+                                               reply_markup=kb)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith("batch:") and c.data[6:] in BATCH_TYPES,
+                           state=ConvertForm.select_type)
+async def process_batch_type(callback_query: types.CallbackQuery, state: FSMContext):
+    user_id = callback_query.from_user.id
+    conversion_type = callback_query.data[6:]
+    logger.info(f"User {user_id} started a {conversion_type} batch")
+
+    await state.update_data(batch_type=conversion_type, files=[])
+    await bot.answer_callback_query(callback_query.id)
+    await ConvertForm.batch.set()
+    await bot.send_message(
+        user_id,
+        f"Send up to {BATCH_MAX_FILES} files – one by one or several at once. "
+        "Type /done when finished and you'll get them back in one ZIP."
+    )
+
+
+# ─── ConvertForm: collect batch files ────────────────────────────────
+@dp.message_handler(content_types=['document'], state=ConvertForm.batch)
+async def process_batch_file(message: types.Message, state: FSMContext):
+    document = message.document
+    async with _collect_locks[message.from_user.id]:
+        data = await state.get_data()
+        files = data.get('files', [])
+        if len(files) >= BATCH_MAX_FILES:
+            return await message.reply(f"That's the limit of {BATCH_MAX_FILES} files. Type /done.")
+        files.append({
+            "file_id": document.file_id,
+            "name": document.file_name or f"file-{len(files) + 1}",
+            "mime_type": document.mime_type,
+            "size": document.file_size,
+        })
+        # one acknowledgement per album, not one per file
+        first_of_group = (message.media_group_id is None
+                          or message.media_group_id != data.get('media_group_id'))
+        await state.update_data(files=files, media_group_id=message.media_group_id)
+    if first_of_group:
+        await message.reply("Received. Send more files or type /done.")
+
+
+def _output_names(files: list[dict], extension: str) -> list[str]:
+    """Archive names: each input's name with the output extension, made unique."""
+    names, seen = [], set()
+    for f in files:
+        base = os.path.splitext(os.path.basename(f["name"]))[0] or "file"
+        name, n = base + extension, 1
+        while name in seen:
+            n += 1
+            name = f"{base} ({n}){extension}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _job_args(conversion_type: str, input_path: str, output_path: str, pages: int | None):
+    if conversion_type == "pdf_to_word":
+        return pdf_word.convert, input_path, output_path, 0, pages
+    if conversion_type == "pdf_to_txt":
+        return converters.pdf_to_txt, input_path, output_path
+    if conversion_type == "pdf_compress":
+        return converters.pdf_compress, input_path, output_path
+    if office_pool.available:
+        return office_pool.convert, input_path, output_path, CONVERT_TIMEOUT - 5
+    return converters.office_to_pdf, input_path, os.path.dirname(output_path), CONVERT_TIMEOUT - 5
+
+
+@dp.message_handler(commands=['done'], state=ConvertForm.batch)
+async def process_done_batch(message: types.Message, state: FSMContext):
+    user_id = message.from_user.id
+    data = await state.get_data()
+    conversion_type = data.get('batch_type')
+    files = data.get('files', [])
+
+    if not files:
+        return await message.reply("No files received.")
+
+    mime_type, wrong_type_reply, output_name, _ = CONVERSIONS[conversion_type]
+    extension = os.path.splitext(output_name)[1]
+    names = _output_names(files, extension)
+    errors: dict[int, str] = {}
+    converted = 0
+
+    # as many jobs at once as the engine accepts from one user; a slot is taken
+    # before downloading, so inputs waiting for the engine don't fill the workspace
+    slots = asyncio.Semaphore(conversion_engine.per_user)
+    writing = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    status = await message.reply(f"⚙️ Converting {len(files)} files…")
+    last_edit = loop.time()
+
+    async def convert(n: int, f: dict, archive: _ZipParts, workdir: str):
+        nonlocal converted, last_edit
+        filedir = os.path.join(workdir, f"{n:03d}")
+        os.makedirs(filedir)
+        try:
+            if f["mime_type"] != mime_type:
+                raise _Skipped(wrong_type_reply)
+            if f["size"] and f["size"] > CONVERT_MAX_FILE_SIZE:
+                raise FileTooLarge(f["size"])
+            input_path = os.path.join(filedir, "input" + INPUT_EXTENSIONS[mime_type])
+            async with slots:
+                await download_to(f["file_id"], input_path, max_size=CONVERT_MAX_FILE_SIZE)
+
+                pages = None
+                if mime_type == PDF_MIME:
+                    pages = await asyncio.to_thread(converters.pdf_page_count, input_path)
+                    if pages > CONVERT_MAX_PAGES:
+                        raise _Skipped(f"{pages} pages; the limit is {CONVERT_MAX_PAGES}.")
+
+                job = conversion_engine.submit(
+                    user_id, *_job_args(conversion_type, input_path,
+                                        os.path.join(filedir, output_name), pages)
+                )
+                output = await job.future
+            if isinstance(output, list):
+                output = output[0]
+
+            # written as each file finishes, so outputs never pile up in the workspace
+            compress_type = zipfile.ZIP_DEFLATED if extension == ".txt" else zipfile.ZIP_STORED
+            async with writing:
+                await asyncio.to_thread(archive.write, output, names[n], compress_type)
+            converted += 1
+        except _Skipped as e:
+            errors[n] = str(e)
+        except FileTooLarge:
+            errors[n] = f"Too large (max {CONVERT_MAX_FILE_SIZE // (1024 * 1024)} MB)."
+        except ConversionTimeout:
+            errors[n] = f"Took longer than {CONVERT_TIMEOUT}s."
+        except ConversionRejected as e:
+            errors[n] = str(e)
+        except ConversionCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Batch conversion of {f['name']} failed for user {user_id}: {e}")
+            errors[n] = f"Conversion failed: {e}"
+        finally:
+            await asyncio.to_thread(shutil.rmtree, filedir, True)
+
+        if loop.time() - last_edit >= 3:
+            last_edit = loop.time()
+            with suppress(TelegramAPIError):
+                await status.edit_text(
+                    f"⚙️ Converting… {converted + len(errors)} of {len(files)} done"
+                )
+
+    async def run_batch():
+        with job_workspace("batch") as workdir:
+            archive = _ZipParts(workdir)
+            try:
+                tasks = [asyncio.ensure_future(convert(n, f, archive, workdir))
+                         for n, f in enumerate(files)]
+                try:
+                    await asyncio.gather(*tasks)
+                except ConversionCancelled:
+                    return
+                finally:
+                    # a cancelled batch stops everything before the workspace goes
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+                if errors and converted:
+                    archive.writestr("errors.txt", _error_report(files, errors))
+            finally:
+                archive.close()
+
+            if not converted:
+                return await message.reply("❌ None of the files could be converted.\n\n"
+                                           + _error_report(files, errors))
+            caption = f"{BATCH_TYPES[conversion_type]}: {converted} of {len(files)} files"
+            if errors:
+                caption += f" – {len(errors)} failed, see errors.txt"
+            if len(archive.paths) == 1:
+                await bot.send_document(message.chat.id,
+                                        upload_file(archive.paths[0], "converted.zip"),
+                                        caption=caption)
+            else:
+                # too large for one upload: one ZIP per part, each a complete archive
+                for n, path in enumerate(archive.paths, 1):
+                    await bot.send_document(message.chat.id,
+                                            upload_file(path, os.path.basename(path)),
+                                            caption=f"{caption} – part {n} of {len(archive.paths)}")
+
+        await db.log_conversions(user_id, [conversion_type] * converted)
+        logger.info(f"User {user_id} completed a {conversion_type} batch: "
+                    f"{converted} converted, {len(errors)} failed")
+
+    # a task of its own, so /cancel (cancel_batch) stops the batch wherever it is –
+    # waiting for a slot, downloading or converting – without cancelling this handler
+    batch = asyncio.ensure_future(run_batch())
+    _batches[user_id] = batch
+    try:
+        try:
+            await asyncio.wait({batch})
+        except asyncio.CancelledError:
+            batch.cancel()
+            raise
+        if not batch.cancelled():
+            batch.result()
+    except Exception as e:
+        logger.error(f"Batch conversion error for user {user_id}: {e}")
+        await message.reply(f"Batch conversion error: {e}")
+    finally:
+        if _batches.get(user_id) is batch:
+            del _batches[user_id]
+        with suppress(TelegramAPIError):
+            await status.delete()
+        _collect_locks.pop(user_id, None)
+        # after /cancel the state is already finished – and may belong to a new flow
+        if not batch.cancelled():
+            await state.finish()
+
+
+def _error_report(files: list[dict], errors: dict[int, str]) -> str:
+    return "\n".join(f"{files[n]['name']}: {errors[n]}" for n in sorted(errors))
+
+
+@dp.message_handler(state=ConvertForm.batch)
+async def process_invalid_batch(message: types.Message, state: FSMContext):
+    await message.reply("Please send files as documents or type /done.")
@@ -4,6 +4,8 @@ import pytz
 from database.db import db
 from loader import dp, logger
 from keyboards.common import main_menu
+from services.conversion import conversion_engine
+from services.ticket_ai import ai_jobs
 from states.forms import GradeForm, ConvertForm
 
 
@@ -22,8 +24,14 @@ async def send_welcome(message: types.Message, state: FSMContext):
 
 @dp.message_handler(commands=["cancel"], state="*")
 async def cancel_handler(message: types.Message, state: FSMContext):
+    from handlers.batch_converter import cancel_batch
     user_id = message.from_user.id
     await state.finish()
+    batch = cancel_batch(user_id)
+    if conversion_engine.cancel_user(user_id) or batch:
+        await message.reply("🛑 Your file conversion was cancelled.")
+    if ai_jobs.cancel_user(user_id):
+        await message.reply("🛑 Ticket generation was cancelled.")
     await message.reply("Action canceled. Choose a new option:", reply_markup=main_menu)
     logger.info(f"User {user_id} cancelled state")
 
@@ -1,22 +1,44 @@
 import os
+import re
 import asyncio
-import subprocess
+from contextlib import suppress
 from io import BytesIO
 from datetime import datetime
 
-import fitz
-from pdf2docx import Converter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.utils import ImageReader
-
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InputFile
-
+from aiogram.utils.exceptions import BadRequest, MessageNotModified, TelegramAPIError
+
+from config import (
+    CONVERT_TIMEOUT,
+    CONVERT_MAX_FILE_SIZE,
+    CONVERT_MAX_PAGES,
+    TXT_PART_SIZE,
+    IMAGES_MAX_COUNT,
+    IMAGES_MAX_SIDE,
+    IMAGES_DOWNLOAD_CONCURRENCY,
+    PDF_MERGE_MAX_FILES,
+    PDF_SPLIT_MAX_PARTS,
+    OCR_MAX_PAGES,
+)
 from loader import bot, dp, logger
 from states.forms import ConvertForm
 from database.db import db
+from services import converters
+from services.conversion import (
+    conversion_engine,
+    ConversionRejected,
+    ConversionCancelled,
+    ConversionTimeout,
+)
+from services.downloads import download_to, sha256_file, upload_file, FileTooLarge
+from services.ocr import ocr
+from services.office import office_pool
+from services.pdf_word import pdf_word
+from services.workspace import job_workspace
+from services.conversion_cache import conversion_cache, unique_key, hash_key
+from services.extractors import PDF_MIME, DOCX_MIME, PPTX_MIME
 
 
 # ─── Show conversion options ─────────────────────────────────────────
@@ -28,12 +50,45 @@ async def show_converter_menu(message: types.Message):
         InlineKeyboardButton("Word to PDF", callback_data="word_to_pdf"),
         InlineKeyboardButton("PowerPoint to PDF", callback_data="ppt_to_pdf"),
         InlineKeyboardButton("Images to PDF", callback_data="images_to_pdf"),
+        InlineKeyboardButton("Scanned PDF to TXT (OCR)", callback_data="ocr_to_txt"),
+        InlineKeyboardButton("PDF tools", callback_data="pdf_tools"),
+        InlineKeyboardButton("Batch to ZIP", callback_data="batch"),
     )
     await message.reply("Choose the conversion type:", reply_markup=kb)
 
 
+@dp.callback_query_handler(lambda c: c.data == "pdf_tools", state=ConvertForm.select_type)
+async def show_pdf_tools(callback_query: types.CallbackQuery):
+    kb = InlineKeyboardMarkup(row_width=2)
+    kb.add(
+        InlineKeyboardButton("Merge PDFs", callback_data="pdf_merge"),
+        InlineKeyboardButton("Split PDF", callback_data="pdf_split"),
+        InlineKeyboardButton("Compress PDF", callback_data="pdf_compress"),
+        InlineKeyboardButton("Rotate pages", callback_data="pdf_rotate"),
+        InlineKeyboardButton("Extract pages", callback_data="pdf_extract"),
+    )
+    await bot.answer_callback_query(callback_query.id)
+    with suppress(MessageNotModified):
+        await callback_query.message.edit_text("Choose a PDF tool:", reply_markup=kb)
+
+
+# conversion_type → what to send; anything else gets the generic prompt
+PROMPTS = {
+    "pdf_to_word": "Send the PDF to convert. To convert only some pages, add them as the caption, e.g. 10-25.",
+    "pdf_to_txt": "Send the PDF to convert. For text grouped into paragraphs add \"blocks\" as the "
+                  "caption, for headings and bold text \"markdown\".",
+    "pdf_split": "Send the PDF with the pages of each part as the caption, e.g. 1-10, 11-20.",
+    "pdf_compress": "Send the PDF to compress. To aim for a size, add it in MB as the caption, e.g. 5.",
+    "pdf_rotate": "Send the PDF with the angle as the caption – 90, 180 or 270 – optionally "
+                  "followed by the pages to turn, e.g. 90 2-4.",
+    "pdf_extract": "Send the PDF with the pages to keep as the caption, e.g. 1-3, 7.",
+    "ocr_to_txt": "Send the scanned PDF, or a photo or image of the page.",
+}
+
+
 # ─── ConvertForm: select conversion type ─────────────────────────────
-@dp.callback_query_handler(lambda c: c.data in ["pdf_to_word", "pdf_to_txt", "word_to_pdf", "ppt_to_pdf", "images_to_pdf"], state=ConvertForm.select_type)
+@dp.callback_query_handler(lambda c: c.data in CONVERSIONS or c.data in ("images_to_pdf", "pdf_merge"),
+                           state=ConvertForm.select_type)
 async def process_conversion_type(callback_query: types.CallbackQuery, state: FSMContext):
     user_id = callback_query.from_user.id
     conversion_type = callback_query.data
@@ -45,13 +100,148 @@ async def process_conversion_type(callback_query: types.CallbackQuery, state: FS
     if conversion_type == "images_to_pdf":
         await ConvertForm.images.set()
         await bot.send_message(user_id, "Send images (as photos or documents). Type /done when finished.")
+    elif conversion_type == "pdf_merge":
+        await ConvertForm.pdfs.set()
+        await bot.send_message(user_id, "Send the PDFs to merge, in order. Type /done when finished.")
     else:
         await ConvertForm.file.set()
-        await bot.send_message(user_id, "Send the file to convert.")
+        await bot.send_message(user_id, PROMPTS.get(conversion_type, "Send the file to convert."))
 
 
 # ─── ConvertForm: PDF, Word, PPT ─────────────────────────────────────
-@dp.message_handler(content_types=['document'], state=ConvertForm.file)
+# conversion_type → (accepted MIME type, reply for anything else, output name, caption)
+CONVERSIONS = {
+    "pdf_to_word": (PDF_MIME, "Please send a PDF file.", "converted.docx", "Converted to Word"),
+    "pdf_to_txt": (PDF_MIME, "Please send a PDF file.", "converted.txt", "Converted to TXT"),
+    "word_to_pdf": (DOCX_MIME, "Please send a Word (.docx) file.", "converted.pdf", "Converted to PDF"),
+    "ppt_to_pdf": (PPTX_MIME, "Please send a PowerPoint (.pptx) file.", "converted.pdf", "Converted to PDF"),
+    "ocr_to_txt": (PDF_MIME, "Please send a PDF file or an image.", "recognized.txt", "Recognized text (OCR)"),
+    "pdf_split": (PDF_MIME, "Please send a PDF file.", "split.pdf", "Split PDF"),
+    "pdf_compress": (PDF_MIME, "Please send a PDF file.", "compressed.pdf", "Compressed PDF"),
+    "pdf_rotate": (PDF_MIME, "Please send a PDF file.", "rotated.pdf", "Rotated PDF"),
+    "pdf_extract": (PDF_MIME, "Please send a PDF file.", "extracted.pdf", "Extracted pages"),
+}
+
+# the caption carries options (pages, angle, target size) that change the output
+CAPTION_OPTIONS = {"pdf_to_word", "pdf_split", "pdf_compress", "pdf_rotate", "pdf_extract"}
+
+# these also take a photo or an image sent as a document
+IMAGE_INPUT = {"ocr_to_txt"}
+
+
+INPUT_EXTENSIONS = {PDF_MIME: ".pdf", DOCX_MIME: ".docx", PPTX_MIME: ".pptx"}
+
+
+async def _run_conversion(message: types.Message, func, *args, progress: dict | None = None):
+    """
+    Run `func(*args)` on the conversion engine and return its result, keeping
+    one status message updated with the user's place in the queue – and,
+    once running, with `progress["text"]` if the job fills it in. Returns
+    None (after telling the user) when the job is rejected, cancelled or
+    times out.
+    """
+    user_id = message.from_user.id
+    try:
+        job = conversion_engine.submit(user_id, func, *args)
+    except ConversionRejected as e:
+        await message.reply(f"⏳ {e}")
+        return None
+
+    def status_text():
+        position = conversion_engine.position(job)
+        if position:
+            return f"⏳ In queue – position {position}"
+        return (progress or {}).get("text") or "⚙️ Converting…"
+
+    shown = status_text()
+    status = await message.reply(shown)
+    try:
+        while True:
+            try:
+                return await asyncio.wait_for(asyncio.shield(job.future), timeout=3)
+            except asyncio.TimeoutError:
+                pass
+            text = status_text()
+            if text != shown:
+                shown = text
+                with suppress(TelegramAPIError):
+                    await status.edit_text(text)
+    except ConversionCancelled:
+        return None
+    except ConversionTimeout:
+        await message.reply(f"⌛ The conversion took longer than {CONVERT_TIMEOUT}s and was stopped.")
+        return None
+    finally:
+        with suppress(TelegramAPIError):
+            await status.delete()
+
+
+_PAGE_RANGE = re.compile(r"^\s*(\d+)\s*(?:[-–]\s*(\d+))?\s*$")
+_ROTATION = re.compile(r"^\s*(90|180|270)\b(.*)$")
+_TARGET_SIZE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)\s*(?:mb)?\s*$", re.IGNORECASE)
+
+
+def _page_ranges(spec: str, pages: int) -> list[tuple[int, int]] | None:
+    """
+    Parse "1-3, 7, 10-12" (1-based, inclusive) into 0-based [start, end)
+    ranges clamped to the document, or None if any part is unreadable.
+    """
+    ranges = []
+    for part in spec.split(","):
+        match = _PAGE_RANGE.match(part)
+        if not match:
+            return None
+        first = int(match.group(1))
+        last = min(int(match.group(2) or first), pages)
+        if first < 1 or first > last:
+            return None
+        ranges.append((first - 1, last))
+    return ranges
+
+
+def _page_range(caption: str | None, pages: int) -> tuple[int, int] | None:
+    """A single range such as "10-25"; no caption means every page."""
+    if not caption:
+        return 0, pages
+    ranges = _page_ranges(caption, pages)
+    return ranges[0] if ranges and len(ranges) == 1 else None
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def _progress_updater(progress: dict):
+    def update(done: int, total: int):
+        progress["text"] = f"⚙️ Converting… {done}/{total} pages"
+    return update
+
+
+def _ocr_partial_sender(chat_id: int):
+    """Send each finished block of a long OCR job right away."""
+    async def send(first: int, last: int, text: str):
+        await bot.send_document(
+            chat_id, InputFile(BytesIO(text.encode("utf-8")), f"recognized-{first}-{last}.txt"),
+            caption=f"Pages {first}–{last}, more on the way…",
+        )
+    return send
+
+
+async def _send_cached(chat_id: int, cache_type: str, input_key: str, caption: str) -> str | None:
+    """Re-send a previous output for this input. Returns its file_id on a hit."""
+    output_file_id = await conversion_cache.lookup(input_key, cache_type)
+    if output_file_id is None:
+        return None
+    try:
+        await bot.send_document(chat_id, output_file_id, caption=caption)
+    except BadRequest as e:
+        logger.warning(f"Cached output {output_file_id} rejected, converting again: {e}")
+        await conversion_cache.invalidate(output_file_id)
+        return None
+    return output_file_id
+
+
+@dp.message_handler(content_types=['photo', 'document'], state=ConvertForm.file)
 async def process_convert_file(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     data = await state.get_data()
@@ -61,71 +251,154 @@ async def process_convert_file(message: types.Message, state: FSMContext):
         await ConvertForm.select_type.set()
         return await show_converter_menu(message)
 
-    file = message.document
-    file_info = await bot.get_file(file.file_id)
-    downloaded_file = await bot.download_file(file_info.file_path)
-    temp_dir = "/tmp/convert"
-    os.makedirs(temp_dir, exist_ok=True)
+    mime_type, wrong_type_reply, output_name, caption = CONVERSIONS[conversion_type]
+    file = message.photo[-1] if message.photo else message.document
+    is_image = bool(message.photo) or (file.mime_type or "").startswith("image/")
 
     try:
-        # PDF → Word / TXT
-        if conversion_type in ["pdf_to_word", "pdf_to_txt"]:
-            if file.mime_type != 'application/pdf':
-                return await message.reply("Please send a PDF file.")
-
-            pdf_path = os.path.join(temp_dir, "input.pdf")
-            with open(pdf_path, "wb") as f:
-                f.write(downloaded_file.read())
-
-            if conversion_type == "pdf_to_txt":
-                doc = fitz.open(pdf_path)
-                text = "".join(p.get_text() for p in doc)
-                doc.close()
-                txt_file = BytesIO(text.encode("utf-8"))
-                return await bot.send_document(message.chat.id, InputFile(txt_file, "converted.txt"), caption="Converted to TXT")
+        if is_image and conversion_type in IMAGE_INPUT:
+            mime_type = None
+        elif is_image or file.mime_type != mime_type:
+            return await message.reply(wrong_type_reply)
+
+        # page ranges, angles, sizes and text layouts select a different output,
+        # so they are part of the cache key
+        cache_type = conversion_type
+        if conversion_type in CAPTION_OPTIONS and message.caption:
+            cache_type += ":" + re.sub(r"\s+", "", message.caption).replace("–", "-")
+        elif conversion_type == "pdf_to_txt":
+            text_mode = (message.caption or "plain").strip().lower()
+            if text_mode not in converters.TEXT_MODES:
+                return await message.reply(
+                    "Unknown text layout; use " + ", ".join(converters.TEXT_MODES) + " or no caption."
+                )
+            if text_mode != "plain":
+                cache_type += ":" + text_mode
+            if text_mode == "markdown":
+                output_name = "converted.md"
+
+        # Same Telegram file converted before (by anyone): no download, no conversion
+        input_keys = [unique_key(file.file_unique_id)]
+        if await _send_cached(message.chat.id, cache_type, input_keys[0], caption):
+            await db.log_conversion(user_id, conversion_type)
+            logger.info(f"User {user_id} got cached {conversion_type} output")
+            return
+
+        if file.file_size and file.file_size > CONVERT_MAX_FILE_SIZE:
+            raise FileTooLarge(file.file_size)
+
+        # each job gets its own directory – several conversions run at once
+        with job_workspace("convert") as workdir:
+            # Pillow tells image formats apart by their content, not the extension
+            input_path = os.path.join(workdir, "input" + INPUT_EXTENSIONS.get(mime_type, ".image"))
+            await download_to(file.file_id, input_path, max_size=CONVERT_MAX_FILE_SIZE)
+
+            # Same bytes under a different file_unique_id
+            input_keys.append(hash_key(await asyncio.to_thread(sha256_file, input_path)))
+            output_file_id = await _send_cached(message.chat.id, cache_type, input_keys[1], caption)
+            if output_file_id:
+                await conversion_cache.store(input_keys, cache_type, output_file_id)
+                await db.log_conversion(user_id, conversion_type)
+                logger.info(f"User {user_id} got cached {conversion_type} output (by content)")
+                return
+
+            if mime_type == PDF_MIME:
+                # reading the page count only touches the PDF's xref, not its content
+                pages = await asyncio.to_thread(converters.pdf_page_count, input_path)
+                if pages > CONVERT_MAX_PAGES:
+                    return await message.reply(
+                        f"❌ The PDF has {pages} pages; the limit is {CONVERT_MAX_PAGES}."
+                    )
+
+            progress = {}
+            if conversion_type == "pdf_to_word":
+                page_range = _page_range(message.caption, pages)
+                if page_range is None:
+                    return await message.reply(
+                        f"❌ Couldn't read the page range; use e.g. 10-25 (the PDF has {pages} pages)."
+                    )
+                job_args = (pdf_word.convert, input_path, os.path.join(workdir, output_name),
+                            *page_range, _progress_updater(progress))
+                if page_range != (0, pages):
+                    caption += f" – pages {page_range[0] + 1}–{page_range[1]}"
+            elif conversion_type in ("pdf_split", "pdf_extract"):
+                ranges = _page_ranges(message.caption or "", pages)
+                if not ranges:
+                    return await message.reply(
+                        f"❌ Add the pages as the caption, e.g. 1-3, 7 (the PDF has {pages} pages)."
+                    )
+                if conversion_type == "pdf_extract":
+                    job_args = (converters.pdf_extract, input_path, ranges,
+                                os.path.join(workdir, output_name))
+                elif len(ranges) > PDF_SPLIT_MAX_PARTS:
+                    return await message.reply(f"❌ At most {PDF_SPLIT_MAX_PARTS} parts, please.")
+                else:
+                    job_args = (converters.pdf_split, input_path, ranges,
+                                [os.path.join(workdir, f"part-{n}.pdf") for n in range(len(ranges))])
+            elif conversion_type == "pdf_rotate":
+                match = _ROTATION.match(message.caption or "")
+                ranges = None
+                if match:
+                    spec = match.group(2).strip()
+                    ranges = _page_ranges(spec, pages) if spec else [(0, pages)]
+                if not ranges:
+                    return await message.reply("❌ Add the angle as the caption, e.g. 90 or 180 2-4.")
+                job_args = (converters.pdf_rotate, input_path, os.path.join(workdir, output_name),
+                            int(match.group(1)), ranges)
+            elif conversion_type == "pdf_compress":
+                target_size = None
+                if message.caption:
+                    match = _TARGET_SIZE.match(message.caption)
+                    if not match:
+                        return await message.reply("❌ Add the target size in MB as the caption, e.g. 5.")
+                    target_size = int(float(match.group(1).replace(",", ".")) * 1024 * 1024)
+                job_args = (converters.pdf_compress, input_path, os.path.join(workdir, output_name),
+                            target_size)
+            elif conversion_type == "pdf_to_txt":
+                # streamed page by page into the workspace; split when too large to upload
+                job_args = (converters.pdf_to_txt, input_path, os.path.join(workdir, output_name),
+                            text_mode, TXT_PART_SIZE)
+            elif conversion_type == "ocr_to_txt" and mime_type is None:
+                job_args = (ocr.ocr_image, input_path, os.path.join(workdir, output_name))
+            elif conversion_type == "ocr_to_txt":
+                job_args = (ocr.ocr_pdf, input_path, os.path.join(workdir, output_name),
+                            _ocr_partial_sender(message.chat.id))
+                if pages > OCR_MAX_PAGES:
+                    caption += f" – first {OCR_MAX_PAGES} of {pages} pages"
+            elif office_pool.available:
+                job_args = (office_pool.convert, input_path,
+                            os.path.join(workdir, output_name), CONVERT_TIMEOUT - 5)
             else:
-                docx_path = os.path.join(temp_dir, "converted.docx")
-                await _pdf_to_docx(pdf_path, docx_path)
-                return await bot.send_document(message.chat.id, InputFile(docx_path, "converted.docx"), caption="Converted to Word")
-
-        # Word → PDF
-        elif conversion_type == "word_to_pdf":
-            if file.mime_type != 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-                return await message.reply("Please send a Word (.docx) file.")
-
-            docx_path = os.path.join(temp_dir, "input.docx")
-            with open(docx_path, "wb") as f:
-                f.write(downloaded_file.read())
-
-            await asyncio.to_thread(
-                subprocess.run,
-                ["libreoffice", "--headless", "--convert-to", "pdf", "--outdir", temp_dir, docx_path],
-                check=True,
-            )
-
-            pdf_path = docx_path.replace(".docx", ".pdf")
-            return await bot.send_document(message.chat.id, InputFile(pdf_path, "converted.pdf"), caption="Converted to PDF")
-
-        # PPT → PDF
-        elif conversion_type == "ppt_to_pdf":
-            if file.mime_type != 'application/vnd.openxmlformats-officedocument.presentationml.presentation':
-                return await message.reply("Please send a PowerPoint (.pptx) file.")
-
-            ppt_path = os.path.join(temp_dir, "input.pptx")
-            with open(ppt_path, "wb") as f:
-                f.write(downloaded_file.read())
-
-            await asyncio.to_thread(
-                subprocess.run,
-                ["libreoffice", "--headless", "--convert-to", "pdf", "--outdir", temp_dir, ppt_path],
-                check=True,
-            )
-
-            pdf_path = ppt_path.replace(".pptx", ".pdf")
-            return await bot.send_document(message.chat.id, InputFile(pdf_path, "converted.pdf"), caption="Converted to PDF")
+                # let soffice hit its own timeout first so it isn't left orphaned
+                job_args = (converters.office_to_pdf, input_path, workdir, CONVERT_TIMEOUT - 5)
+
+            output = await _run_conversion(message, *job_args, progress=progress)
+            if output is None:
+                return
+            if isinstance(output, list) and len(output) > 1:
+                # a text too large for one upload: send the parts, nothing to cache
+                for n, part in enumerate(output, 1):
+                    name, ext = os.path.splitext(output_name)
+                    await bot.send_document(message.chat.id, upload_file(part, f"{name}-{n}{ext}"),
+                                            caption=f"{caption} – part {n} of {len(output)}")
+                await db.log_conversion(user_id, conversion_type)
+                logger.info(f"User {user_id} completed {conversion_type} conversion in {len(output)} parts")
+                return
+            if isinstance(output, list):
+                output = output[0]
+            if conversion_type == "pdf_compress":
+                before, after = os.path.getsize(input_path), os.path.getsize(output)
+                caption += f" – {_megabytes(before)} → {_megabytes(after)}"
+            sent = await bot.send_document(message.chat.id, upload_file(output, output_name),
+                                           caption=caption)
+        await conversion_cache.store(input_keys, cache_type, sent.document.file_id)
 
         await db.log_conversion(user_id, conversion_type)
         logger.info(f"User {user_id} completed {conversion_type} conversion")
+    except FileTooLarge:
+        await message.reply(
+            f"❌ The file is too large to convert (max {CONVERT_MAX_FILE_SIZE // (1024 * 1024)} MB)."
+        )
     except Exception as e:
         logger.error(f"Conversion error for user {user_id}: {e}")
         await message.reply(f"Conversion error: {e}")
@@ -133,12 +406,26 @@ async def process_convert_file(message: types.Message, state: FSMContext):
         await state.finish()
 
 
+async def _download_all(file_ids: list[str], paths: list[str]):
+    """Download several files side by side, a few at a time."""
+    downloads = asyncio.Semaphore(IMAGES_DOWNLOAD_CONCURRENCY)
+
+    async def fetch(file_id: str, path: str):
+        async with downloads:
+            await download_to(file_id, path, max_size=CONVERT_MAX_FILE_SIZE)
+
+    await asyncio.gather(*(fetch(file_id, path) for file_id, path in zip(file_ids, paths)))
+
+
 # ─── ConvertForm: Image → PDF ────────────────────────────────────────
 @dp.message_handler(content_types=['photo', 'document'], state=ConvertForm.images)
 async def process_image(message: types.Message, state: FSMContext):
     data = await state.get_data()
     images = data.get('images', [])
 
+    if len(images) >= IMAGES_MAX_COUNT:
+        return await message.reply(f"That's the limit of {IMAGES_MAX_COUNT} images. Type /done.")
+
     file_id = message.photo[-1].file_id if message.photo else message.document.file_id
     images.append(file_id)
 
@@ -156,19 +443,22 @@ async def process_done_images(message: types.Message, state: FSMContext):
         return await message.reply("No images received.")
 
     try:
-        pdf_file = BytesIO()
-        c = canvas.Canvas(pdf_file, pagesize=letter)
-        for file_id in images:
-            file_info = await bot.get_file(file_id)
-            file_data = await bot.download_file(file_info.file_path)
-            img = ImageReader(BytesIO(file_data.read()))
-            c.drawImage(img, 0, 0, width=letter[0], height=letter[1], preserveAspectRatio=True)
-            c.showPage()
-        c.save()
-        pdf_file.seek(0)
-
-        await bot.send_document(message.chat.id, InputFile(pdf_file, "images.pdf"), caption="Converted to PDF")
+        with job_workspace("images") as workdir:
+            paths = [os.path.join(workdir, f"image-{n:03d}") for n in range(len(images))]
+            await _download_all(images, paths)
+
+            # decoding, downscaling and PDF assembly run in a worker process
+            output = await _run_conversion(message, converters.images_to_pdf, paths,
+                                           os.path.join(workdir, "images.pdf"), IMAGES_MAX_SIDE)
+            if output is None:
+                return
+            await bot.send_document(message.chat.id, upload_file(output, "images.pdf"),
+                                    caption="Converted to PDF")
         await db.log_conversion(user_id, "images_to_pdf")
+    except FileTooLarge:
+        await message.reply(
+            f"❌ One of the images is too large (max {CONVERT_MAX_FILE_SIZE // (1024 * 1024)} MB)."
+        )
     except Exception as e:
         logger.error(f"Image to PDF error: {e}")
         await message.reply(f"Image to PDF conversion failed: {e}")
@@ -182,10 +472,66 @@ async def process_invalid_images(message: types.Message, state: FSMContext):
     await message.reply("Please send images or type /done.")
 
 
-# ─── Utility: PDF to DOCX async wrapper ──────────────────────────────
-async def _pdf_to_docx(pdf_path: str, docx_path: str):
-    def _convert():
-        cv = Converter(pdf_path)
-        cv.convert(docx_path, start=0, end=None)
-        cv.close()
-    await asyncio.to_thread(_convert)
+# ─── ConvertForm: merge PDFs ─────────────────────────────────────────
+@dp.message_handler(content_types=['document'], state=ConvertForm.pdfs)
+async def process_merge_pdf(message: types.Message, state: FSMContext):
+    data = await state.get_data()
+    pdfs = data.get('pdfs', [])
+
+    if message.document.mime_type != PDF_MIME:
+        return await message.reply("Please send a PDF file.")
+    if message.document.file_size and message.document.file_size > CONVERT_MAX_FILE_SIZE:
+        return await message.reply(
+            f"❌ That file is too large (max {CONVERT_MAX_FILE_SIZE // (1024 * 1024)} MB)."
+        )
+    if len(pdfs) >= PDF_MERGE_MAX_FILES:
+        return await message.reply(f"That's the limit of {PDF_MERGE_MAX_FILES} files. Type /done.")
+
+    pdfs.append(message.document.file_id)
+    await state.update_data(pdfs=pdfs)
+    await message.reply(f"PDF {len(pdfs)} received. Send more or type /done.")
+
+
+@dp.message_handler(commands=['done'], state=ConvertForm.pdfs)
+async def process_done_pdfs(message: types.Message, state: FSMContext):
+    user_id = message.from_user.id
+    data = await state.get_data()
+    pdfs = data.get('pdfs', [])
+
+    if len(pdfs) < 2:
+        return await message.reply("Send at least two PDFs to merge.")
+
+    try:
+        with job_workspace("merge") as workdir:
+            paths = [os.path.join(workdir, f"input-{n:03d}.pdf") for n in range(len(pdfs))]
+            await _download_all(pdfs, paths)
+
+            pages = sum(await asyncio.gather(
+                *(asyncio.to_thread(converters.pdf_page_count, path) for path in paths)
+            ))
+            if pages > CONVERT_MAX_PAGES:
+                return await message.reply(
+                    f"❌ Together the PDFs have {pages} pages; the limit is {CONVERT_MAX_PAGES}."
+                )
+
+            output = await _run_conversion(message, converters.pdf_merge, paths,
+                                           os.path.join(workdir, "merged.pdf"))
+            if output is None:
+                return
+            await bot.send_document(message.chat.id, upload_file(output, "merged.pdf"),
+                                    caption=f"Merged {len(pdfs)} PDFs")
+        await db.log_conversion(user_id, "pdf_merge")
+    except FileTooLarge:
+        await message.reply(
+            f"❌ One of the PDFs is too large (max {CONVERT_MAX_FILE_SIZE // (1024 * 1024)} MB)."
+        )
+    except Exception as e:
+        logger.error(f"PDF merge error: {e}")
+        await message.reply(f"Merging the PDFs failed: {e}")
+    finally:
+        await state.finish()
+
+
+@dp.message_handler(state=ConvertForm.pdfs)
+async def process_invalid_pdfs(message: types.Message, state: FSMContext):
+    await message.reply("Please send PDF files or type /done.")
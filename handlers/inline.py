@@ -0,0 +1,105 @@
+import html
+
+from aiogram import types
+from aiogram.types import (
+    InlineQueryResultArticle,
+    InlineQueryResultCachedDocument,
+    InlineQueryResultCachedPhoto,
+    InputTextMessageContent,
+)
+
+from config import INLINE_CACHE_TIME
+from loader import bot, dp, logger
+from database.db import db
+from handlers.materials import material_caption
+
+# Telegram accepts at most 50 results per answer
+INLINE_PAGE_SIZE = 20
+TICKET_PREFIX = "t:"
+
+
+def _next_offset(offset: int, count: int, has_more: bool) -> str:
+    # an empty next_offset tells the client there is nothing more to load
+    return str(offset + count) if has_more else ""
+
+
+def _material_results(rows):
+    results = []
+    for telegram_file_id, subject, teacher_names, description, file_id, _, _, file_name, media_type in rows:
+        caption = material_caption(subject, teacher_names, description)
+        if media_type == "photo":
+            # materials replaced by a photo (process_update_file) hold a photo id
+            results.append(InlineQueryResultCachedPhoto(
+                id=f"f{file_id}",
+                photo_file_id=telegram_file_id,
+                title=file_name or description or "Material",
+                description=" · ".join(filter(None, (subject, teacher_names, description))),
+                caption=caption,
+                parse_mode="HTML",
+            ))
+            continue
+        results.append(InlineQueryResultCachedDocument(
+            id=f"f{file_id}",
+            title=file_name or description or "Material",
+            document_file_id=telegram_file_id,
+            description=" · ".join(filter(None, (subject, teacher_names, description))),
+            caption=caption,
+            parse_mode="HTML",
+        ))
+    return results
+
+
+def _ticket_results(rows):
+    results = []
+    for ticket_id, subject, ticket in rows:
+        results.append(InlineQueryResultArticle(
+            id=f"t{ticket_id}",
+            title=subject,
+            description=ticket[:100],
+            input_message_content=InputTextMessageContent(
+                f"🎟 <b>{html.escape(subject)}</b>\n\n{html.escape(ticket)}",
+                parse_mode="HTML",
+            ),
+        ))
+    return results
+
+
+@dp.inline_handler()
+async def process_inline_query(inline_query: types.InlineQuery):
+    """
+    @bot <keyword>   – the user's materials, sent as the stored document
+    @bot t:<keyword> – the user's tickets, sent as text
+    """
+    user_id = inline_query.from_user.id
+    query = inline_query.query.strip()
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+
+    scope = "tickets" if query.lower().startswith(TICKET_PREFIX) else "materials"
+    keyword = query[len(TICKET_PREFIX):].strip() if scope == "tickets" else query
+
+    if not keyword:
+        await bot.answer_inline_query(
+            inline_query.id, [], cache_time=INLINE_CACHE_TIME, is_personal=True,
+            switch_pm_text="Type to search materials, or t: for tickets",
+            switch_pm_parameter="inline",
+        )
+        return
+
+    try:
+        if scope == "tickets":
+            rows, has_more = await db.search_tickets(user_id, keyword, INLINE_PAGE_SIZE, offset)
+            results = _ticket_results(rows)
+        else:
+            # fuzzy suggestions are skipped – in inline mode the user just keeps typing
+            rows, _, has_more = await db.search_files(user_id, keyword, INLINE_PAGE_SIZE, offset)
+            results = _material_results(rows)
+
+        await bot.answer_inline_query(
+            inline_query.id, results,
+            cache_time=INLINE_CACHE_TIME, is_personal=True,
+            next_offset=_next_offset(offset, len(rows), has_more),
+        )
+        logger.info(f"Inline {scope} search by user {user_id} for '{keyword}' "
+                    f"(offset {offset}): {len(rows)} result(s)")
+    except Exception as e:
+        logger.error(f"Error in inline query for user {user_id}: {str(e)}")
@@ -1,8 +1,15 @@
+import hashlib
+import html
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+from aiogram.utils.exceptions import MessageNotModified, TypeOfFileMismatch
 from database.db import db
 from loader import bot, dp, logger
+from services.ingestion import ingestion, IngestJob
 from states.forms import SearchForm, FileForm, FileUpdateForm
 
 FILES_PER_PAGE = 5
@@ -15,66 +22,133 @@ async def materials_menu(message: types.Message, state: FSMContext):
     await state.finish()
     await show_files(user_id)
 
-async def show_files(user_id: int, page: int = 1):
+# Materials pages are walked with a keyset cursor (upload_date, id) that is
+# carried in the callback data: materials_page_<page>_<n|p>_<epoch µs>_<file id>
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _encode_cursor(upload_date: datetime, file_id: int) -> str:
+    return f"{(upload_date - _EPOCH) // timedelta(microseconds=1)}_{file_id}"
+
+
+def _decode_cursor(token: str) -> tuple[datetime, int]:
+    micros, file_id = token.split("_")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(file_id)
+
+
+def _material_keyboard(file_id: int) -> InlineKeyboardMarkup:
+    kb = InlineKeyboardMarkup(row_width=2)
+    kb.add(
+        InlineKeyboardButton("✏️ Update", callback_data=f"update_file_{file_id}"),
+        InlineKeyboardButton("🗑️ Delete", callback_data=f"delete_file_{file_id}")
+    )
+    return kb
+
+
+async def show_files(user_id: int, page: int = 1, cursor: tuple[datetime, int] | None = None,
+                     backward: bool = False, message_id: int | None = None):
+    """
+    Render one Materials page as a single message: a numbered list of the files
+    plus one button per file that sends the document on demand. With
+    `message_id` the existing list message is edited in place (navigation),
+    otherwise a new one is sent.
+    """
     try:
-        files = await db.get_files_with_teachers(user_id)
+        files, has_more = await db.get_files_page(
+            user_id, FILES_PER_PAGE, cursor=cursor, backward=backward
+        )
+        if not files and cursor is not None:
+            # the page we pointed at vanished (e.g. files deleted) – start over
+            page, cursor, backward = 1, None, False
+            files, has_more = await db.get_files_page(user_id, FILES_PER_PAGE)
+
+        keyboard = InlineKeyboardMarkup(row_width=3)
         if not files:
-            keyboard = InlineKeyboardMarkup(row_width=2)
-            keyboard.add(InlineKeyboardButton("➕ Upload File", callback_data="upload_file"))
-            keyboard.add(InlineKeyboardButton("🔍 Search Files", callback_data="search_files"))
-            await bot.send_message(user_id, "No files found. Upload or search:", reply_markup=keyboard)
+            text = "No files found. Upload or search:"
+            keyboard.row(
+                InlineKeyboardButton("➕ Upload File", callback_data="upload_file"),
+                InlineKeyboardButton("🔍 Search Files", callback_data="search_files"),
+            )
+        else:
+            if backward:
+                has_prev, has_next = has_more, True
+                if not has_prev:
+                    page = 1
+            else:
+                has_prev, has_next = page > 1, has_more
+
+            lines = [f"📂 <b>Materials</b> · page {page}", ""]
+            for n, (_, subject, teacher_names, description, file_id, _, file_name, _) in enumerate(files, 1):
+                title = file_name or description or "Unnamed"
+                lines.append(f"{n}. <b>{html.escape(title)}</b>")
+                lines.append(f"    📚 {html.escape(subject or 'No subject')} · "
+                             f"👨‍🏫 {html.escape(teacher_names or 'No teacher')}")
+                # keep the whole page well under Telegram's 4096-char message limit
+                lines.append(f"    📝 {html.escape((description or '—')[:200])}")
+                keyboard.row(InlineKeyboardButton(
+                    f"📄 {n}. {title[:40]}", callback_data=f"material_open_{file_id}"
+                ))
+            text = "\n".join(lines)
+
+            first, last = files[0], files[-1]
+            nav = []
+            if has_prev:
+                nav.append(InlineKeyboardButton(
+                    "⬅️ Prev",
+                    callback_data=f"materials_page_{page-1}_p_{_encode_cursor(first[5], first[4])}"
+                ))
+            if has_next:
+                nav.append(InlineKeyboardButton(
+                    "Next ➡️",
+                    callback_data=f"materials_page_{page+1}_n_{_encode_cursor(last[5], last[4])}"
+                ))
+            if nav:
+                keyboard.row(*nav)
+            keyboard.row(
+                InlineKeyboardButton("➕ Upload File", callback_data="upload_file"),
+                InlineKeyboardButton("🔍 Search Files", callback_data="search_files"),
+            )
+
+        if message_id is None:
+            await bot.send_message(user_id, text, reply_markup=keyboard)
             return
-
-        total_pages = (len(files) + FILES_PER_PAGE - 1) // FILES_PER_PAGE
-        page = max(1, min(page, total_pages))
-        start_idx = (page - 1) * FILES_PER_PAGE
-        end_idx = start_idx + FILES_PER_PAGE
-        files_page = files[start_idx:end_idx]
-
-        for telegram_file_id, subject, teacher_names, description, file_id in files_page:
-            try:
-                # Skip if not a valid document file ID (Telegram documents usually start with 'BQAC')
-                if not telegram_file_id or not telegram_file_id.startswith("BQAC"):
-                    continue
-
-                subject_label = subject or "No subject"
-                teacher_label = teacher_names or "No teacher"
-
-                file_keyboard = InlineKeyboardMarkup(row_width=2)
-                file_keyboard.add(
-                    InlineKeyboardButton("✏️ Update", callback_data=f"update_file_{file_id}"),
-                    InlineKeyboardButton("🗑️ Delete", callback_data=f"delete_file_{file_id}")
-                )
-
-                caption = f"📚 {subject_label}\n👨‍🏫 {teacher_label}\n📝 {description or '—'}"
-                await bot.send_document(user_id, telegram_file_id, caption=caption, reply_markup=file_keyboard)
-            except Exception as file_err:
-                logger.error(f"Error sending file_id {file_id} for user {user_id}: {file_err}")
-                continue
-
-        nav_keyboard = InlineKeyboardMarkup(row_width=3)
-        if page > 1:
-            nav_keyboard.insert(InlineKeyboardButton("⬅️ Prev", callback_data=f"materials_page_{page-1}"))
-        nav_keyboard.insert(InlineKeyboardButton("➕ Upload File", callback_data="upload_file"))
-        nav_keyboard.insert(InlineKeyboardButton("🔍 Search Files", callback_data="search_files"))
-        if page < total_pages:
-            nav_keyboard.insert(InlineKeyboardButton("Next ➡️", callback_data=f"materials_page_{page+1}"))
-
-        await bot.send_message(user_id, f"Page {page}/{total_pages}", reply_markup=nav_keyboard)
+        try:
+            await bot.edit_message_text(text, user_id, message_id, reply_markup=keyboard)
+        except MessageNotModified:
+            pass
     except Exception as e:
         logger.error(f"Error showing files for user {user_id}: {str(e)}")
         await bot.send_message(user_id, "Error loading files!")
 
 
-
-
 @dp.callback_query_handler(lambda c: c.data.startswith("materials_page_"))
 async def materials_page_navigation(callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    page = int(callback_query.data.split("_")[-1])
+    page, direction, token = callback_query.data[len("materials_page_"):].split("_", 2)
+    page = int(page)
     logger.info(f"User {user_id} navigating to materials page {page}")
     await bot.answer_callback_query(callback_query.id)
-    await show_files(user_id, page=page)
+    await show_files(user_id, page=page, cursor=_decode_cursor(token), backward=direction == "p",
+                     message_id=callback_query.message.message_id)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith("material_open_"))
+async def open_material(callback_query: CallbackQuery):
+    """Send a single material picked from the Materials list."""
+    user_id = callback_query.from_user.id
+    file_id = int(callback_query.data[len("material_open_"):])
+    logger.info(f"User {user_id} opened material {file_id}")
+    try:
+        row = await db.get_file(user_id, file_id)
+        if row is None:
+            await bot.answer_callback_query(callback_query.id, "File not found!", show_alert=True)
+            return
+        await bot.answer_callback_query(callback_query.id)
+        caption = material_caption(row["subject"], row["teacher_names"], row["description"])
+        await _send_material(user_id, row["telegram_file_id"], row["media_type"], file_id, caption)
+    except Exception as e:
+        logger.error(f"Error sending file_id {file_id} for user {user_id}: {e}")
+        await bot.send_message(user_id, "❌ Could not send this file.")
 
 
 # ---------------------------------------------------------------------------
@@ -152,20 +226,31 @@ async def process_file_upload(message: types.Message, state: FSMContext):
         subject_id   = data.get("subject_id")
         description  = data["description"]
 
-        # Decide what to store as file_name (becomes searchable later)
-        if message.document and message.document.file_name:
-            file_name = message.document.file_name
         if message.photo:
             await message.reply("❌ Please upload using the 📎 *File* option, not as a photo.")
             return
-        else:
-            file_name = "unnamed"
+
+        # Decide what to store as file_name (becomes searchable later)
+        document = message.document
+        file_name = document.file_name or "unnamed"
 
         # (user_id, telegram_file_id, file_name, subject_id, description)
-        await db.add_file(user_id, telegram_file_id,
-                          file_name, subject_id, description)
+        row_id, duplicate, extracted = await db.add_file(
+            user_id, telegram_file_id, file_name, subject_id, description,
+            file_unique_id=document.file_unique_id,
+            mime_type=document.mime_type,
+            file_size=document.file_size,
+            media_type="document",
+        )
 
+        if duplicate:
+            await message.reply("ℹ️ This file is already in your Materials.")
+            return
         await message.reply("✅ File uploaded successfully!")
+        if not extracted:
+            # text extraction runs in the background; a full queue just defers it
+            ingestion.submit(IngestJob(row_id, telegram_file_id, file_name,
+                                       document.mime_type, document.file_size))
     except Exception as e:
         logger.error("Error uploading file for user %s: %s", user_id, e)
         await message.reply("❌ Error uploading file!")
@@ -197,8 +282,7 @@ async def update_file(callback_query: types.CallbackQuery, state: FSMContext):
     file_id = int(callback_query.data.replace("update_file_", ""))
     logger.info(f"User {user_id} clicked 'update_file_{file_id}'")
     try:
-        files = await db.get_files(user_id)
-        file_data = next((f for f in files if f[3] == file_id), None)
+        file_data = await db.get_file(user_id, file_id)
         if not file_data:
             await bot.send_message(user_id, "File not found!")
             return
@@ -291,10 +375,22 @@ async def process_update_file(message: types.Message, state: FSMContext):
     logger.info(f"User {user_id} uploaded new file")
     try:
         data = await state.get_data()
-        file_id = message.document.file_id if message.document else message.photo[-1].file_id
+        media = message.document or message.photo[-1]
+        file_id = media.file_id
+        mime_type = message.document.mime_type if message.document else "image/jpeg"
         old_file_id = data['file_id']
-        await db.update_file(user_id, old_file_id, telegram_file_id=file_id)
+        updated = await db.update_file(user_id, old_file_id, telegram_file_id=file_id,
+                                       file_unique_id=media.file_unique_id,
+                                       mime_type=mime_type, file_size=media.file_size,
+                                       media_type="document" if message.document else "photo")
+        if not updated:
+            await message.reply("ℹ️ You already have this file in your materials – nothing was changed.")
+            await state.finish()
+            return
         await message.reply("✅ File updated successfully!")
+        ingestion.submit(IngestJob(old_file_id, file_id,
+                                   message.document.file_name if message.document else None,
+                                   mime_type, media.file_size))
         await state.finish()
         await show_files(user_id, page=1)
     except Exception as e:
@@ -331,6 +427,129 @@ async def process_search_files(callback_query: types.CallbackQuery, state: FSMCo
         await bot.send_message(user_id, "Error loading subjects!")
     await bot.answer_callback_query(callback_query.id)
 
+# Telegram's caption limit, counted after HTML parsing in UTF-16 code units
+CAPTION_LIMIT = 1024
+SNIPPET_MAX_LENGTH = 300
+
+
+def _utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _clip(text: str, room: int) -> str:
+    """Cut plain `text` to at most `room` UTF-16 units, marking the cut with "…"."""
+    if _utf16_len(text) <= room:
+        return text
+    text = text[:max(room - 1, 0)]
+    while text and _utf16_len(text) > room - 1:
+        text = text[:-1]
+    return text + "…" if room > 0 else ""
+
+
+def _format_snippet(snippet: str) -> str:
+    """Escape a ts_headline excerpt for HTML captions, keeping its <b> marks."""
+    words = " ".join(snippet.split())
+    plain = words.replace("<b>", "").replace("</b>", "")
+    if _utf16_len(plain) > SNIPPET_MAX_LENGTH:
+        # too long to cut safely between the marks – lose the bold instead
+        return html.escape(_clip(plain, SNIPPET_MAX_LENGTH))
+    text = html.escape(words)
+    return text.replace("&lt;b&gt;", "<b>").replace("&lt;/b&gt;", "</b>")
+
+
+def material_caption(subject: str | None, teacher_names: str | None,
+                     description: str | None, snippet: str | None = None) -> str:
+    """
+    HTML caption for a material: user-entered fields are escaped and the
+    description is shortened so the whole caption fits in CAPTION_LIMIT.
+    """
+    head = (f"📚 {_clip(subject or 'No subject', 100)}\n"
+            f"👨‍🏫 {_clip(teacher_names or 'No teacher', 200)}\n"
+            f"📝 ")
+    tail = f"\n🔎 …{_format_snippet(snippet)}…" if snippet else ""
+    visible_tail = tail.replace("<b>", "").replace("</b>", "")
+    room = CAPTION_LIMIT - _utf16_len(head) - _utf16_len(html.unescape(visible_tail))
+    return html.escape(head) + html.escape(_clip(description or "—", room)) + tail
+
+
+async def _send_material(user_id: int, telegram_file_id: str, media_type: str,
+                         file_id: int, caption: str):
+    """
+    Send a material the way it was stored: a photo id is rejected by
+    send_document and the other way round. Rows saved before media_type was
+    recorded all say 'document'; a photo among them is resent as one and
+    its row corrected.
+    """
+    send = bot.send_photo if media_type == "photo" else bot.send_document
+    try:
+        await send(user_id, telegram_file_id, caption=caption,
+                   reply_markup=_material_keyboard(file_id))
+    except TypeOfFileMismatch:
+        media_type = "document" if media_type == "photo" else "photo"
+        send = bot.send_photo if media_type == "photo" else bot.send_document
+        await send(user_id, telegram_file_id, caption=caption,
+                   reply_markup=_material_keyboard(file_id))
+        await db.set_media_type(user_id, file_id, media_type)
+
+
+async def _send_file_batch(user_id: int, rows):
+    """Render search results the same way Materials does."""
+    for telegram_file_id, subject, teacher_names, description, file_id, _, snippet, _, media_type in rows:
+        caption = material_caption(subject, teacher_names, description, snippet)
+
+        try:
+            await _send_material(user_id, telegram_file_id, media_type, file_id, caption)
+        except Exception as file_err:
+            logger.error(f"Error sending file_id {file_id} for user {user_id}: {file_err}")
+
+
+# "More results" buttons carry a short token for their query (callback data is
+# limited to 64 bytes); the most recent queries are remembered here
+_search_queries: OrderedDict[str, str] = OrderedDict()
+SEARCH_QUERIES_KEPT = 4096
+
+
+def _search_token(keyword: str) -> str:
+    token = hashlib.sha1(keyword.encode()).hexdigest()[:12]
+    _search_queries[token] = keyword
+    _search_queries.move_to_end(token)
+    while len(_search_queries) > SEARCH_QUERIES_KEPT:
+        _search_queries.popitem(last=False)
+    return token
+
+
+async def _send_search_page(user_id: int, keyword: str, offset: int = 0):
+    """
+    Send one page of results for `keyword` and a footer with a "More" button
+    when further hits exist. The button names its own query, so an older
+    result list keeps paging its search after a newer one was made.
+    """
+    hits, suggestions, has_more = await db.search_files(
+        user_id, keyword, limit=FILES_PER_PAGE, offset=offset
+    )
+
+    if hits:
+        await _send_file_batch(user_id, hits)
+        kb = None
+        if has_more:
+            kb = InlineKeyboardMarkup().add(InlineKeyboardButton(
+                "More results ➡️",
+                callback_data=f"search_more_{_search_token(keyword)}_{offset + len(hits)}"
+            ))
+        await bot.send_message(
+            user_id,
+            f"Results {offset + 1}–{offset + len(hits)} for “{html.escape(keyword)}”.",
+            reply_markup=kb
+        )
+    elif suggestions:
+        await bot.send_message(user_id, "No exact matches. Maybe you meant one of these:")
+        await _send_file_batch(user_id, suggestions)
+    elif offset:
+        await bot.send_message(user_id, f"No more results for “{html.escape(keyword)}”.")
+    else:
+        await bot.send_message(user_id, f"Nothing matched “{html.escape(keyword)}”. 😕")
+
+
 @dp.callback_query_handler(lambda c: c.data.startswith("search_subject_"), state=SearchForm.select_method)
 async def process_search_subject(callback_query: types.CallbackQuery, state: FSMContext):
     """Search files by selected subject."""
@@ -338,23 +557,12 @@ async def process_search_subject(callback_query: types.CallbackQuery, state: FSM
     subject_id = int(callback_query.data.replace("search_subject_", ""))
     logger.info(f"User {user_id} searching by subject ID {subject_id}")
     try:
-        subject_name = next((s[1] for s in await db.get_subjects(user_id) if s[0] == subject_id), None)
-        if not subject_name:
+        subject = await db.get_subject(user_id, subject_id)
+        await state.finish()
+        if not subject:
             await bot.send_message(user_id, "Subject not found!")
-            await state.finish()
-            return
-        files = await db.search_files(user_id, subject_name)
-        if not files:
-            await bot.send_message(user_id, f"No files found for '{subject_name}'.")
         else:
-            for telegram_file_id, subject, description, file_id in files:
-                subject_id = next((s[0] for s in await db.get_subjects(user_id) if s[1] == subject), None)
-                teachers = await db.get_teachers_for_subject(subject_id) if subject_id else []
-                teacher_names = ", ".join(t[1] for t in teachers) if teachers else "No teacher"
-                caption = f"📚 {subject}\n👨‍🏫 {teacher_names}\n📝 {description}"
-                await bot.send_document(user_id, telegram_file_id, caption=caption)
-            await bot.send_message(user_id, f"Found {len(files)} file(s) for '{subject_name}'.")
-        await state.finish()
+            await _send_search_page(user_id, subject["name"])
     except Exception as e:
         logger.error(f"Error searching subject for user {user_id}: {str(e)}")
         await bot.send_message(user_id, "Error searching files!")
@@ -371,8 +579,8 @@ async def handle_invalid_search_input(message: types.Message, state: FSMContext)
 @dp.message_handler(state=SearchForm.select_method)
 async def process_search_input(message: types.Message, state: FSMContext):
     """
-    Search by file‑name, subject, or teacher.
-    Exact ILIKE hits first; if none, show up to five fuzzy suggestions.
+    Search by file‑name, description, document text, subject, or teacher.
+    Ranked hits one page at a time; if none, show up to five fuzzy suggestions.
     """
     user_id = message.from_user.id
     keyword = message.text.strip()
@@ -382,54 +590,52 @@ async def process_search_input(message: types.Message, state: FSMContext):
         await message.reply("Please type something to search.")
         return
 
+    await state.finish()
     try:
-        hits, suggestions = await db.search_files(user_id, keyword)
-
-        # Helper – renders the list of files the same way Materials does
-        async def _send_file_batch(rows):
-            for telegram_file_id, subject, description, file_id in rows:
-                # We need teacher names for the caption
-                subject_id = next(
-                    (sid for sid, name in await db.get_subjects(user_id)
-                     if name == subject or (subject == '—' and sid is None)),
-                    None,
-                )
-                teachers = await db.get_teachers_for_subject(subject_id) \
-                           if subject_id else []
-                teacher_names = ", ".join(t[1] for t in teachers) if teachers else "No teacher"
-
-                caption = (f"📚 {subject or 'No subject'}\n"
-                           f"👨‍🏫 {teacher_names}\n"
-                           f"📝 {description or '—'}")
-
-                kb = InlineKeyboardMarkup(row_width=2)
-                kb.add(
-                    InlineKeyboardButton("✏️ Update", callback_data=f"update_file_{file_id}"),
-                    InlineKeyboardButton("🗑️ Delete", callback_data=f"delete_file_{file_id}")
-                )
-
-                await bot.send_document(
-                    user_id,
-                    telegram_file_id,
-                    caption=caption,
-                    reply_markup=kb
-                )
-
-        if hits:
-            await _send_file_batch(hits)
-            await message.reply(f"Found {len(hits)} file(s) for “{keyword}”.")
-        elif suggestions:
-            await message.reply(
-                "No exact matches. Maybe you meant one of these:")
-            await _send_file_batch(suggestions)
-        else:
-            await message.reply("Nothing matched your search. 😕")
-
+        await _send_search_page(user_id, keyword)
     except Exception as e:
         logger.error("Error searching files for user %s: %s", user_id, e)
         await message.reply("❌ Error searching files!")
-    finally:
-        await state.finish()
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith("search_more_"), state="*")
+async def process_search_more(callback_query: types.CallbackQuery, state: FSMContext):
+    user_id = callback_query.from_user.id
+    token, _, offset = callback_query.data.replace("search_more_", "").rpartition("_")
+    offset = int(offset)
+    keyword = _search_queries.get(token)
+    logger.info("User %s requested more search results at offset %s", user_id, offset)
+    await bot.answer_callback_query(callback_query.id)
+    if not keyword:
+        await bot.send_message(user_id, "Search expired. Please search again.")
+        return
+    try:
+        await _send_search_page(user_id, keyword, offset)
+    except Exception as e:
+        logger.error("Error searching files for user %s: %s", user_id, e)
+        await bot.send_message(user_id, "❌ Error searching files!")
+
+@dp.message_handler(commands=["dedup_report"], state="*")
+async def dedup_report(message: types.Message):
+    """Show how much re-uploading and re-processing deduplication avoided."""
+    user_id = message.from_user.id
+    try:
+        mine = await db.get_dedup_report(user_id)
+        overall = await db.get_dedup_report()
+
+        def fmt(r):
+            return (f" • {r['duplicate_uploads']} duplicate upload(s) skipped "
+                    f"({r['duplicate_bytes'] / 1048576:.1f} MB)\n"
+                    f" • {r['linked_files']} file(s) reused extracted text "
+                    f"({r['linked_bytes'] / 1048576:.1f} MB not re-processed)")
+
+        await message.reply(
+            f"♻️ <b>Deduplication</b>\n\nYour materials:\n{fmt(mine)}\n\nAll users:\n{fmt(overall)}",
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.error("Error building dedup report for user %s: %s", user_id, e)
+        await message.reply("Error building the report!")
 
 # --- Delete File Flow ---
 @dp.callback_query_handler(lambda c: c.data.startswith("delete_file_"))
@@ -438,8 +644,7 @@ async def delete_file(callback_query: types.CallbackQuery, state: FSMContext):
     file_id = int(callback_query.data.replace("delete_file_", ""))
     logger.info(f"User {user_id} clicked 'delete_file_{file_id}'")
     try:
-        files = await db.get_files(user_id)
-        file_data = next((f for f in files if f[3] == file_id), None)
+        file_data = await db.get_file(user_id, file_id)
         if not file_data:
             await bot.send_message(user_id, "File not found!")
             return
@@ -449,7 +654,7 @@ async def delete_file(callback_query: types.CallbackQuery, state: FSMContext):
             InlineKeyboardButton("Yes", callback_data=f"confirm_delete_{file_id}"),
             InlineKeyboardButton("No", callback_data="cancel_delete")
         )
-        await bot.send_message(user_id, f"Are you sure you want to delete '{file_data[1]}'?", reply_markup=keyboard)
+        await bot.send_message(user_id, f"Are you sure you want to delete '{html.escape(file_data['file_name'] or 'this file')}'?", reply_markup=keyboard)
     except Exception as e:
         logger.error(f"Error initiating file deletion for user {user_id}: {str(e)}")
         await bot.send_message(user_id, "Error starting deletion!")
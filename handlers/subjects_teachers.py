@@ -21,59 +21,75 @@ async def _get_list_message(user_id: int, chat_id: int):
     data = await dp.current_state(chat=chat_id, user=user_id).get_data()
     return data.get("list_chat"), data.get("list_msg")
 
+# ─── page tokens carried in callback data ────────────────────────
+#   p<n>          – page n, read from the start of the list
+#   p<n>><id>     – page n, rows with id greater than <id>
+#   p<n><<id>     – page n, rows with id less than <id> (walking back)
+def _parse_page_token(token: str):
+    """Return (page, after_id, before_id) for a `p…` token."""
+    body = token[1:]
+    for sep in (">", "<"):
+        if sep in body:
+            page, rid = body.split(sep)
+            if sep == ">":
+                return int(page), int(rid), None
+            return int(page), None, int(rid)
+    return int(body), None, None
+
+def _page_token(page: int, rows) -> str:
+    """Token that re-renders the page currently showing `rows`."""
+    return f"p{page}>{rows[0][0] - 1}" if rows else f"p{page}"
+
 # ────────────────────────────────────────────────────────────────
 #  Rendering helpers (ONE source of truth)
 # ────────────────────────────────────────────────────────────────
-async def render_teachers_page(chat_id: int, msg_id: int,
-                               user_id: int, page: int):
-    rows, total = await db.get_teachers_page(user_id, page)
-    pages = max(1, math.ceil(total / PAGE_SIZE))
+async def _render_list_page(chat_id: int, msg_id: int, user_id: int,
+                            token: str, scope: str):
+    page, after_id, before_id = _parse_page_token(token)
+    if scope == "T":
+        fetch, title = db.get_teachers_page, "👥 <b>Your teachers</b>"
+    else:
+        fetch, title = db.get_subjects_page, "📚 <b>Your subjects</b>"
+
+    rows, total, has_more = await fetch(user_id, after_id, before_id, PAGE_SIZE)
+    if not rows and (after_id or before_id):
+        # the page emptied out under us (deletes) – fall back to the start
+        page, after_id, before_id = 1, None, None
+        rows, total, has_more = await fetch(user_id, limit=PAGE_SIZE)
+
+    if before_id is not None:
+        has_prev, has_next = has_more, True
+        if not has_prev:
+            page = 1
+    else:
+        has_prev, has_next = page > 1, has_more
+    pages = max(page, math.ceil(total / PAGE_SIZE), 1)
+    here = _page_token(page, rows)
 
-    text = f"👥 <b>Your teachers</b>  (page {page}/{pages})\n\n"
+    text = f"{title}  (page {page}/{pages})\n\n"
     kb   = InlineKeyboardMarkup(row_width=1)
 
-    try:
-        await bot.edit_message_text(
-            text, chat_id, msg_id,
-            reply_markup=kb, parse_mode="HTML"
-        )
-    except MessageNotModified:
-        pass
-
-    for tid, name in rows:
+    for rid, name in rows:
         kb.add(InlineKeyboardButton(
-            name, callback_data=f"mgr:T:open:{tid}:p{page}"
+            name, callback_data=f"mgr:{scope}:open:{rid}:{here}"
         ))
         text += f"• {name}\n"
 
     nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton("« Prev", callback_data=f"mgr:T:p{page-1}"))
-    if page < pages:
-        nav.append(InlineKeyboardButton("Next »", callback_data=f"mgr:T:p{page+1}"))
+    if has_prev:
+        nav.append(InlineKeyboardButton(
+            "« Prev", callback_data=f"mgr:{scope}:p{page-1}<{rows[0][0]}"))
+    if has_next and rows:
+        nav.append(InlineKeyboardButton(
+            "Next »", callback_data=f"mgr:{scope}:p{page+1}>{rows[-1][0]}"))
     if nav:
         kb.row(*nav)
 
-    
     kb.row(
-        InlineKeyboardButton("➕ Add", callback_data=f"mgr:T:add:p{page}"),
+        InlineKeyboardButton("➕ Add", callback_data=f"mgr:{scope}:add:{here}"),
         InlineKeyboardButton("🏠 Home", callback_data="mgr:root")
     )
 
-    await bot.edit_message_text(
-        text, chat_id, msg_id,
-        reply_markup=kb, parse_mode="HTML"
-    )
-
-
-async def render_subjects_page(chat_id: int, msg_id: int,
-                               user_id: int, page: int):
-    rows, total = await db.get_subjects_page(user_id, page)
-    pages = max(1, math.ceil(total / PAGE_SIZE))
-
-    text = f"📚 <b>Your subjects</b>  (page {page}/{pages})\n\n"
-    kb   = InlineKeyboardMarkup(row_width=1)
-
     try:
         await bot.edit_message_text(
             text, chat_id, msg_id,
@@ -82,29 +98,15 @@ async def render_subjects_page(chat_id: int, msg_id: int,
     except MessageNotModified:
         pass
 
-    for sid, name in rows:
-        kb.add(InlineKeyboardButton(
-            name, callback_data=f"mgr:S:open:{sid}:p{page}"
-        ))
-        text += f"• {name}\n"
 
-    nav = []
-    if page > 1:
-        nav.append(InlineKeyboardButton("« Prev", callback_data=f"mgr:S:p{page-1}"))
-    if page < pages:
-        nav.append(InlineKeyboardButton("Next »", callback_data=f"mgr:S:p{page+1}"))
-    if nav:
-        kb.row(*nav)
+async def render_teachers_page(chat_id: int, msg_id: int,
+                               user_id: int, token: str = "p1"):
+    await _render_list_page(chat_id, msg_id, user_id, token, "T")
 
-    kb.row(
-        InlineKeyboardButton("➕ Add", callback_data=f"mgr:S:add:p{page}"),
-        InlineKeyboardButton("🏠 Home", callback_data="mgr:root")
-    )
 
-    await bot.edit_message_text(
-        text, chat_id, msg_id,
-        reply_markup=kb, parse_mode="HTML"
-    )
+async def render_subjects_page(chat_id: int, msg_id: int,
+                               user_id: int, token: str = "p1"):
+    await _render_list_page(chat_id, msg_id, user_id, token, "S")
 
 # ────────────────────────────────────────────────────────────────
 #  Root chooser
@@ -137,20 +139,19 @@ async def mgr_root_cb(c: CallbackQuery):
     await c.answer()
 
 # ────────────────────────────────────────────────────────────────
-#  List‑page callbacks (T:p<n> / S:p<n>)
+#  List‑page callbacks (T:p<token> / S:p<token>)
 # ────────────────────────────────────────────────────────────────
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:T:p") or
                                       c.data.startswith("mgr:S:p"))
 async def mgr_list_page_cb(c: CallbackQuery):
     _, scope, page_token = c.data.split(":")
-    page = int(page_token[1:])
 
     if scope == "T":
         await render_teachers_page(c.message.chat.id, c.message.message_id,
-                                   c.from_user.id, page)
+                                   c.from_user.id, page_token)
     else:
         await render_subjects_page(c.message.chat.id, c.message.message_id,
-                                   c.from_user.id, page)
+                                   c.from_user.id, page_token)
     await c.answer()
 
 # ────────────────────────────────────────────────────────────────
@@ -158,8 +159,7 @@ async def mgr_list_page_cb(c: CallbackQuery):
 # ────────────────────────────────────────────────────────────────
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:T:add"))
 async def add_teacher_start(c: CallbackQuery, state: FSMContext):
-    page = int(c.data.split(":")[3][1:])
-    await state.update_data(return_page=page)
+    await state.update_data(return_page=c.data.split(":")[3])
     await AddTeacherForm.name.set()
     await bot.send_message(c.from_user.id, "Enter new teacher name:")
     await c.answer()
@@ -178,8 +178,7 @@ async def add_teacher_save(m: types.Message, state: FSMContext):
 # same for subjects
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:S:add"))
 async def add_subject_start(c: CallbackQuery, state: FSMContext):
-    page = int(c.data.split(":")[3][1:])
-    await state.update_data(return_page=page)
+    await state.update_data(return_page=c.data.split(":")[3])
     await AddSubjectForm.name.set()
     await bot.send_message(c.from_user.id, "Enter new subject name:")
     await c.answer()
@@ -201,45 +200,42 @@ async def add_subject_save(m: types.Message, state: FSMContext):
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:T:open") or
                                       c.data.startswith("mgr:S:open"))
 async def mgr_open_card(c: CallbackQuery):
-    scope, _, rid, page_str = c.data.split(":")[1:]
+    scope, _, rid, page = c.data.split(":")[1:]
     rid  = int(rid)
-    page = int(page_str[1:])
     user_id = c.from_user.id
 
     if scope == "T":
-        row = await db.get_teacher(user_id, rid)
-        subjects = await db.get_subjects(user_id)
-        assigned = [
-            sname for sid, sname in subjects
-            if (await db.get_teachers_for_subject(sid)) and rid in [tid for tid, _ in await db.get_teachers_for_subject(sid)]
-        ]
-        file_count = await db.count_files_by_teacher(user_id, rid)
+        row = await db.get_teacher_card(user_id, rid)
+        if row is None:
+            return await c.answer("Teacher not found", show_alert=True)
+        assigned = row["subjects"]
         header = (
             f"👩‍🏫 <b>{row['name']}</b>\n\n"
             f"📚 Subjects: {', '.join(assigned) if assigned else '—'}\n"
-            f"📁 Files: {file_count}"
+            f"📁 Files: {row['file_count']}"
         )
         kb = InlineKeyboardMarkup(row_width=1).add(
             InlineKeyboardButton("📚 Assign to subject", callback_data=f"mgr:T:assign:{rid}"),
-            InlineKeyboardButton("✏️ Rename",            callback_data=f"mgr:T:rename:{rid}:p{page}"),
-            InlineKeyboardButton("🗑️ Delete",            callback_data=f"mgr:T:del:{rid}:p{page}"),
-            InlineKeyboardButton("🔙 Back",              callback_data=f"mgr:T:p{page}")
+            InlineKeyboardButton("✏️ Rename",            callback_data=f"mgr:T:rename:{rid}:{page}"),
+            InlineKeyboardButton("🗑️ Delete",            callback_data=f"mgr:T:del:{rid}:{page}"),
+            InlineKeyboardButton("🔙 Back",              callback_data=f"mgr:T:{page}")
         )
     else:
-        row = await db.get_subject(user_id, rid)
-        teachers = await db.get_teachers_for_subject(rid)
-        file_count = await db.count_files_by_subject(user_id, rid)
+        row = await db.get_subject_card(user_id, rid)
+        if row is None:
+            return await c.answer("Subject not found", show_alert=True)
+        teachers = row["teachers"]
         header = (
             f"📚 <b>{row['name']}</b>\n\n"
-            f"👥 Teachers: {', '.join(t[1] for t in teachers) if teachers else '—'}\n"
-            f"📁 Files: {file_count}"
+            f"👥 Teachers: {', '.join(teachers) if teachers else '—'}\n"
+            f"📁 Files: {row['file_count']}"
         )
         kb = InlineKeyboardMarkup(row_width=1).add(
         
             InlineKeyboardButton("👥 Assign teacher", callback_data=f"mgr:S:assign:{rid}"),
-            InlineKeyboardButton("✏️ Rename",         callback_data=f"mgr:S:rename:{rid}:p{page}"),
-            InlineKeyboardButton("🗑️ Delete",         callback_data=f"mgr:S:del:{rid}:p{page}"),
-            InlineKeyboardButton("🔙 Back",           callback_data=f"mgr:S:p{page}")
+            InlineKeyboardButton("✏️ Rename",         callback_data=f"mgr:S:rename:{rid}:{page}"),
+            InlineKeyboardButton("🗑️ Delete",         callback_data=f"mgr:S:del:{rid}:{page}"),
+            InlineKeyboardButton("🔙 Back",           callback_data=f"mgr:S:{page}")
         )
 
     await bot.edit_message_text(header, c.message.chat.id, c.message.message_id,
@@ -251,8 +247,8 @@ async def mgr_open_card(c: CallbackQuery):
 # ────────────────────────────────────────────────────────────────
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:T:rename"))
 async def rename_teacher_start(c: CallbackQuery, state: FSMContext):
-    _, _, _, tid, page_str = c.data.split(":")
-    await state.update_data(tid=int(tid), return_page=int(page_str[1:]))
+    _, _, _, tid, page = c.data.split(":")
+    await state.update_data(tid=int(tid), return_page=page)
     await RenameTeacherForm.new_name.set()
     await bot.send_message(c.from_user.id, "Send new teacher name:")
     await c.answer()
@@ -270,8 +266,8 @@ async def rename_teacher_save(m: types.Message, state: FSMContext):
 # rename subject
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:S:rename"))
 async def rename_subject_start(c: CallbackQuery, state: FSMContext):
-    _, _, _, sid, page_str = c.data.split(":")
-    await state.update_data(sid=int(sid), return_page=int(page_str[1:]))
+    _, _, _, sid, page = c.data.split(":")
+    await state.update_data(sid=int(sid), return_page=page)
     await RenameSubjectForm.new_name.set()
     await bot.send_message(c.from_user.id, "Send new subject name:")
     await c.answer()
@@ -291,18 +287,18 @@ async def rename_subject_save(m: types.Message, state: FSMContext):
 # ────────────────────────────────────────────────────────────────
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:T:del"))
 async def del_teacher(c: CallbackQuery):
-    _, _, _, tid, page_str = c.data.split(":")
+    _, _, _, tid, page = c.data.split(":")
     await db.delete_teacher(c.from_user.id, int(tid))
     chat_id, msg_id = await _get_list_message(c.from_user.id, c.message.chat.id)
-    await render_teachers_page(chat_id, msg_id, c.from_user.id, int(page_str[1:]))
+    await render_teachers_page(chat_id, msg_id, c.from_user.id, page)
     await c.answer("Deleted ✅")
 
 @dp.callback_query_handler(lambda c: c.data.startswith("mgr:S:del"))
 async def del_subject(c: CallbackQuery):
-    _, _, _, sid, page_str = c.data.split(":")
+    _, _, _, sid, page = c.data.split(":")
     await db.delete_subject(c.from_user.id, int(sid))
     chat_id, msg_id = await _get_list_message(c.from_user.id, c.message.chat.id)
-    await render_subjects_page(chat_id, msg_id, c.from_user.id, int(page_str[1:]))
+    await render_subjects_page(chat_id, msg_id, c.from_user.id, page)
     await c.answer("Deleted ✅")
 
 # ────────────────────────────────────────────────────────────────
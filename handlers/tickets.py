@@ -1,10 +1,16 @@
+import asyncio
+import html
 import random
+from contextlib import aclosing, suppress
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.exceptions import TelegramAPIError
 
-from loader import bot, dp, logger, openai_client
+from config import AI_TIMEOUT
+from loader import bot, dp, logger
 from database.db import db
+from services.ticket_ai import ai_jobs, stream_tickets, AiJobRejected, TICKETS_PER_REQUEST
 from states.forms import TicketForm
 
 
@@ -70,40 +76,78 @@ async def process_topics(message: types.Message, state: FSMContext):
 async def process_generate_ai(callback_query: types.CallbackQuery, state: FSMContext):
     user_id = callback_query.from_user.id
     logger.info(f"User {user_id} clicked 'generate_ai'")
+    # acknowledge right away – the model answers in seconds, the button spinner gives up sooner
+    await bot.answer_callback_query(callback_query.id)
     async with state.proxy() as data:
         subject = data['subject']
         topics = data.get('topics', [])
+    await state.finish()
+
+    waiting = "⏳ Waiting for a free generator…" if ai_jobs.busy else "⚙️ Generating tickets…"
+    status = await bot.send_message(user_id, waiting)
     try:
-        topics_str = ", ".join(topics) if topics else "any relevant topics for university students"
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates exam questions for university students."},
-                {"role": "user", "content": f"Generate 5 exam questions for the subject '{subject}' covering {topics_str}. Format as a numbered list."}
-            ],
-            max_tokens=1000,
-            temperature=0.7
-        )
-        tickets = response.choices[0].message.content.split('\n')
-        tickets = [t.strip() for t in tickets if t.strip() and t.strip().startswith(('1.', '2.', '3.', '4.', '5.'))]
-        tickets = [t.lstrip('0123456789. ').strip() for t in tickets]
-        if not tickets:
-            await bot.send_message(user_id, "Failed to generate tickets. Try again or enter manually.")
-            await state.finish()
-            return
-        ticket_ids = []
-        for ticket in tickets:
-            ticket_id = await db.add_ticket(user_id, subject, ticket)
-            ticket_ids.append((ticket_id, ticket))
-        response = f"Added {len(tickets)} tickets for {subject}:\n"
-        for i, (_, ticket) in enumerate(ticket_ids, 1):
-            response += f"{i}. {ticket}\n"
-        await bot.send_message(user_id, response)
+        ai_jobs.submit(user_id, _generate_tickets, user_id, subject, topics, status,
+                       on_cancel=lambda: _cancelled_while_waiting(status))
+    except AiJobRejected as e:
+        await status.edit_text(f"⏳ {e}")
+
+
+async def _cancelled_while_waiting(status: types.Message):
+    with suppress(TelegramAPIError):
+        await status.edit_text("🛑 Ticket generation cancelled.")
+
+
+def _tickets_text(subject: str, tickets: list[str], header: str) -> str:
+    lines = [f"{header} for {html.escape(subject)}:"]
+    lines += [f"{i}. {html.escape(ticket)}" for i, ticket in enumerate(tickets, 1)]
+    return "\n".join(lines)
+
+
+async def _generate_tickets(user_id: int, subject: str, topics: list[str], status: types.Message):
+    """Background job: save tickets as the model produces them, editing one status message."""
+    tickets = []
+
+    async def collect():
+        # leaving the block (done, cancelled or timed out) closes the stream
+        async with aclosing(stream_tickets(subject, topics)) as stream:
+            async for ticket in stream:
+                await db.add_ticket(user_id, subject, ticket)
+                tickets.append(ticket)
+                header = f"⚙️ Generating… {len(tickets)}/{TICKETS_PER_REQUEST}"
+                with suppress(TelegramAPIError):
+                    await status.edit_text(_tickets_text(subject, tickets, header))
+
+    try:
+        # the whole answer within AI_TIMEOUT, not just each read
+        await asyncio.wait_for(collect(), AI_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"AI generation for user {user_id} timed out after {AI_TIMEOUT}s")
+        with suppress(TelegramAPIError):
+            if tickets:
+                await status.edit_text(_tickets_text(subject, tickets, f"⌛ Timed out – kept {len(tickets)} tickets"))
+            else:
+                await status.edit_text("⌛ Ticket generation timed out. Try again or enter manually.")
+        return
+    except asyncio.CancelledError:
+        with suppress(TelegramAPIError):
+            if tickets:
+                await status.edit_text(_tickets_text(subject, tickets, f"🛑 Cancelled – kept {len(tickets)} tickets"))
+            else:
+                await status.edit_text("🛑 Ticket generation cancelled.")
+        raise
     except Exception as e:
         logger.error(f"AI generation error for user {user_id}: {str(e)}")
-        await bot.send_message(user_id, f"Generation error: {str(e)}")
-    await state.finish()
-    await bot.answer_callback_query(callback_query.id)
+        with suppress(TelegramAPIError):
+            await status.edit_text(f"Generation error: {html.escape(str(e))}")
+        return
+
+    if not tickets:
+        with suppress(TelegramAPIError):
+            await status.edit_text("Failed to generate tickets. Try again or enter manually.")
+        return
+    with suppress(TelegramAPIError):
+        await status.edit_text(_tickets_text(subject, tickets, f"Added {len(tickets)} tickets"))
+    logger.info(f"User {user_id} generated {len(tickets)} tickets for {subject}")
 
 @dp.callback_query_handler(lambda c: c.data == "generate_manual", state=TicketForm.generate)
 async def process_generate_manual(callback_query: types.CallbackQuery, state: FSMContext):
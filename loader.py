@@ -1,9 +1,10 @@
 import logging
 from aiogram import Bot, Dispatcher
+from aiogram.bot.api import TelegramAPIServer, TELEGRAM_PRODUCTION
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from openai import AsyncOpenAI
-from config import BOT_TOKEN, OPENAI_API_KEY
+from config import BOT_TOKEN, OPENAI_API_KEY, TELEGRAM_API_URL
 
 # ─── Logging Setup ───────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -13,7 +14,11 @@ logging.basicConfig(
 logger = logging.getLogger("studybot")
 
 # ─── Core Instances ──────────────────────────────────────────────────────────
-bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
+bot = Bot(
+    token=BOT_TOKEN,
+    parse_mode="HTML",
+    server=TelegramAPIServer.from_base(TELEGRAM_API_URL) if TELEGRAM_API_URL else TELEGRAM_PRODUCTION,
+)
 dp = Dispatcher(bot, storage=MemoryStorage())
 scheduler = AsyncIOScheduler()
 
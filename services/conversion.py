@@ -0,0 +1,271 @@
+import asyncio
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (
+    CONVERT_WORKERS,
+    CONVERT_QUEUE_SIZE,
+    CONVERT_MAX_JOBS_PER_USER,
+    CONVERT_TIMEOUT,
+)
+from loader import logger
+
+
+class ConversionError(Exception):
+    """A conversion job that did not produce an output."""
+
+
+class ConversionRejected(ConversionError):
+    """Not accepted: the queue is full or the user is at their limit."""
+
+
+class ConversionCancelled(ConversionError):
+    """Cancelled by the user (/cancel) or on shutdown."""
+
+
+class ConversionTimeout(ConversionError):
+    """Ran longer than its timeout and was killed."""
+
+
+def _kill_executor(executor: ProcessPoolExecutor):
+    for process in list(executor._processes.values()):
+        process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkerPool:
+    """
+    Like a ProcessPoolExecutor, but made of single-process executors handed
+    out one call at a time, so a call whose caller is cancelled (by /cancel
+    or a job timeout) is stopped by killing its process instead of running
+    on unobserved. Used by services that split one conversion into many
+    calls – a shared ProcessPoolExecutor cannot interrupt a running call.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._idle: asyncio.Queue | None = None
+        self._executors: set[ProcessPoolExecutor] = set()
+
+    def start(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self._idle.put_nowait(self._new_executor())
+
+    def stop(self, wait: bool = False):
+        """Kill the workers – or, with `wait`, let them finish their calls and exit."""
+        self._idle = None
+        for executor in self._executors:
+            if wait:
+                executor.shutdown(wait=True)
+            else:
+                _kill_executor(executor)
+        self._executors.clear()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=1)
+        self._executors.add(executor)
+        return executor
+
+    async def run(self, func, *args):
+        """Run `func(*args)` in the next free process and return its result."""
+        idle = self._idle
+        executor = await idle.get()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except (asyncio.CancelledError, BrokenProcessPool):
+            # the call may still be running: kill it and give the slot a fresh process
+            self._executors.discard(executor)
+            _kill_executor(executor)
+            executor = self._new_executor()
+            raise
+        finally:
+            if self._idle is idle:
+                idle.put_nowait(executor)
+
+
+class ConversionJob:
+    def __init__(self, user_id: int, func, args: tuple, priority: int, seq: int, timeout: float):
+        self.user_id = user_id
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.seq = seq
+        self.timeout = timeout
+        self.worker: int | None = None     # set while running
+        self.call: asyncio.Future | None = None
+        self.future = asyncio.get_running_loop().create_future()
+
+    @property
+    def running(self) -> bool:
+        return self.worker is not None and not self.future.done()
+
+    def sort_key(self):
+        return self.priority, self.seq
+
+
+class ConversionEngine:
+    """
+    Runs CPU-heavy conversions in worker processes so the event loop only
+    ever waits on futures.
+
+    Jobs wait in a bounded priority queue. A user's first job is queued with
+    priority 0, their second with 1 and so on, so one user's burst never
+    starts ahead of someone else's first file; at most
+    CONVERT_MAX_JOBS_PER_USER are accepted per user. Each of the
+    CONVERT_WORKERS tasks owns a single-process executor, which lets a timed
+    out or cancelled job be stopped by killing just that process – a
+    ProcessPoolExecutor cannot interrupt a call that is already running.
+    Coroutine functions are awaited in the slot instead and are cancelled.
+    """
+
+    def __init__(self, workers: int = CONVERT_WORKERS, queue_size: int = CONVERT_QUEUE_SIZE,
+                 per_user: int = CONVERT_MAX_JOBS_PER_USER, timeout: float = CONVERT_TIMEOUT):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.per_user = per_user
+        self.timeout = timeout
+        self.queue: asyncio.PriorityQueue | None = None
+        self._executors: list[ProcessPoolExecutor | None] = []
+        self._tasks: list[asyncio.Task] = []
+        self._active: dict[int, list[ConversionJob]] = {}
+        self._pending: set[ConversionJob] = set()
+        self._seq = itertools.count()
+
+    async def start(self):
+        self.queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self._executors = [None] * self.workers
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info("Conversion engine started with %s workers", self.workers)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for jobs in list(self._active.values()):
+            for job in list(jobs):
+                if not job.future.done():
+                    job.future.set_exception(ConversionCancelled())
+        for n in range(len(self._executors)):
+            self._kill(n)
+        logger.info("Conversion engine stopped")
+
+    def submit(self, user_id: int, func, *args, timeout: float | None = None) -> ConversionJob:
+        """
+        Queue `func(*args)` for a worker process and return the job; await
+        `job.future` for the result. Raises ConversionRejected when the user
+        is at their limit or the queue is full.
+        """
+        if self.queue is None:
+            raise ConversionRejected("The converter is not running.")
+        active = self._active.setdefault(user_id, [])
+        if len(active) >= self.per_user:
+            raise ConversionRejected(
+                f"You already have {len(active)} conversion(s) in progress. "
+                "Wait for them to finish or use /cancel."
+            )
+        job = ConversionJob(user_id, func, args, len(active), next(self._seq),
+                            timeout or self.timeout)
+        try:
+            self.queue.put_nowait((job.priority, job.seq, job))
+        except asyncio.QueueFull:
+            raise ConversionRejected("The converter is busy right now, please try again in a minute.")
+        active.append(job)
+        self._pending.add(job)
+        job.future.add_done_callback(lambda _: self._forget(job))
+        return job
+
+    def position(self, job: ConversionJob) -> int:
+        """1-based place in the queue, or 0 once the job has started."""
+        if job not in self._pending:
+            return 0
+        key = job.sort_key()
+        return 1 + sum(1 for other in self._pending if other.sort_key() < key)
+
+    def cancel_user(self, user_id: int) -> int:
+        """Cancel every queued or running job of `user_id`. Returns how many."""
+        cancelled = 0
+        for job in list(self._active.get(user_id, ())):
+            if job.future.done():
+                continue
+            if job.running:
+                self._interrupt(job)
+            job.future.set_exception(ConversionCancelled())
+            cancelled += 1
+        if cancelled:
+            logger.info("Cancelled %s conversion job(s) of user %s", cancelled, user_id)
+        return cancelled
+
+    def _forget(self, job: ConversionJob):
+        # mark the outcome as seen – a cancelled job may have nobody awaiting it
+        if not job.future.cancelled():
+            job.future.exception()
+        self._pending.discard(job)
+        jobs = self._active.get(job.user_id)
+        if jobs and job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del self._active[job.user_id]
+
+    def _executor(self, n: int) -> ProcessPoolExecutor:
+        if self._executors[n] is None:
+            self._executors[n] = ProcessPoolExecutor(max_workers=1)
+        return self._executors[n]
+
+    def _interrupt(self, job: ConversionJob):
+        if isinstance(job.call, asyncio.Task):
+            job.call.cancel()
+        else:
+            self._kill(job.worker)
+
+    def _kill(self, n: int):
+        executor, self._executors[n] = self._executors[n], None
+        if executor is not None:
+            _kill_executor(executor)
+
+    async def _worker(self, n: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self.queue.get()
+            try:
+                self._pending.discard(job)
+                if job.future.done():
+                    continue   # cancelled while it was waiting
+                job.worker = n
+                if asyncio.iscoroutinefunction(job.func):
+                    # the work already happens in another process (e.g. a LibreOffice
+                    # listener); the slot only waits for it
+                    call = asyncio.ensure_future(job.func(*job.args))
+                else:
+                    call = loop.run_in_executor(self._executor(n), job.func, *job.args)
+                job.call = call
+                # a killed process leaves `call` failing later; nobody awaits it then
+                call.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+                await asyncio.wait({call, job.future}, timeout=job.timeout,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if job.future.done():
+                    continue   # cancel_user already stopped it
+                if call.done():
+                    if call.exception() is not None:
+                        job.future.set_exception(call.exception())
+                    else:
+                        job.future.set_result(call.result())
+                else:
+                    logger.warning("Conversion job of user %s timed out after %ss",
+                                   job.user_id, job.timeout)
+                    self._interrupt(job)
+                    job.future.set_exception(ConversionTimeout())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Conversion worker %s failed: %s", n, e)
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+
+conversion_engine = ConversionEngine()
@@ -0,0 +1,75 @@
+from config import CONVERSION_CACHE_SIZE
+from database.db import db
+from loader import logger
+
+
+def unique_key(file_unique_id: str) -> str:
+    return f"u:{file_unique_id}"
+
+
+def hash_key(content_hash: str) -> str:
+    return f"h:{content_hash}"
+
+
+class ConversionCache:
+    """
+    Converted outputs keyed by (input, conversion_type).
+
+    An input is known by its Telegram file_unique_id – checked before anything
+    is downloaded – and by the sha256 of its bytes, which catches the same
+    document re-sent under another id. The value is the file_id Telegram gave
+    the output we sent, so a hit is a single send_document with no download
+    and no conversion. Entries live in Postgres (shared across restarts);
+    least recently used ones beyond CONVERSION_CACHE_SIZE are pruned
+    periodically.
+    """
+
+    def __init__(self, max_entries: int = CONVERSION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    async def lookup(self, input_key: str, conversion_type: str) -> str | None:
+        output_file_id = await db.get_cached_conversion(input_key, conversion_type)
+        if output_file_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return output_file_id
+
+    async def store(self, input_keys: list[str], conversion_type: str, output_file_id: str):
+        await db.cache_conversion(input_keys, conversion_type, output_file_id)
+
+    async def invalidate(self, output_file_id: str):
+        """Telegram rejected a cached file_id – forget it so the next request converts."""
+        self.stale += 1
+        await db.drop_cached_conversion(output_file_id)
+
+    async def prune(self):
+        evicted = await db.prune_conversion_cache(self.max_entries)
+        self.evictions += evicted
+        if evicted:
+            logger.info("Conversion cache: evicted %s least recently used entries", evicted)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stale": self.stale,
+            "evictions": self.evictions,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            "Conversion cache: %s hits / %s misses (%.0f%% hit rate), "
+            "%s stale, %s evictions",
+            s["hits"], s["misses"], s["hit_rate"] * 100, s["stale"], s["evictions"],
+        )
+
+
+conversion_cache = ConversionCache()
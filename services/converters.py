@@ -0,0 +1,390 @@
+import io
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep this module free of bot/database imports: it runs inside worker processes.
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def pdf_to_docx(pdf_path: str, docx_path: str, start: int = 0, end: int | None = None) -> str:
+    """Convert pages [start, end) of a PDF (all of them by default)."""
+    from pdf2docx import Converter
+    cv = Converter(pdf_path)
+    try:
+        cv.convert(docx_path, start=start, end=end)
+    finally:
+        cv.close()
+    return docx_path
+
+
+def merge_docx(paths: list[str], out_path: str) -> str:
+    """
+    Append the bodies of paths[1:] to paths[0], each after a page break, and
+    save the result as out_path. Images are re-added to the first document's
+    package (python-docx dedups them) and hyperlinks re-related, so the
+    copied elements' relationship ids stay valid.
+    """
+    import copy
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from docx.oxml.ns import qn
+
+    master = Document(paths[0])
+    body = master.element.body
+    rel_attrs = (qn("r:embed"), qn("r:id"), qn("r:link"))
+    for path in paths[1:]:
+        part = Document(path).part
+        master.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+        for element in part.element.body.iterchildren():
+            if element.tag == qn("w:sectPr"):
+                continue
+            element = copy.deepcopy(element)
+            for node in element.iter():
+                for attr in rel_attrs:
+                    rel = part.rels.get(node.get(attr))
+                    if rel is None:
+                        continue
+                    if rel.is_external:
+                        new_rid = master.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+                    elif rel.reltype == RT.IMAGE:
+                        new_rid, _ = master.part.get_or_add_image(io.BytesIO(rel.target_part.blob))
+                    else:
+                        continue
+                    node.set(attr, new_rid)
+            # the final sectPr must stay the body's last child
+            if body.sectPr is not None:
+                body.sectPr.addprevious(element)
+            else:
+                body.append(element)
+    master.save(out_path)
+    return out_path
+
+
+TEXT_MODES = ("plain", "blocks", "markdown")
+
+
+def _blocks_text(page) -> str:
+    # text blocks in reading order (top to bottom, left to right), a blank line between them
+    blocks = page.get_text("blocks", sort=True)
+    return "\n\n".join(b[4].strip() for b in blocks if b[6] == 0 and b[4].strip()) + "\n"
+
+
+def _markdown_text(page) -> str:
+    """
+    Lines set noticeably larger than the page's body text become headings,
+    bold spans are marked up; everything else is plain paragraphs.
+    """
+    from collections import Counter
+    blocks = [b for b in page.get_text("dict", sort=True)["blocks"] if b["type"] == 0]
+    sizes = Counter(round(span["size"]) for b in blocks for line in b["lines"]
+                    for span in line["spans"] if span["text"].strip())
+    if not sizes:
+        return ""
+    body = sizes.most_common(1)[0][0]
+
+    paragraphs = []
+    for b in blocks:
+        lines = []
+        for line in b["lines"]:
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            size = max(round(s["size"]) for s in spans)
+            text = "".join(
+                f"**{s['text'].strip()}** " if s["flags"] & 16 and size <= body else s["text"]
+                for s in line["spans"]
+            ).strip()
+            if size >= body * 1.6:
+                text = "# " + text.replace("**", "")
+            elif size >= body * 1.2:
+                text = "## " + text.replace("**", "")
+            lines.append(text)
+        if lines:
+            paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs) + "\n"
+
+
+def pdf_text_pages(pdf_path: str, mode: str = "plain"):
+    """Yield the text of one page at a time, so memory does not grow with the page count."""
+    import fitz
+    extract = {
+        "plain": lambda page: page.get_text(),
+        "blocks": _blocks_text,
+        "markdown": _markdown_text,
+    }[mode]
+    with fitz.open(pdf_path) as doc:
+        for n in range(doc.page_count):
+            yield extract(doc.load_page(n))
+
+
+def pdf_to_txt(pdf_path: str, txt_path: str, mode: str = "plain", part_size: int = 0) -> list[str]:
+    """
+    Stream the text of a PDF into `txt_path`. With `part_size` (bytes) the
+    output is split at page boundaries into txt_path, name-2.txt, … so that
+    no part grows past it (a single page larger than that gets a part of its
+    own). Returns the paths written.
+    """
+    base, ext = os.path.splitext(txt_path)
+    paths = [txt_path]
+    out = open(txt_path, "w", encoding="utf-8")
+    try:
+        written = 0
+        for n, text in enumerate(pdf_text_pages(pdf_path, mode), 1):
+            if mode == "markdown" and n > 1:
+                text = f"\n---\n\n{text}"
+            size = len(text.encode("utf-8"))
+            if part_size and written and written + size > part_size:
+                out.close()
+                paths.append(f"{base}-{len(paths) + 1}{ext}")
+                out = open(paths[-1], "w", encoding="utf-8")
+                written = 0
+            out.write(text)
+            written += size
+    finally:
+        out.close()
+    return paths
+
+
+def office_to_pdf(input_path: str, outdir: str, timeout: float | None = None) -> str:
+    """Convert a .docx/.pptx with LibreOffice; returns the produced PDF path."""
+    import pathlib
+    import shutil
+    import tempfile
+    # a profile of its own: concurrent soffice runs sharing one would wait on,
+    # or hand their document to, whichever instance holds the profile lock
+    profile = tempfile.mkdtemp(prefix=".lo-profile-", dir=outdir)
+    try:
+        # subprocess' own timeout kills soffice – killing our worker would orphan it
+        subprocess.run(
+            ["libreoffice", f"-env:UserInstallation={pathlib.Path(profile).as_uri()}",
+             "--headless", "--convert-to", "pdf", "--outdir", outdir, input_path],
+            check=True, timeout=timeout,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    finally:
+        shutil.rmtree(profile, ignore_errors=True)
+    return os.path.join(outdir, os.path.splitext(os.path.basename(input_path))[0] + ".pdf")
+
+
+# Longest page side in points (A4 height); every page keeps its image's aspect ratio
+_PAGE_LONG_SIDE = 842
+
+
+def _prepare_image(path: str, max_side: int):
+    """
+    Return (data, width, height) for one image. JPEGs that need no rotation
+    and are within `max_side` are passed through untouched so the PDF embeds
+    the original DCT stream; anything else is decoded, rotated, downscaled
+    and re-encoded once.
+    """
+    from PIL import Image, ImageOps
+    with Image.open(path) as im:
+        rotated = im.getexif().get(0x0112, 1) != 1   # EXIF Orientation
+        if (im.format == "JPEG" and im.mode in ("RGB", "L") and not rotated
+                and max(im.size) <= max_side):
+            with open(path, "rb") as f:
+                return f.read(), im.width, im.height
+
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            background = Image.new("RGB", im.size, "white")
+            background.paste(im, mask=im.getchannel("A"))
+            im = background
+        elif im.mode != "RGB":
+            im = im.convert("RGB")
+        im.thumbnail((max_side, max_side), Image.LANCZOS)
+        out = io.BytesIO()
+        im.save(out, "JPEG", quality=85, optimize=True)
+        return out.getvalue(), im.width, im.height
+
+
+def images_to_pdf(paths: list[str], pdf_path: str, max_side: int = 2480, threads: int = 4) -> str:
+    """One page per image, sized to the image's aspect ratio."""
+    import fitz
+    # Pillow releases the GIL while decoding and resizing, so threads help here
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        images = list(pool.map(lambda p: _prepare_image(p, max_side), paths))
+
+    with fitz.open() as doc:
+        for data, width, height in images:
+            scale = _PAGE_LONG_SIDE / max(width, height)
+            page = doc.new_page(width=width * scale, height=height * scale)
+            page.insert_image(page.rect, stream=data)
+        doc.save(pdf_path, garbage=3, deflate=True)
+    return pdf_path
+
+
+# ─── PDF toolkit ─────────────────────────────────────────────────────
+# Page ranges are 0-based and end-exclusive: [(0, 3), (5, 6)] is pages 1–3 and 6.
+
+def pdf_merge(paths: list[str], pdf_path: str) -> str:
+    import fitz
+    with fitz.open() as out:
+        for path in paths:
+            with fitz.open(path) as doc:
+                out.insert_pdf(doc)
+        out.save(pdf_path, garbage=3, deflate=True)
+    return pdf_path
+
+
+def pdf_extract(pdf_path: str, ranges: list[tuple[int, int]], out_path: str) -> str:
+    """One PDF with the given pages, in the given order."""
+    import fitz
+    with fitz.open(pdf_path) as doc, fitz.open() as out:
+        for start, end in ranges:
+            out.insert_pdf(doc, from_page=start, to_page=end - 1)
+        out.save(out_path, garbage=3, deflate=True)
+    return out_path
+
+
+def pdf_split(pdf_path: str, ranges: list[tuple[int, int]], out_paths: list[str]) -> list[str]:
+    """One PDF per range."""
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        for (start, end), out_path in zip(ranges, out_paths):
+            with fitz.open() as out:
+                out.insert_pdf(doc, from_page=start, to_page=end - 1)
+                out.save(out_path, garbage=3, deflate=True)
+    return out_paths
+
+
+def pdf_rotate(pdf_path: str, out_path: str, angle: int,
+               ranges: list[tuple[int, int]] | None = None) -> str:
+    """Rotate the given pages (all by default) clockwise by `angle`, a multiple of 90."""
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        for start, end in ranges or [(0, doc.page_count)]:
+            for n in range(start, end):
+                page = doc[n]
+                page.set_rotation((page.rotation + angle) % 360)
+        doc.save(out_path, garbage=3, deflate=True)
+    return out_path
+
+
+# (target resolution in dpi, JPEG quality), gentlest first
+_COMPRESSION_LEVELS = [(150, 80), (110, 70), (80, 60), (60, 45)]
+
+
+def _downsample_images(doc, dpi: int, quality: int):
+    """
+    Re-encode every image drawn at more than `dpi` as a JPEG at `dpi`. Images
+    with a soft mask (transparency) are left alone, since replacing them
+    would drop the mask.
+    """
+    from PIL import Image
+    done = set()
+    for page in doc:
+        for image in page.get_images(full=True):
+            xref, smask = image[0], image[1]
+            if xref in done or smask:
+                continue
+            done.add(xref)
+            rects = page.get_image_rects(xref)
+            if not rects:
+                continue
+            # the largest placement decides how much resolution is needed
+            shown = max(max(r.width, r.height) for r in rects) / 72   # inches
+            pix = _image_pixmap(doc, xref)
+            if pix is None or shown <= 0 or max(pix.width, pix.height) / shown <= dpi * 1.1:
+                continue
+            scale = dpi * shown / max(pix.width, pix.height)
+            im = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+            im = im.resize((max(1, round(pix.width * scale)), max(1, round(pix.height * scale))),
+                           Image.LANCZOS)
+            out = io.BytesIO()
+            im.save(out, "JPEG", quality=quality, optimize=True)
+            page.replace_image(xref, stream=out.getvalue())
+
+
+def _image_pixmap(doc, xref: int):
+    """The image as an 8-bit gray or RGB pixmap without alpha, or None if it can't be decoded."""
+    import fitz
+    try:
+        pix = fitz.Pixmap(doc, xref)
+    except RuntimeError:
+        return None
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return pix
+
+
+def pdf_compress(pdf_path: str, out_path: str, target_size: int | None = None) -> str:
+    """
+    Downsample images and rewrite the file compactly. Without `target_size`
+    (bytes) the first level is used; with it, stronger levels are tried in
+    turn until the output fits or they run out – the smallest result wins.
+    The original is returned untouched if nothing came out smaller.
+    """
+    import shutil
+    import fitz
+    best, best_size = pdf_path, os.path.getsize(pdf_path)
+    levels = _COMPRESSION_LEVELS if target_size else _COMPRESSION_LEVELS[:1]
+    for n, (dpi, quality) in enumerate(levels):
+        attempt = f"{out_path}.{n}"
+        with fitz.open(pdf_path) as doc:
+            _downsample_images(doc, dpi, quality)
+            doc.save(attempt, garbage=4, deflate=True, deflate_images=True, deflate_fonts=True)
+        size = os.path.getsize(attempt)
+        if size < best_size:
+            if best != pdf_path:
+                os.remove(best)
+            best, best_size = attempt, size
+        else:
+            os.remove(attempt)
+        if target_size and best_size <= target_size:
+            break
+    if best == pdf_path:
+        shutil.copyfile(pdf_path, out_path)
+    else:
+        os.replace(best, out_path)
+    return out_path
+
+
+def pdf_page_hashes(pdf_path: str, limit: int, salt: str) -> list[str]:
+    """
+    A cheap fingerprint per page (first `limit` pages): its content stream
+    plus the raw bytes of the images it draws, salted with the OCR settings.
+    Nothing is rendered, so this is fast even for long scans.
+    """
+    import hashlib
+    import fitz
+    hashes = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc.pages(0, min(limit, doc.page_count)):
+            digest = hashlib.sha256(salt.encode())
+            digest.update(repr(tuple(page.rect)).encode())
+            digest.update(page.read_contents())
+            for image in page.get_images(full=True):
+                digest.update(doc.xref_stream_raw(image[0]) or b"")
+            hashes.append(digest.hexdigest())
+    return hashes
+
+
+def ocr_pdf_page(pdf_path: str, page_no: int, dpi: int, lang: str) -> str:
+    """Rasterize one page in grayscale and run Tesseract on it."""
+    import fitz
+    import pytesseract
+    from PIL import Image
+    with fitz.open(pdf_path) as doc:
+        pix = doc[page_no].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(image, lang=lang)
+
+
+def ocr_image(image_path: str, lang: str) -> str:
+    """Run Tesseract on a photo or image file, upright and in grayscale."""
+    import pytesseract
+    from PIL import Image, ImageOps
+    with Image.open(image_path) as image:
+        image = ImageOps.exif_transpose(image).convert("L")
+    return pytesseract.image_to_string(image, lang=lang)
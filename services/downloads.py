@@ -0,0 +1,69 @@
+import hashlib
+import mmap
+import os
+
+from aiogram.types import InputFile
+
+from config import DOWNLOAD_CHUNK_SIZE, TELEGRAM_API_LOCAL, TELEGRAM_API_DIR
+from loader import bot
+
+
+class FileTooLarge(Exception):
+    """The file is over the size we are willing to download."""
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        # hash straight from the page cache instead of copying the file through Python
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def is_shared_path(path: str) -> bool:
+    """True when the local Bot API server can read `path` itself."""
+    root = os.path.realpath(TELEGRAM_API_DIR)
+    return TELEGRAM_API_LOCAL and os.path.realpath(path).startswith(root + os.sep)
+
+
+def _place_local(src: str, path: str):
+    # a hard link when possible, a symlink across filesystems – never a copy
+    try:
+        os.link(src, path)
+    except OSError:
+        os.symlink(src, path)
+
+
+async def download_to(telegram_file_id: str, path: str, max_size: int | None = None) -> int:
+    """
+    Make a Telegram file available at `path` and return its size. Raises
+    FileTooLarge before fetching anything over `max_size`.
+
+    Against api.telegram.org the file is streamed DOWNLOAD_CHUNK_SIZE bytes at
+    a time, so memory use stays flat whatever its size. A local Bot API
+    server already holds the file on disk and get_file returns its absolute
+    path, which is linked into place without copying.
+    """
+    file_info = await bot.get_file(telegram_file_id)
+    if max_size and file_info.file_size and file_info.file_size > max_size:
+        raise FileTooLarge(file_info.file_size)
+    if TELEGRAM_API_LOCAL and os.path.isabs(file_info.file_path):
+        _place_local(file_info.file_path, path)
+        return os.path.getsize(path)
+    with open(path, "wb") as f:
+        await bot.download_file(file_info.file_path, destination=f,
+                                chunk_size=DOWNLOAD_CHUNK_SIZE, seek=False)
+        return f.tell()
+
+
+def upload_file(path: str, filename: str):
+    """
+    What to pass as a document when sending `path`: a file:// URI the local
+    server reads itself, or an InputFile streamed over HTTP otherwise.
+    """
+    if is_shared_path(path):
+        return f"file://{os.path.realpath(path)}"
+    return InputFile(path, filename)
@@ -0,0 +1,89 @@
+import os
+
+# Keep this module free of bot/database imports: it runs inside worker processes.
+
+# Same cap as the search_vector expression – anything beyond is never indexed.
+MAX_TEXT_CHARS = 500_000
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+def _kind(mime_type: str | None, file_name: str | None) -> str | None:
+    ext = os.path.splitext(file_name or "")[1].lower()
+    if mime_type == PDF_MIME or ext == ".pdf":
+        return "pdf"
+    if mime_type == DOCX_MIME or ext == ".docx":
+        return "docx"
+    if mime_type == PPTX_MIME or ext == ".pptx":
+        return "pptx"
+    if (mime_type or "").startswith("text/") or ext in (".txt", ".md", ".csv"):
+        return "text"
+    return None
+
+
+def _clip(parts) -> str:
+    """Join text parts, stopping once MAX_TEXT_CHARS is reached."""
+    out, size = [], 0
+    for part in parts:
+        if not part:
+            continue
+        out.append(part)
+        size += len(part) + 1
+        if size >= MAX_TEXT_CHARS:
+            break
+    return "\n".join(out)[:MAX_TEXT_CHARS]
+
+
+def _pdf(path: str):
+    import fitz
+    with fitz.open(path) as doc:
+        return _clip(page.get_text() for page in doc), doc.page_count
+
+
+def _docx(path: str):
+    import docx
+    document = docx.Document(path)
+
+    def parts():
+        for p in document.paragraphs:
+            yield p.text
+        for table in document.tables:
+            for row in table.rows:
+                yield " | ".join(cell.text for cell in row.cells)
+    # .docx has no reliable page count without rendering it
+    return _clip(parts()), None
+
+
+def _pptx(path: str):
+    from pptx import Presentation
+    prs = Presentation(path)
+
+    def parts():
+        for slide in prs.slides:
+            for shape in slide.shapes:
+                if shape.has_text_frame:
+                    yield shape.text_frame.text
+    return _clip(parts()), len(prs.slides)
+
+
+def _text(path: str):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read(MAX_TEXT_CHARS), None
+
+
+_EXTRACTORS = {"pdf": _pdf, "docx": _docx, "pptx": _pptx, "text": _text}
+
+
+def extract_document(path: str, mime_type: str | None, file_name: str | None):
+    """
+    Return (text, page_count) for a downloaded document.
+    Unsupported types give ("", None). CPU-bound – run it in a process pool.
+    """
+    kind = _kind(mime_type, file_name)
+    if kind is None:
+        return "", None
+    text, page_count = _EXTRACTORS[kind](path)
+    # Postgres text cannot hold NUL bytes
+    return text.replace("\x00", ""), page_count
@@ -0,0 +1,144 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from config import INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_MAX_FILE_SIZE
+from database.db import db
+from loader import logger
+from services.downloads import download_to, sha256_file
+from services.extractors import extract_document
+from services.workspace import job_workspace
+
+
+class IngestJob(NamedTuple):
+    file_id: int
+    telegram_file_id: str
+    file_name: str | None
+    mime_type: str | None
+    file_size: int | None
+
+
+class IngestionPipeline:
+    """
+    Downloads newly uploaded materials once and extracts their text off the
+    request path.
+
+    Jobs go through a bounded queue drained by INGEST_WORKERS tasks; the
+    CPU-heavy parsing runs in a process pool of the same size. When the queue
+    is full new uploads are simply left pending (extracted_at IS NULL) and the
+    periodic `enqueue_pending` sweep picks them up once there is room again.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, queue_size: int = INGEST_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue | None = None
+        self.queue_size = queue_size
+        self.pool: ProcessPoolExecutor | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._queued: set[int] = set()
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info("Ingestion pipeline started with %s workers", self.workers)
+        report = await db.get_dedup_report()
+        logger.info(
+            "Dedup so far: %s duplicate uploads (%s bytes), %s files reused extracted text (%s bytes)",
+            report["duplicate_uploads"], report["duplicate_bytes"],
+            report["linked_files"], report["linked_bytes"],
+        )
+        await self.enqueue_pending()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        logger.info("Ingestion pipeline stopped")
+
+    def submit(self, job: IngestJob) -> bool:
+        """Queue a file without waiting. False when the pipeline is saturated."""
+        if self.queue is None or job.file_id in self._queued:
+            return False
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.info("Ingestion queue full, file %s left for the next sweep", job.file_id)
+            return False
+        self._queued.add(job.file_id)
+        return True
+
+    async def enqueue_pending(self):
+        """Fill free queue slots with files whose text was never extracted."""
+        if self.queue is None:
+            return
+        room = self.queue.maxsize - self.queue.qsize()
+        if room <= 0:
+            return
+        rows = await db.get_files_pending_extraction(room, exclude=list(self._queued))
+        for r in rows:
+            self.submit(IngestJob(r["id"], r["telegram_file_id"], r["file_name"],
+                                  r["mime_type"], r["file_size"]))
+        if rows:
+            logger.info("Queued %s pending file(s) for extraction", len(rows))
+
+    async def _worker(self, n: int):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ingestion worker %s failed on file %s: %s", n, job.file_id, e)
+            finally:
+                self._queued.discard(job.file_id)
+                self.queue.task_done()
+
+    async def _process(self, job: IngestJob):
+        # the same document may already have been processed for someone else
+        if await db.link_file_content(job.file_id, job.telegram_file_id):
+            return
+
+        if job.file_size and job.file_size > INGEST_MAX_FILE_SIZE:
+            await db.save_file_content(job.file_id, job.telegram_file_id, None, None,
+                                       job.file_size, error="file too large to download")
+            return
+
+        with job_workspace("ingest") as workdir:
+            try:
+                path = os.path.join(workdir, "document")
+                size = await download_to(job.telegram_file_id, path)
+            except Exception as e:
+                await db.save_file_content(job.file_id, job.telegram_file_id, None, None,
+                                           job.file_size, error=f"download failed: {e}")
+                return
+
+            # identical bytes under a different Telegram id (e.g. re-saved copies)
+            content_hash = await asyncio.to_thread(sha256_file, path)
+            if await db.link_file_content(job.file_id, job.telegram_file_id, content_hash):
+                return
+
+            loop = asyncio.get_running_loop()
+            try:
+                text, page_count = await loop.run_in_executor(
+                    self.pool, extract_document, path, job.mime_type, job.file_name
+                )
+            except Exception as e:
+                await db.save_file_content(job.file_id, job.telegram_file_id, None, None,
+                                           size, error=f"extraction failed: {e}",
+                                           content_hash=content_hash)
+                return
+
+        await db.save_file_content(job.file_id, job.telegram_file_id,
+                                   text or None, page_count, size,
+                                   content_hash=content_hash)
+        logger.info("Extracted %s chars from file %s", len(text), job.file_id)
+
+
+ingestion = IngestionPipeline()
@@ -0,0 +1,109 @@
+import asyncio
+
+from config import (
+    OCR_WORKERS,
+    OCR_DPI,
+    OCR_MAX_PAGES,
+    OCR_LANG,
+    OCR_STREAM_PAGES,
+    OCR_CACHE_SIZE,
+)
+from database.db import db
+from loader import logger
+from services import converters
+from services.conversion import WorkerPool
+
+
+class OcrService:
+    """
+    Page-parallel OCR for scanned PDFs and photos.
+
+    Every page is fingerprinted first; pages seen before (in any document,
+    with the same DPI and languages) come from the ocr_page_cache table and
+    only the rest are rasterized and recognized, one page per task across a
+    pool of OCR_WORKERS processes – killed when the job is cancelled or times
+    out, so no page keeps running for a dead job. For long documents finished blocks of
+    OCR_STREAM_PAGES pages are handed to `on_chunk` as soon as they are
+    complete and in order.
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.pool = WorkerPool(workers)
+
+    async def start(self):
+        self.pool.start()
+        logger.info("OCR pool started with %s workers", self.pool.workers)
+
+    async def stop(self):
+        self.pool.stop()
+        logger.info("OCR pool stopped")
+
+    async def ocr_pdf(self, pdf_path: str, txt_path: str, on_chunk=None) -> str:
+        """
+        Recognize the first OCR_MAX_PAGES pages of `pdf_path` into `txt_path`.
+        `on_chunk(first_page, last_page, text)` is awaited for each streamed block.
+        """
+        hashes = await self.pool.run(
+            converters.pdf_page_hashes, pdf_path, OCR_MAX_PAGES, f"{OCR_DPI}:{OCR_LANG}"
+        )
+        cached = await db.get_ocr_pages(list(set(hashes)))
+        pages: list[str | None] = [cached.get(h) for h in hashes]
+
+        # identical pages (repeated covers, blank sheets) are recognized once
+        todo: dict[str, list[int]] = {}
+        for n, h in enumerate(hashes):
+            if pages[n] is None:
+                todo.setdefault(h, []).append(n)
+
+        async def recognize(h: str, n: int):
+            return h, await self.pool.run(converters.ocr_pdf_page, pdf_path, n, OCR_DPI, OCR_LANG)
+
+        tasks = [asyncio.ensure_future(recognize(h, ns[0])) for h, ns in todo.items()]
+        fresh: dict[str, str] = {}
+        streamed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                h, text = await next_done
+                fresh[h] = text
+                for n in todo[h]:
+                    pages[n] = text
+                # stream whole blocks that are ready; the last block goes out with the full file
+                while (on_chunk and streamed + OCR_STREAM_PAGES < len(pages)
+                       and None not in pages[streamed:streamed + OCR_STREAM_PAGES]):
+                    block = pages[streamed:streamed + OCR_STREAM_PAGES]
+                    await on_chunk(streamed + 1, streamed + len(block), _join(block, streamed))
+                    streamed += len(block)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # wait for the cancelled pages so their processes are killed before the workspace goes
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # keep what was recognized even if the job was cancelled half way
+            if fresh:
+                await db.save_ocr_pages(fresh)
+
+        logger.info("OCR of %s pages: %s cached, %s recognized",
+                    len(pages), len(pages) - sum(map(len, todo.values())), len(fresh))
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(_join(pages, 0))
+        return txt_path
+
+    async def ocr_image(self, image_path: str, txt_path: str) -> str:
+        """Recognize a single photo or image file into `txt_path`."""
+        text = await self.pool.run(converters.ocr_image, image_path, OCR_LANG)
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(text.strip() + "\n")
+        return txt_path
+
+    async def prune_cache(self):
+        evicted = await db.prune_ocr_cache(OCR_CACHE_SIZE)
+        if evicted:
+            logger.info("OCR cache: evicted %s least recently used pages", evicted)
+
+
+def _join(pages: list[str], offset: int) -> str:
+    return "\n".join(f"--- Page {offset + n} ---\n{text.strip()}\n"
+                     for n, text in enumerate(pages, 1))
+
+
+ocr = OcrService()
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import shlex
+import shutil
+import signal
+import tempfile
+import xmlrpc.client
+
+from config import (
+    OFFICE_SERVER_CMD,
+    OFFICE_WORKERS,
+    OFFICE_BASE_PORT,
+    OFFICE_MAX_JOBS,
+    OFFICE_START_TIMEOUT,
+)
+from loader import logger
+
+
+class OfficeUnavailable(Exception):
+    """No LibreOffice listener could be started – callers fall back to the CLI."""
+
+
+def _rpc(port: int, timeout: float):
+    # a fresh proxy per call: ServerProxy objects are not safe to share between threads
+    transport = xmlrpc.client.Transport()
+    transport.timeout = timeout
+    return xmlrpc.client.ServerProxy(f"http://127.0.0.1:{port}", transport=transport, allow_none=True)
+
+
+def _ping(port: int) -> bool:
+    try:
+        _rpc(port, 5).info()
+        return True
+    except Exception:
+        return False
+
+
+def _convert(port: int, input_path: str, output_path: str, timeout: float):
+    # XML-RPC is positional: (inpath, indata, outpath, ...); the output filter
+    # is picked from output_path's extension
+    _rpc(port, timeout).convert(input_path, None, output_path)
+
+
+class OfficeWorker:
+    """
+    One long-lived LibreOffice listener, driven through unoserver's XML-RPC
+    API, with a user profile of its own so instances never fight over the
+    profile lock.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.rpc_port = OFFICE_BASE_PORT + 2 * n
+        self.uno_port = self.rpc_port + 1
+        self.profile_dir = os.path.join(tempfile.gettempdir(), f"studybot-office-profile-{n}")
+        self.process: asyncio.subprocess.Process | None = None
+        self.jobs = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        cmd = shlex.split(OFFICE_SERVER_CMD) + [
+            "--port", str(self.rpc_port),
+            "--uno-port", str(self.uno_port),
+            "--user-installation", f"file://{self.profile_dir}",
+            "--quiet",
+        ]
+        try:
+            # own session, so stopping it also takes down the soffice child
+            self.process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except FileNotFoundError as e:
+            raise OfficeUnavailable(str(e))
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + OFFICE_START_TIMEOUT
+        while loop.time() < deadline:
+            if not self.alive:
+                break
+            if await asyncio.to_thread(_ping, self.rpc_port):
+                self.jobs = 0
+                logger.info("LibreOffice worker %s listening on port %s", self.n, self.rpc_port)
+                return
+            await asyncio.sleep(0.5)
+        await self.stop()
+        raise OfficeUnavailable(f"LibreOffice worker {self.n} did not come up")
+
+    async def stop(self):
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+        self.process = None
+
+    async def restart(self, reason: str):
+        logger.info("Restarting LibreOffice worker %s (%s)", self.n, reason)
+        await self.stop()
+        # a crashed instance can leave a broken profile behind
+        if reason != "recycle":
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+        await self.start()
+
+    async def healthy(self) -> bool:
+        return self.alive and await asyncio.to_thread(_ping, self.rpc_port)
+
+
+class OfficePool:
+    """
+    OFFICE_WORKERS warm LibreOffice instances, so a Word/PowerPoint → PDF
+    conversion costs only the render instead of a 2–5 s cold start.
+
+    A job borrows an idle worker, which gives concurrency equal to the pool
+    size. Workers are recycled after OFFICE_MAX_JOBS conversions (LibreOffice
+    slowly leaks memory), restarted when a conversion fails or is cancelled,
+    and checked by `health_check` in between.
+    """
+
+    def __init__(self, size: int = OFFICE_WORKERS):
+        self.size = max(1, size)
+        self.workers: list[OfficeWorker] = []
+        self._idle: asyncio.Queue | None = None
+
+    @property
+    def available(self) -> bool:
+        return self._idle is not None
+
+    async def start(self):
+        workers = [OfficeWorker(n) for n in range(self.size)]
+        try:
+            await asyncio.gather(*(w.start() for w in workers))
+        except OfficeUnavailable as e:
+            logger.warning("LibreOffice pool disabled, using one-off soffice runs: %s", e)
+            await asyncio.gather(*(w.stop() for w in workers))
+            return
+        self.workers = workers
+        self._idle = asyncio.Queue()
+        for w in workers:
+            self._idle.put_nowait(w)
+        logger.info("LibreOffice pool started with %s workers", self.size)
+
+    async def stop(self):
+        self._idle = None
+        await asyncio.gather(*(w.stop() for w in self.workers))
+        self.workers = []
+        logger.info("LibreOffice pool stopped")
+
+    async def convert(self, input_path: str, output_path: str, timeout: float) -> str:
+        """Render `input_path` to `output_path` on a warm instance and return output_path."""
+        worker = await self._idle.get()
+        try:
+            try:
+                if not worker.alive:
+                    await worker.restart("crashed")
+                await asyncio.wait_for(
+                    asyncio.to_thread(_convert, worker.rpc_port, input_path, output_path, timeout),
+                    timeout,
+                )
+            except BaseException:
+                # failed, timed out or cancelled mid-render: the instance may be wedged,
+                # so it is stopped and the next job starts a fresh one
+                await worker.stop()
+                raise
+            worker.jobs += 1
+            if worker.jobs >= OFFICE_MAX_JOBS:
+                try:
+                    await worker.restart("recycle")
+                except OfficeUnavailable as e:
+                    logger.error("LibreOffice worker %s could not be recycled: %s", worker.n, e)
+            return output_path
+        finally:
+            if self._idle is not None:
+                self._idle.put_nowait(worker)
+
+    async def health_check(self):
+        """Scheduled job: restart idle workers that died or stopped answering."""
+        if self._idle is None:
+            return
+        for _ in range(self._idle.qsize()):
+            worker = self._idle.get_nowait()
+            try:
+                if not await worker.healthy():
+                    await worker.restart("failed health check")
+            except Exception as e:
+                logger.error("LibreOffice worker %s could not be restarted: %s", worker.n, e)
+            finally:
+                self._idle.put_nowait(worker)
+
+
+office_pool = OfficePool()
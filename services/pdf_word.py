@@ -0,0 +1,75 @@
+import asyncio
+import math
+import os
+
+from config import PDF2DOCX_WORKERS, PDF2DOCX_MIN_CHUNK
+from loader import logger
+from services import converters
+from services.conversion import WorkerPool
+
+
+class PdfWordService:
+    """
+    Page-parallel PDF → Word.
+
+    pdf2docx works page by page, so a long PDF is cut into page ranges that
+    are converted side by side in a pool of PDF2DOCX_WORKERS processes and
+    their DOCX bodies merged in order afterwards. Ranges are at least
+    PDF2DOCX_MIN_CHUNK pages: below that the per-process start-up (parsing
+    the whole PDF again) costs more than it saves. A cancelled or timed out
+    job has the processes of its running ranges killed.
+    """
+
+    def __init__(self, workers: int = PDF2DOCX_WORKERS, min_chunk: int = PDF2DOCX_MIN_CHUNK):
+        self.workers = max(1, workers)
+        self.min_chunk = max(1, min_chunk)
+        self.pool = WorkerPool(self.workers)
+
+    async def start(self):
+        self.pool.start()
+        logger.info("PDF to Word pool started with %s workers", self.workers)
+
+    async def stop(self):
+        self.pool.stop()
+        logger.info("PDF to Word pool stopped")
+
+    def chunks(self, start: int, end: int) -> list[tuple[int, int]]:
+        size = max(self.min_chunk, math.ceil((end - start) / self.workers))
+        return [(first, min(first + size, end)) for first in range(start, end, size)]
+
+    async def convert(self, pdf_path: str, docx_path: str, start: int, end: int,
+                      on_progress=None) -> str:
+        """
+        Convert pages [start, end) of `pdf_path` into `docx_path`.
+        `on_progress(done_pages, total_pages)` is called as ranges finish.
+        """
+        ranges = self.chunks(start, end)
+        if len(ranges) == 1:
+            return await self.pool.run(converters.pdf_to_docx, pdf_path, docx_path, start, end)
+
+        base = os.path.splitext(docx_path)[0]
+        parts = [f"{base}-{n:03d}.docx" for n in range(len(ranges))]
+
+        async def convert_range(n: int):
+            first, last = ranges[n]
+            await self.pool.run(converters.pdf_to_docx, pdf_path, parts[n], first, last)
+            return last - first
+
+        tasks = [asyncio.ensure_future(convert_range(n)) for n in range(len(ranges))]
+        done = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                done += await next_done
+                if on_progress:
+                    on_progress(done, end - start)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # wait for the cancelled ranges so their processes are killed before the workspace goes
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        logger.info("PDF to Word: %s pages in %s parallel ranges", end - start, len(ranges))
+        return await self.pool.run(converters.merge_docx, parts, docx_path)
+
+
+pdf_word = PdfWordService()
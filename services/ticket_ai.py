@@ -0,0 +1,129 @@
+import asyncio
+import re
+from contextlib import suppress
+
+from config import AI_MAX_CONCURRENT, AI_MAX_JOBS_PER_USER, AI_TIMEOUT
+from loader import logger, openai_client
+
+TICKETS_PER_REQUEST = 5
+
+_NUMBERED = re.compile(r"^\s*\d+[.)]\s+(.+)$")
+
+
+class AiJobRejected(Exception):
+    """The user already has as many generation jobs as allowed."""
+
+
+async def stream_tickets(subject: str, topics: list[str]):
+    """
+    Ask the model for exam questions and yield each one as soon as its line
+    of the streamed answer is complete. `timeout` bounds each read only;
+    callers bound the whole stream (AI_TIMEOUT) and close the generator so
+    an abandoned answer stops streaming.
+    """
+    topics_str = ", ".join(topics) if topics else "any relevant topics for university students"
+    stream = await openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that generates exam questions for university students."},
+            {"role": "user", "content": f"Generate {TICKETS_PER_REQUEST} exam questions for the subject '{subject}' covering {topics_str}. Format as a numbered list."}
+        ],
+        max_tokens=1000,
+        temperature=0.7,
+        stream=True,
+        timeout=AI_TIMEOUT,
+    )
+    buffer = ""
+    count = 0
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            buffer += chunk.choices[0].delta.content or ""
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                match = _NUMBERED.match(line)
+                if match and count < TICKETS_PER_REQUEST:
+                    count += 1
+                    yield match.group(1).strip()
+    finally:
+        # drop the HTTP response on cancel, timeout or an early exit
+        await stream.close()
+    match = _NUMBERED.match(buffer)
+    if match and count < TICKETS_PER_REQUEST:
+        yield match.group(1).strip()
+
+
+class AiJobs:
+    """
+    Background AI generation jobs, so a handler can acknowledge the button
+    at once instead of holding its update for the whole model latency.
+
+    At most AI_MAX_CONCURRENT jobs talk to the API at a time (the rest wait
+    their turn) and each user may have AI_MAX_JOBS_PER_USER running or
+    waiting. `cancel_user` is what /cancel calls; a job cancelled before it
+    got a slot never ran, so its `on_cancel` is awaited instead.
+    """
+
+    def __init__(self, concurrency: int = AI_MAX_CONCURRENT, per_user: int = AI_MAX_JOBS_PER_USER):
+        self.per_user = per_user
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._jobs: dict[int, set[asyncio.Task]] = {}
+
+    @property
+    def busy(self) -> bool:
+        """True when a new job would have to wait for a slot."""
+        return self._slots.locked()
+
+    def submit(self, user_id: int, func, *args, on_cancel=None) -> asyncio.Task:
+        """Run `func(*args)` in the background. Raises AiJobRejected over the user's limit."""
+        jobs = self._jobs.setdefault(user_id, set())
+        if len(jobs) >= self.per_user:
+            raise AiJobRejected("Your previous generation is still running. Wait for it or use /cancel.")
+        task = asyncio.create_task(self._run(user_id, func, args, on_cancel))
+        jobs.add(task)
+        task.add_done_callback(lambda t: self._forget(user_id, t))
+        return task
+
+    async def _run(self, user_id: int, func, args: tuple, on_cancel):
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            if on_cancel:
+                with suppress(Exception):
+                    await on_cancel()
+            raise
+        try:
+            await func(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AI job of user {user_id} failed: {e}")
+        finally:
+            self._slots.release()
+
+    def _forget(self, user_id: int, task: asyncio.Task):
+        jobs = self._jobs.get(user_id)
+        if jobs is not None:
+            jobs.discard(task)
+            if not jobs:
+                del self._jobs[user_id]
+
+    def cancel_user(self, user_id: int) -> int:
+        """Cancel the user's running or waiting jobs. Returns how many."""
+        jobs = [t for t in self._jobs.get(user_id, ()) if not t.done()]
+        for task in jobs:
+            task.cancel()
+        if jobs:
+            logger.info(f"Cancelled {len(jobs)} AI job(s) of user {user_id}")
+        return len(jobs)
+
+    async def stop(self):
+        tasks = [t for jobs in self._jobs.values() for t in jobs]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("AI jobs stopped")
+
+
+ai_jobs = AiJobs()
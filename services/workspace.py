@@ -0,0 +1,132 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from config import (
+    WORKSPACE_TMPFS,
+    WORKSPACE_TMPFS_MIN_FREE,
+    WORKSPACE_MAX_AGE,
+    TELEGRAM_API_LOCAL,
+    TELEGRAM_API_DIR,
+)
+from loader import logger
+
+PREFIX = "studybot-"
+
+# disk-backed fallback when tmpfs is missing or too full (Docker's /dev/shm is 64 MB by default)
+DISK_ROOT = tempfile.gettempdir()
+
+# with a local Bot API server, workspaces live in its directory: inputs are
+# hard-linked in and outputs are uploaded by path, neither is copied
+SHARED_ROOT = os.path.join(TELEGRAM_API_DIR, "studybot-work") if TELEGRAM_API_LOCAL else None
+
+_active: set[str] = set()
+
+
+def _root() -> str:
+    if SHARED_ROOT:
+        os.makedirs(SHARED_ROOT, exist_ok=True)
+        return SHARED_ROOT
+    try:
+        if shutil.disk_usage(WORKSPACE_TMPFS).free >= WORKSPACE_TMPFS_MIN_FREE \
+                and os.access(WORKSPACE_TMPFS, os.W_OK):
+            return WORKSPACE_TMPFS
+    except OSError:
+        pass
+    return DISK_ROOT
+
+
+@contextmanager
+def job_workspace(kind: str):
+    """
+    A private directory for one job, on tmpfs when it has room. It is removed
+    when the block exits, however it exits; anything left behind by a crash
+    is swept up later by `reap_workspaces`.
+    """
+    path = tempfile.mkdtemp(prefix=f"{PREFIX}{kind}-", dir=_root())
+    _active.add(path)
+    try:
+        yield path
+    finally:
+        _active.discard(path)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _workspaces():
+    for root in {WORKSPACE_TMPFS, DISK_ROOT, SHARED_ROOT} - {None}:
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith(PREFIX) and entry.is_dir(follow_symlinks=False):
+                yield entry
+
+
+def reap_workspaces(max_age: float = WORKSPACE_MAX_AGE) -> dict:
+    """
+    Delete workspaces older than `max_age` seconds that no job holds (left
+    over from a crash or a killed worker) and return disk-usage figures for
+    the ones that remain. Walks the filesystem – run it in a thread.
+    """
+    now = time.time()
+    reaped = reaped_bytes = remaining = used_bytes = 0
+    for entry in _workspaces():
+        size = _dir_size(entry.path)
+        try:
+            age = now - entry.stat(follow_symlinks=False).st_mtime
+        except OSError:
+            continue
+        if entry.path not in _active and age > max_age:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            reaped += 1
+            reaped_bytes += size
+        else:
+            remaining += 1
+            used_bytes += size
+
+    try:
+        tmpfs_free = shutil.disk_usage(WORKSPACE_TMPFS).free
+    except OSError:
+        tmpfs_free = None
+    return {
+        "active": len(_active),
+        "workspaces": remaining,
+        "used_bytes": used_bytes,
+        "reaped": reaped,
+        "reaped_bytes": reaped_bytes,
+        "tmpfs_free_bytes": tmpfs_free,
+        "disk_free_bytes": shutil.disk_usage(DISK_ROOT).free,
+    }
+
+
+def log_workspace_usage(stats: dict):
+    mb = 1024 * 1024
+    tmpfs_free = stats["tmpfs_free_bytes"]
+    logger.info(
+        "Workspaces: %s in use (%s active jobs), %.1f MB; reaped %s orphaned (%.1f MB); "
+        "free: tmpfs %s, disk %.0f MB",
+        stats["workspaces"], stats["active"], stats["used_bytes"] / mb,
+        stats["reaped"], stats["reaped_bytes"] / mb,
+        f"{tmpfs_free / mb:.0f} MB" if tmpfs_free is not None else "n/a",
+        stats["disk_free_bytes"] / mb,
+    )
+
+
+async def run_reaper():
+    """Scheduled job: reap orphaned workspaces off the event loop and log usage."""
+    log_workspace_usage(await asyncio.to_thread(reap_workspaces))
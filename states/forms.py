@@ -40,6 +40,8 @@ class ConvertForm(StatesGroup):
     select_type = State()
     file = State()
     images = State()
+    pdfs = State()
+    batch = State()
 
 
 class TicketForm(StatesGroup):
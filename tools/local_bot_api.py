@@ -0,0 +1,193 @@
+"""
+A stand-in for a telegram-bot-api server in --local mode, to check the
+local-mode paths of services/downloads.py without Telegram:
+
+    download_to   getFile answers with an absolute file_path inside the
+                  server's directory; the file must be hard-linked into the
+                  job workspace (symlinked across filesystems), never copied
+    upload_file   an output inside the shared directory is sent as a file://
+                  URI that the server opens itself; one outside it is uploaded
+
+The stand-in answers getFile and sendDocument only. It runs in-process on a
+free local port, with a temporary directory as TELEGRAM_API_DIR.
+
+Usage (from the repository root):
+
+    python tools/local_bot_api.py
+
+Prints one line per check and exits non-zero when one fails.
+"""
+import asyncio
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+API_DIR = tempfile.mkdtemp(prefix="studybot-local-api-")
+TOKEN = "123456:standin"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = _free_port()
+# read by config.py on import, so set before anything from the bot is imported
+os.environ.update(
+    TELEGRAM_API_URL=f"http://127.0.0.1:{PORT}",
+    TELEGRAM_API_LOCAL="true",
+    TELEGRAM_API_DIR=API_DIR,
+)
+os.environ.setdefault("BOT_TOKEN", TOKEN)
+os.environ.setdefault("OPENAI_API_KEY", "standin")
+
+from services.downloads import download_to, upload_file, FileTooLarge  # noqa: E402
+
+
+# ─── The stand-in server ─────────────────────────────────────────────
+class StandIn:
+    def __init__(self, root: str):
+        self.root = root
+        self.files: dict[str, str] = {}      # file_id → absolute path in `root`
+        self.sent: list[bytes] = []          # document bytes as the server saw them
+
+    def add_file(self, file_id: str, name: str, data: bytes) -> str:
+        # the real server keeps files under <dir>/<token>/<kind>/
+        path = os.path.join(self.root, TOKEN, "documents", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.files[file_id] = path
+        return path
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        form = await request.post()
+        if method == "getFile":
+            path = self.files.get(form.get("file_id"))
+            if path is None:
+                return web.json_response({"ok": False, "error_code": 400,
+                                          "description": "Bad Request: invalid file_id"})
+            return web.json_response({"ok": True, "result": {
+                "file_id": form["file_id"], "file_unique_id": form["file_id"][::-1],
+                "file_size": os.path.getsize(path), "file_path": path,
+            }})
+        if method == "sendDocument":
+            document = form["document"]
+            if isinstance(document, str):
+                # --local mode: the server opens file:// URIs itself
+                if not document.startswith("file://"):
+                    return web.json_response({"ok": False, "error_code": 400,
+                                              "description": "Bad Request: wrong file identifier"})
+                with open(document[len("file://"):], "rb") as f:
+                    self.sent.append(f.read())
+                name = os.path.basename(document)
+            else:
+                self.sent.append(document.file.read())
+                name = document.filename
+            return web.json_response({"ok": True, "result": {
+                "message_id": len(self.sent), "date": int(time.time()),
+                "chat": {"id": int(form["chat_id"]), "type": "private"},
+                "document": {"file_id": f"sent-{len(self.sent)}", "file_unique_id": f"u{len(self.sent)}",
+                             "file_name": name, "file_size": len(self.sent[-1])},
+            }})
+        return web.json_response({"ok": False, "error_code": 404, "description": "Not Found"})
+
+
+# ─── Checks ──────────────────────────────────────────────────────────
+failures = 0
+
+
+def report(name: str, ok: bool, detail: str = ""):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'}  {name}" + (f" – {detail}" if detail else ""))
+
+
+async def run_checks(server: StandIn):
+    from loader import bot
+    data = os.urandom(256 * 1024)
+    source = server.add_file("doc-1", "file_0.pdf", data)
+
+    # same filesystem as the server's directory: a hard link
+    workspace = tempfile.mkdtemp(dir=API_DIR)
+    target = os.path.join(workspace, "input.pdf")
+    size = await download_to("doc-1", target)
+    report("download_to hard-links on the same filesystem",
+           size == len(data) and not os.path.islink(target) and os.path.samefile(source, target),
+           f"{os.stat(target).st_nlink} links")
+
+    # another filesystem (the tmpfs workspaces use): a symlink
+    other = "/dev/shm"
+    if os.path.isdir(other) and os.stat(other).st_dev != os.stat(API_DIR).st_dev:
+        elsewhere = tempfile.mkdtemp(dir=other)
+        try:
+            target = os.path.join(elsewhere, "input.pdf")
+            await download_to("doc-1", target)
+            report("download_to symlinks across filesystems",
+                   os.path.islink(target) and os.readlink(target) == source)
+        finally:
+            shutil.rmtree(elsewhere, ignore_errors=True)
+    else:
+        print(f"skip  download_to across filesystems – {other} is not a separate filesystem here")
+
+    try:
+        await download_to("doc-1", os.path.join(workspace, "too-big.pdf"), max_size=len(data) - 1)
+        report("download_to refuses files over max_size", False, "no FileTooLarge")
+    except FileTooLarge:
+        report("download_to refuses files over max_size",
+               not os.path.exists(os.path.join(workspace, "too-big.pdf")))
+
+    # an output in the shared directory goes by path, one elsewhere over HTTP
+    output = os.path.join(workspace, "converted.txt")
+    with open(output, "wb") as f:
+        f.write(data[:1000])
+    document = upload_file(output, "converted.txt")
+    report("upload_file gives a file:// URI for shared paths",
+           isinstance(document, str) and document.startswith("file://"), str(document))
+    await bot.send_document(1, document)
+    report("sendDocument opens the file:// path", server.sent[-1] == data[:1000])
+
+    private = tempfile.mkdtemp()
+    try:
+        output = os.path.join(private, "converted.txt")
+        with open(output, "wb") as f:
+            f.write(data[:2000])
+        document = upload_file(output, "converted.txt")
+        report("upload_file streams paths outside the shared directory",
+               not isinstance(document, str), type(document).__name__)
+        await bot.send_document(1, document)
+        report("sendDocument receives the uploaded bytes", server.sent[-1] == data[:2000])
+    finally:
+        shutil.rmtree(private, ignore_errors=True)
+
+    await (await bot.get_session()).close()
+
+
+async def main():
+    server = StandIn(API_DIR)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", server.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    try:
+        await run_checks(server)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        shutil.rmtree(API_DIR, ignore_errors=True)
+    sys.exit(1 if failures else 0)